@@ -9,8 +9,10 @@ deembed - take the overall s4p file and a partial s4p to get the reminder s4p of
 """
 
 import skrf as rf
+from snp_grid import same_freq
 
 import matplotlib.pyplot as plt
+import snp_plot
 from pathlib import Path
 import sys
 
@@ -33,17 +35,12 @@ Usage:
 bisect 	<input.s4p> 			ri|ma|db
 cascade <file1.s4p>  <file2.s4p> 	ri|ma|db
 deembed <file1.s4p>  <file2.s4p> 	ri|ma|db
-"""
+
+Options:""" + snp_plot.HELP
 # -----------------------------------------------------------------------------
 # Utility helpers
 # -----------------------------------------------------------------------------
 
-def _same_freq(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, rf.Network]:
-	"""Ensure *ntw_b* is on *ntw_a*'s frequency grid."""
-	if ntw_a.frequency != ntw_b.frequency:
-		ntw_b = ntw_b.interpolate(ntw_a.frequency)
-	return ntw_a, ntw_b
-
 def _plot_quick(ntw: rf.Network, title: str):
 	"""Non-blocking quick plot for visual sanity checks (ignored if no display)."""
 	try:
@@ -62,17 +59,10 @@ def create_bisect_network(input_file: Path, bisect_file: Path, s4p_format) -> Pa
 	ntw1diff = ntw1.copy()
 	ntw1diff.se2gmm(p=2)
 
-	# plot differential return loss
-	plt.figure(figsize=(10, 5)) 
-	plt.subplot(1, 2, 1)
-	plt.suptitle(input_file.name)
-	ntw1diff.s11.plot_s_db(label = 'sdd11')
-	plt.legend()
-
-	# plot differential insertion loss
-	plt.subplot(1, 2, 2)
-	ntw1diff.s21.plot_s_db(label = 'sdd21')
-	plt.legend()    
+	# plot differential return loss and insertion loss
+	snp_plot.report(None, input_file.name, ntw1diff, [
+		snp_plot.panel(ntw1diff, 0, 0, 'sdd11'),
+		snp_plot.panel(ntw1diff, 1, 0, 'sdd21')])
 	
 	# Create a new network with half values
 	mm_dm = rf.IEEEP370_MM_NZC_2xThru(dummy_2xthru = ntw1, z0 = 50, name = '2xthru')
@@ -82,71 +72,49 @@ def create_bisect_network(input_file: Path, bisect_file: Path, s4p_format) -> Pa
 	mm_side1 = fix1.copy()
 	mm_side1.se2gmm(p = 2)
 
-	# plot differential return loss of one half
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(bisect_file.name + " (After Bisect)")
-	plt.subplot(1, 2, 1)
-	mm_side1.s11.plot_s_db(label = 'sdd11')
-	plt.legend()
-
-	# plot differential insertion loss of one half
-	plt.subplot(1, 2, 2)
-	mm_side1.s21.plot_s_db(label = 'sdd21')
-	plt.legend()
-	plt.show()
-	
 	# save 4-port S-parameters of one half
 	fix1.write_touchstone(bisect_file, form=s4p_format)
 
+	# plot differential return loss and insertion loss of one half
+	snp_plot.report(None, bisect_file.name + " (After Bisect)", mm_side1, [
+		snp_plot.panel(mm_side1, 0, 0, 'sdd11'),
+		snp_plot.panel(mm_side1, 1, 0, 'sdd21')])
+	snp_plot.show()
+
 
 # Function takes two s4p network cascade them together to perform an overall s4p network
 def create_cascade_network(Net_file1: Path, Net_file2: Path, dst: Path, s4p_format) -> None:
 	ntw_a, ntw_b = map(rf.Network, (str(Net_file1), str(Net_file2)))
-	ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+	ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
 	ntw_cascade = ntw_a ** ntw_b
 	ntw_cascade.write_touchstone(str(dst), form=s4p_format)
 
 	ntw_cascade2 = ntw_cascade.copy()
 	ntw_cascade2.se2gmm(p=2)
 
-	# plot differential return loss of one half
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(dst.name + " (After Cascading)")
-	plt.subplot(1, 2, 1)
-	ntw_cascade2.s11.plot_s_db(label = 'sdd11')
-	plt.legend()
-
-	# plot differential insertion loss of one half
-	plt.subplot(1, 2, 2)
-	ntw_cascade2.s21.plot_s_db(label = 'sdd21')
-	plt.legend()
-	
-	plt.show()
+	# plot differential return loss and insertion loss
+	snp_plot.report(None, dst.name + " (After Cascading)", ntw_cascade2, [
+		snp_plot.panel(ntw_cascade2, 0, 0, 'sdd11'),
+		snp_plot.panel(ntw_cascade2, 1, 0, 'sdd21')])
+	snp_plot.show()
 	print(f"[OK] {Net_file1.name} + {Net_file2.name} → {dst}")    
 
 
 # Function takes the overall s4p network and partial s4p network get the reminder s4p of this netwrok
 def create_deembeded_network(Total_Net_file: Path, Partial_Net_file: Path, dst: Path, s4p_format) -> None:
 	ntw_a, ntw_b = map(rf.Network, (str(Total_Net_file), str(Partial_Net_file)))
-	ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+	ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
 	ntw_deembed = ntw_a ** ntw_b.inv
 	ntw_deembed.write_touchstone(str(dst), form=s4p_format)
 
 	ntw_deembed2 = ntw_deembed.copy()
 	ntw_deembed2.se2gmm(p=2)
 
-	# plot differential return loss of one half
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(dst.name + " (After De-Embedding)")
-	plt.subplot(1, 2, 1)
-	ntw_deembed2.s11.plot_s_db(label = 'sdd11')
-	plt.legend()
-
-	# plot differential insertion loss of one half
-	plt.subplot(1, 2, 2)
-	ntw_deembed2.s21.plot_s_db(label = 'sdd21')
-	plt.legend()
-	plt.show()
+	# plot differential return loss and insertion loss
+	snp_plot.report(None, dst.name + " (After De-Embedding)", ntw_deembed2, [
+		snp_plot.panel(ntw_deembed2, 0, 0, 'sdd11'),
+		snp_plot.panel(ntw_deembed2, 1, 0, 'sdd21')])
+	snp_plot.show()
 	print(f"[OK] {Total_Net_file.name} - {Partial_Net_file.name} → {dst}")
 # ---------------------------------------------------------------------------
 # CLI entry‑point
@@ -156,6 +124,13 @@ def main(argv: list[str] | None = None) -> None:
 	if not argv or argv[0] in ("-h", "--help"):
 		print(HELP); sys.exit(0)
 
+	try:
+		argv = snp_plot.parse_plot_option(argv)
+	except ValueError as err:
+		print(err)
+		print(HELP)
+		sys.exit(1)
+
 	op, *args = argv
 	op = op.lower()
 
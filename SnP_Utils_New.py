@@ -3,47 +3,212 @@
 Operations
 ----------
 bisect 	- takes SnP file and create its half
-cascade - takes two SnP files and cascade them (in series)
+cascade - takes two or more SnP files and cascade them (in series), 2-port segments are used on every line of an N-port chain
 deembed - take the overall SnP file and a partial SnP to get the reminder SnP of this netwrok
+attach	- connect 2-port(s) (cables, adapters) onto selected ports of an N-port
+assemble - build an N-port SnP from the 2-port files of its port pairs
+convert - rewrite SnP file(s) in other formats / Touchstone version (streamed, constant memory)
+check	- evaluate limit masks (SDD/SCC/SDC/S) on many SnP files, worst margin and failing ranges
+watch	- process the SnP files dropped into a folder as they arrive (deembed, quality, masks, convert)
+archive	- indexed multi-network archive, Touchstone import/export and slice queries across networks
 
 """
 
-import skrf as rf
+from __future__ import annotations
 
-import matplotlib.pyplot as plt
+import sys
+import snp_serve
+
+# thin client: hand the call to a running `serve` daemon before importing anything heavy
+if __name__ == '__main__' and (code := snp_serve.forward(sys.argv[1:])) is not None:
+	sys.exit(code)
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+from snp_touchstone import load_network
+import snp_cache
+
+import snp_plot
+import snp_archive
+import snp_assemble
+import snp_batch
+import snp_chunked
+import snp_linalg
+import snp_grid
+import snp_mask
+import snp_quality
+import snp_results
+import snp_profile
+import snp_watch
+from snp_profile import stage
+from snp_grid import same_freq
 from pathlib import Path
 import numpy as np
-import sys
+import os
+import re
 
 app_dir = Path(__file__).resolve().parent
 
+COND_WARN = 1e6		# fixture condition number above which a de-embedded point is flagged
+write_cond = False	# --cond: save the per-frequency condition numbers as CSV
+full_qm = False		# --full-qm: always run the reference IEEE370 check in bisect
+grid_policy = ("first", None)	# --grid=POLICY: common frequency grid of multi-file operations
+chunk_points = None	# --chunk=N: cascade/deembed streamed in blocks of N frequency points
+
 HELP = f"""
 Description: SnP_Utils.py takes SnP network file(s) to perform several manipulation:
 
 Supported Operation:
 bisect 	- takes SnP file and create its half
-cascade - takes two SnP files and cascade them (in series)
+cascade - takes two or more SnP files and cascade them (in series), 2-port segments are used on every line of an N-port chain
 deembed - take the overall SnP file and a partial SnP to get the reminder SnP of this netwrok
+deembed-many - take one partial SnP (fixture) and de-embed it from many overall SnP files in one pass
+attach	- connect a 2-port (cable, adapter) onto selected ports of an N-port, port 2 of the 2-port facing the N-port
+assemble - build an N-port from pairwise 2-port measurements (S21.s2p, S31.s2p, ...) loaded concurrently
+convert	- rewrite a SnP file (or every SnP file of a folder) in other formats and/or as Touchstone v2
+check	- pass/fail of piecewise-linear limit masks (default: IEEE370 FER) on many SnP files, no plotting
+batch	- run many of the above from a CSV/JSON manifest or a file glob in a process pool
+watch	- poll a folder and run deembed / quality / check / convert on every new or changed SnP file
+archive	- store many SnP files in one indexed archive: import / export Touchstone, query one parameter or frequency of all
+cache	- show / trim the parsed-file and result cache (results of unchanged inputs are reused)
+serve	- keep warm worker processes behind a local socket, the CLI forwards --no-plot/--plot=async calls to them
 	
 SnP Output format can be set as below:
 ri	- Real/ Image		(Default if not parameter set)
 ma	- Mag and Angle
 db	- dB and angle
+Several formats can be given comma separated (e.g. ri,db): one file per format <name>_<format>.SnP
 
 Usage:
 bisect 	<input.SnP> 			ri|ma|db
-cascade <file1.SnP>  <file2.SnP> 	ri|ma|db
+cascade <file1.SnP>  <file2.SnP> [<file3.SnP> ...] 	ri|ma|db
 deembed <file1.SnP>  <file2.SnP> 	ri|ma|db
-"""
+deembed-many <fixture.SnP> <dut1.SnP> <dut2.SnP> ... 	ri|ma|db
+attach	<input.SnP> <cable.s2p>[@1,2] [<adapter.s2p>@3 ...] 	ri|ma|db
+	(ports are 1-based, default for a single 2-port: the side 1 ports 1..N/2)
+""" + snp_assemble.HELP.lstrip("\n") + """convert	<input.SnP|folder> 	ri|ma|db[,...] [--version=1|2] [--out FOLDER]
+	(always one file per format <name>_<format>.SnP - next to the input file, in <folder>/converted for a folder)
+""" + snp_mask.HELP + snp_batch.HELP + snp_watch.HELP + snp_archive.HELP + """
+cache	stats | prune [--max-mb N] | clear
+""" + snp_serve.HELP + """
+Options:
+--no-cache	- parse the input files, don't use/update the parsed-network cache
+--grid=POLICY	- cascade/deembed-many common frequency grid: first (default) | intersection | union | step:<Hz>
+--full-qm	- bisect: always run the full IEEE370 quality check (default: only when the fast pre-screen is marginal)
+--no-daemon	- run in this process even when a `serve` daemon is listening
+--cond		- deembed: save the per-frequency fixture condition number to <output>_cond.csv
+--threads N	- cascade/deembed/mixed-mode: split the frequency axis of large sweeps across N threads
+		  (default: env SNP_THREADS or 1)
+--chunk=N	- cascade/deembed: stream the files in blocks of N frequency points (memory bound by N,
+		  inputs must share one frequency grid and reference resistance, no result cache)
+		  convert: points per block (default 4096)
+""" + snp_plot.HELP + snp_profile.HELP
 # -----------------------------------------------------------------------------
 # Utility helpers
 # -----------------------------------------------------------------------------
 
-def _same_freq(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, rf.Network]:
-	"""Ensure *ntw_b* is on *ntw_a*'s frequency grid."""
-	if ntw_a.frequency != ntw_b.frequency:
-		ntw_b = ntw_b.interpolate(ntw_a.frequency)
-	return ntw_a, ntw_b
+def _common_frequency(ntws: list[rf.Network]) -> rf.Frequency:
+	"""Frequency grid of a multi-file operation according to --grid."""
+	if grid_policy[0] == "first":
+		return ntws[0].frequency
+	return rf.Frequency.from_f(snp_grid.common_grid([ntw.f for ntw in ntws], *grid_policy), unit="hz")
+
+
+def _loss_panels(ntw: rf.Network, masks: tuple = (None, None)) -> list[tuple]:
+	"""Insertion loss and return loss panels: SDD21 / SDD11 of a 4-port, S21 / S11 otherwise.
+
+	Only the two differential terms are computed, not the whole mixed-mode network.
+	"""
+	if snp_plot.mode == "none":
+		return []
+	if (ntw.nports == 4): # for s4p - diff (sdd) terms only
+		with stage("se2gmm"):
+			sdd = snp_linalg.mixed_mode_terms(ntw, ['SDD21', 'SDD11'], p=2)
+		return [snp_plot.trace(ntw.f, sdd[:, 0], 'SDD21', masks[0]),
+				snp_plot.trace(ntw.f, sdd[:, 1], 'SDD11', masks[1])]
+	return [snp_plot.panel(ntw, 1, 0, 'S21', masks[0]),
+			snp_plot.panel(ntw, 0, 0, 'S11', masks[1])]
+
+
+def _report_result(ntw: rf.Network, dst: Path, action: str) -> None:
+	"""Plot differential Insertion Loss and Return loss of a result network."""
+	panels = _loss_panels(ntw)
+	with stage("plot"):
+		snp_plot.report(Path(str(dst)).stem + ".png", dst.name + f" (After {action})", ntw, panels)
+
+
+def _report_summary(summary: rf.Network | None, dst: Path, action: str) -> None:
+	"""_report_result() of a chunked run: *summary* already holds the SDD (or S) 2x2 block."""
+	if summary is None:
+		return
+	diff = dst.suffix.lower() == ".s4p"
+	with stage("plot"):
+		snp_plot.report(dst.stem + ".png", dst.name + f" (After {action})", summary, [
+			snp_plot.panel(summary, 1, 0, 'SDD21' if diff else 'S21'),
+			snp_plot.panel(summary, 0, 0, 'SDD11' if diff else 'S11')])
+
+
+def _report_condition(f: np.ndarray, cond: np.ndarray, csv_file: Path) -> None:
+	"""Print the worst de-embedding condition numbers (and save all of them with --cond)."""
+	worst = int(np.argmax(cond))
+	ill = np.flatnonzero(cond > COND_WARN)
+	print(f"Fixture condition number: max {cond[worst]:.3g} @ {f[worst] / 1e6:.3f} MHz, median {np.median(cond):.3g}")
+	if ill.size:
+		print(f"[WARN] {ill.size} ill-posed point(s) (cond > {COND_WARN:.0e}): "
+			  + ", ".join(f"{f[i] / 1e6:.3f} MHz" for i in ill[:10]) + (" ..." if ill.size > 10 else ""))
+	if write_cond:
+		np.savetxt(csv_file, np.column_stack([f, cond]), delimiter=",", header="freq_hz,cond", comments="")
+		print(f"Condition numbers saved to {csv_file}")
+
+
+def _pop_count(args: list[str], option: str = "--workers") -> int | None:
+	"""Remove '<option> N' from *args* and return N (None if not given)."""
+	if option not in args:
+		return None
+	idx = args.index(option)
+	if idx + 1 >= len(args) or not args[idx + 1].isdigit() or int(args[idx + 1]) < 1:
+		raise ValueError(f"{option} expects a number")
+	count = int(args[idx + 1])
+	del args[idx:idx + 2]
+	return count
+
+
+def _pop_option(args: list[str], option: str, what: str) -> str | None:
+	"""Remove '<option> VALUE' from *args* and return VALUE (None if not given)."""
+	if option not in args:
+		return None
+	idx = args.index(option)
+	if idx + 1 >= len(args):
+		raise ValueError(f"{option} expects {what}")
+	value = args[idx + 1]
+	del args[idx:idx + 2]
+	return value
+
+
+def _pop_seconds(args: list[str], option: str, default: float) -> float:
+	value = _pop_option(args, option, "a number of seconds")
+	try:
+		seconds = float(value) if value is not None else default
+	except ValueError:
+		raise ValueError(f"{option} expects a number of seconds (got {value})") from None
+	if seconds <= 0:
+		raise ValueError(f"{option} expects a positive number of seconds")
+	return seconds
+
+
+def reset_options() -> None:
+	"""Back to the default options - a `serve` worker runs main() many times."""
+	global write_cond, full_qm, grid_policy, chunk_points
+	write_cond, full_qm, grid_policy, chunk_points = False, False, ("first", None), None
+	snp_linalg.threads = max(1, int(os.environ.get("SNP_THREADS", "1")))
+	snp_plot.mode, snp_plot.buckets = "show", snp_plot.PLOT_BUCKETS
+	snp_profile.reset()
+	snp_cache.configure()
+
+
+def _is_SnP_format(arg: str) -> bool:
+	"""True for 'ri', 'ma', 'db' or a comma separated list of them."""
+	return all(form in ("ri", "ma", "db") for form in arg.lower().split(","))
 
 
 
@@ -52,38 +217,24 @@ def create_bisect_network(input_file: Path, SnP_format) -> Path:
 	"""Create a new SnP file as half-value copy of the input file."""
 	# Load the input SnP file
 
-	ntw1 = rf.Network(input_file)
-	ntw2 = ntw1.copy()
-	if (ntw2.nports == 4): # for s4p - change to diff (sdd)
-		ntw2.se2gmm(p=2)
+	with stage("load"):
+		ntw1 = load_network(input_file)
+	if (ntw1.nports == 4): # for s4p - change to diff (sdd)
+		with stage("se2gmm"):
+			ntw2 = snp_linalg.mixed_mode(ntw1, p=2)
 		fig_lable_21 = 'SDD21'
 		fig_lable_11 = 'SDD11'
 	else: # s2p
+		ntw2 = ntw1
 		fig_lable_21 = 'S21'
 		fig_lable_11 = 'S11'
 
 	# plot differential Insertion Loss and Return loss
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(input_file.name)
-	ntw2.frequency.unit = 'mhz'
-	
-	plt.subplot(1, 2, 1)
-	ntw2.s21.plot_s_db(label = fig_lable_21)
-	MaskFreq = ntw2.frequency.f
-	MaskVal = [-15]*len(MaskFreq)
-	plt.plot(MaskFreq, MaskVal, '--', label='IEEE370 FER1 Mask (Min)')
-	plt.legend()
-	plt.grid()
-
-	plt.subplot(1, 2, 2)
-	ntw2.s11.plot_s_db(label = fig_lable_11)
-	MaskFreq = ntw2.frequency.f
-	MaskVal = [-10]*len(MaskFreq)
-	plt.plot(MaskFreq, MaskVal, '--', label='IEEE370 FER2 Mask (Max)')
-	plt.legend()    
-	plt.grid()
-	
-	plt.savefig(Path(input_file.name).stem + ".png") # The ".stem" remove initial and file extention and leave only file name
+	png_file = Path(input_file.name).stem + ".png" # The ".stem" remove initial and file extention and leave only file name
+	with stage("plot"):
+		snp_plot.report(png_file, input_file.name, ntw2, [
+			snp_plot.panel(ntw2, 1, 0, fig_lable_21, ('IEEE370 FER1 Mask (Min)', -15)),
+			snp_plot.panel(ntw2, 0, 0, fig_lable_11, ('IEEE370 FER2 Mask (Max)', -10))])
 
 	
 	# *********************************************************************************************************************************************************
@@ -91,27 +242,13 @@ def create_bisect_network(input_file: Path, SnP_format) -> Path:
 	# This input Network is a Fixture-DUT-Fixture - Need to check it complies with the IEEE370 before we do the bisect
 	print ("==============================================================")
 	print ("Checking Input Network: causality, passivity, reciprocity")
-	fd_qm = rf.IEEEP370_FD_QM()
 	print("Net Name: " + ntw2.name)
 	
-	MM_Pass_Criteria = 95
-	if (ntw2.nports == 4): # for s4p - change to diff (sdd)
-		qm_fdf = fd_qm.check_mm_quality(ntw2)
-		fd_qm.print_qm(qm_fdf)
-		dd_causality 	= float(qm_fdf['dd']['causality']['value'])
-		dd_passivity 	= float(qm_fdf['dd']['passivity']['value'])
-		dd_reciprocity 	= float(qm_fdf['dd']['reciprocity']['value'])
-		cc_causality 	= float(qm_fdf['cc']['causality']['value'])
-		cc_passivity 	= float(qm_fdf['cc']['passivity']['value'])
-		cc_reciprocity 	= float(qm_fdf['cc']['reciprocity']['value'])
-		check_result    = (dd_causality >= MM_Pass_Criteria) and (dd_passivity >= MM_Pass_Criteria) and (dd_reciprocity >= MM_Pass_Criteria) and (cc_causality >= MM_Pass_Criteria) and (cc_passivity >= MM_Pass_Criteria) and (cc_reciprocity >= MM_Pass_Criteria)
-	else: # s2p
-		qm_fdf = fd_qm.check_se_quality(ntw2)
-		fd_qm.print_qm(qm_fdf)
-		cc_causality 	= float(qm_fdf['causality']['value'])
-		cc_passivity 	= float(qm_fdf['passivity']['value'])
-		cc_reciprocity 	= float(qm_fdf['reciprocity']['value'])
-		check_result    = (cc_causality >= MM_Pass_Criteria) and (cc_passivity >= MM_Pass_Criteria) and (cc_reciprocity >= MM_Pass_Criteria)
+	MM_Pass_Criteria = snp_quality.MM_PASS_CRITERIA
+	with stage("quality"):
+		check_result, qm_fdf, qm_tier = snp_quality.gate(ntw2, MM_Pass_Criteria, full=full_qm)
+	snp_quality.print_qm(qm_fdf)
+	print(f"(IEEE370 check: {qm_tier})")
 	
 	print ("==============================================================")
 	if check_result == False:
@@ -125,152 +262,443 @@ def create_bisect_network(input_file: Path, SnP_format) -> Path:
 	# *********************************************************************************************************************************************************
 
 
-	# Create a new network with half values (bisection algorithm)
-	if (ntw1.nports == 4): # s4p
-		dm = rf.IEEEP370_MM_NZC_2xThru(dummy_2xthru = ntw1, z0 = 50, name = '2xthru')
-	else: # s2p
-		
-		dm = rf.IEEEP370_SE_NZC_2xThru(dummy_2xthru = ntw1, z0 = 50, name = '2xthru')
-		
-	fix1 = dm.se_side1
-	fix1.name = 'thru'
+	# Create a new network with half values (bisection algorithm) - or reuse the stored result
+	result_key = snp_results.result_key("bisect", [input_file], {"z0": 50})
+	with stage("result cache"):
+		fix1 = snp_results.load(result_key)
+	if fix1 is not None:
+		print("[cache] bisect result reused")
+	else:
+		with stage("2xthru"):
+			if (ntw1.nports == 4): # s4p
+				dm = rf.IEEEP370_MM_NZC_2xThru(dummy_2xthru = ntw1, z0 = 50, name = '2xthru')
+			else: # s2p
+				
+				dm = rf.IEEEP370_SE_NZC_2xThru(dummy_2xthru = ntw1, z0 = 50, name = '2xthru')
+				
+			fix1 = dm.se_side1
+		fix1.name = 'thru'
+		with stage("result cache"):
+			snp_results.store(result_key, "bisect", fix1)
 	
-	mm_side1 = fix1.copy()
-	if (mm_side1.nports == 4): # for s4p - change to diff (sdd)
-		mm_side1.se2gmm(p=2)
-		fig_lable_21 = 'SDD21'
-		fig_lable_11 = 'SDD11'
-	else: # s2p
-		fig_lable_21 = 'S21'
-		fig_lable_11 = 'S11'
-
-
 	dst_file = input_file.with_stem(input_file.stem + "_bisect")
 
-	# plot differential Insertion Loss and Return loss of half #1
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(dst_file.name + " (After Bisect)")
-	mm_side1.frequency.unit = 'mhz'
-
-	plt.subplot(1, 2, 1)
-	mm_side1.s21.plot_s_db(label = fig_lable_21)
-	plt.legend()
-	plt.grid()
-	
-	plt.subplot(1, 2, 2)
-	mm_side1.s11.plot_s_db(label = fig_lable_11)	
-	plt.legend()
-	plt.grid()
-	
-	plt.savefig(Path(dst_file.name).stem + ".png") # The ".stem" remove initial and file extention and leave only file name
-	
-	plt.show()
-	
 	# save 4-port S-parameters of one half
-	fix1.write_touchstone(dst_file, form=SnP_format)
+	with stage("write"):
+		snp_results.write(result_key, fix1, dst_file, SnP_format)
+
+	# plot differential Insertion Loss and Return loss of half #1
+	panels = _loss_panels(fix1)
+	with stage("plot"):
+		snp_plot.report(Path(dst_file.name).stem + ".png", dst_file.name + " (After Bisect)", fix1, panels)
+	snp_plot.show()
 
 
 
 # Function takes two snp network cascade them together to perform an overall SnP network
 def create_cascade_network(Net_file1: Path, Net_file2: Path, SnP_format) -> None:
-	ntw_a, ntw_b = map(rf.Network, (str(Net_file1), str(Net_file2)))
-	if (ntw_a.nports != ntw_b.nports):
-		print ("The 2 files doesn't have the same number of ports - existing")
-		return
-	
-	if (ntw_a.nports == 4): # for s4p - change to diff (sdd)
-		dst = app_dir / f"{Net_file1.stem}_{Net_file2.stem}_cascade.s4p"
-	else: #2sp
-		dst = app_dir / f"{Net_file1.stem}_{Net_file2.stem}_cascade.s2p"
-		
-	ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
-	ntw_cascade = ntw_a ** ntw_b
-	ntw_cascade.write_touchstone(str(dst), form=SnP_format)
+	create_cascade_networks([Net_file1, Net_file2], SnP_format)
 
-	ntw_cascade2 = ntw_cascade.copy()
-	if (ntw_a.nports == 4): # for s4p - change to diff (sdd)
-		ntw_cascade2.se2gmm(p=2)
-		fig_lable_21 = 'SDD21'
-		fig_lable_11 = 'SDD11'
-	else: # s2p
-		fig_lable_21 = 'S21'
-		fig_lable_11 = 'S11'
 
-	# plot differential Insertion Loss and Return loss
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(dst.name + " (After Cascading)")
-	ntw_cascade2.frequency.unit = 'mhz'
-	
-	plt.subplot(1, 2, 1)
-	ntw_cascade2.s21.plot_s_db(label = fig_lable_21)
-	plt.legend()
-	plt.grid()
-
-	# plot differential insertion loss of one half
-	plt.subplot(1, 2, 2)
-	ntw_cascade2.s11.plot_s_db(label = fig_lable_11)	
-	plt.legend()
-	plt.grid()
-
-	plt.savefig(Path(str(dst)).stem + ".png") # The ".stem" remove initial and file extention and leave only file name
-	
-	plt.show()
+
+# Function takes a chain of snp networks (2-port and/or N-port) and cascades all of them in memory
+def create_cascade_networks(Net_files: list[Path], SnP_format) -> None:
+	if chunk_points:
+		return _create_cascade_chunked(Net_files, SnP_format)
+	result_key = snp_results.result_key("cascade", Net_files, {"grid": grid_policy})
+	with stage("result cache"):
+		ntw_cascade = snp_results.load(result_key)
+	if ntw_cascade is not None:
+		print("[cache] cascade result reused")
+	else:
+		ntw_cascade = _cascade_chain(Net_files)
+		with stage("result cache"):
+			snp_results.store(result_key, "cascade", ntw_cascade)
+
+	# named after this call's inputs: a stored result may come from same-content files of other names
+	ntw_cascade.name = "_".join(p.stem for p in Net_files) + "_cascade"
+	dst = app_dir / f"{ntw_cascade.name}.s{ntw_cascade.nports}p"
+	with stage("write"):
+		outputs = snp_results.write(result_key, ntw_cascade, dst, SnP_format)
+	print(f"[OK] {' ** '.join(p.name for p in Net_files)} → {', '.join(map(str, outputs.values()))}")
+
+	_report_result(ntw_cascade, dst, "Cascading")
+	snp_plot.show()
+
+
+
+def _create_cascade_chunked(Net_files: list[Path], SnP_format) -> None:
+	dst = app_dir / ("_".join(p.stem for p in Net_files) + "_cascade")
+	with stage("chunked cascade"):
+		outputs, points, summary = snp_chunked.cascade_files(Net_files, dst, SnP_format, chunk_points,
+															 summary=snp_plot.mode != "none")
+	print(f"[OK] {' ** '.join(p.name for p in Net_files)} → {', '.join(map(str, outputs.values()))}"
+		  f" ({points} points in blocks of {chunk_points})")
+	_report_summary(summary, next(iter(outputs.values())), "Cascading")
+	snp_plot.show()
+
+
+def _cascade_chain(Net_files: list[Path]) -> rf.Network:
+	with stage("load"):
+		ntw_all = [load_network(p) for p in Net_files]
+	nports = max(ntw.nports for ntw in ntw_all)
+	for Net_file, ntw in zip(Net_files, ntw_all):
+		if ntw.nports not in (2, nports):
+			raise ValueError(f"{Net_file.name} has {ntw.nports} ports, expected 2 or {nports} - existing")
+
+	name = "_".join(p.stem for p in Net_files) + "_cascade"
+
+	# every segment on the common grid, 2-ports placed on each line of an N-port chain
+	segments = []
+	with stage("align"):
+		ntw_all = snp_grid.align_many(ntw_all, _common_frequency(ntw_all))
+	for ntw in ntw_all:
+		if ntw.nports != nports:
+			ntw = rf.Network(frequency=ntw.frequency, name=ntw.name,
+							 s=snp_linalg.promote_2port(ntw.s, nports),
+							 z0=np.repeat(ntw.z0, nports // 2, axis=1))
+		segments.append(ntw)
+
+	z0 = segments[0].z0
+	if all(np.array_equal(ntw.z0, z0) for ntw in segments):
+		with stage("cascade"):
+			s = snp_linalg.cascade_s(np.stack([ntw.s for ntw in segments]))
+		return rf.Network(frequency=segments[0].frequency, s=s, z0=z0, name=name)
+	# mixed reference impedances - let skrf renormalize at each connection
+	ntw_cascade = segments[0]
+	with stage("cascade"):
+		for ntw in segments[1:]:
+			ntw_cascade = ntw_cascade ** ntw
+	ntw_cascade.name = name
+	return ntw_cascade
 
 
 
 # Function takes the overall SnP network and partial SnP network get the reminder SnP of this netwrok
 def create_deembeded_network(Total_Net_file: Path, Partial_Net_file: Path, SnP_format) -> None:
-	ntw_a, ntw_b = map(rf.Network, (str(Total_Net_file), str(Partial_Net_file)))
-	if (ntw_a.nports != ntw_b.nports):
-		print ("The 2 files doesn't have the same number of ports - existing")
-		return
-		
-	if (ntw_a.nports == 4): # for s4p - change to diff (sdd)
-		dst = app_dir / f"{Total_Net_file.stem}_{Partial_Net_file.stem}_deembed.s4p"
-	else: #2sp
-		dst = app_dir / f"{Total_Net_file.stem}_{Partial_Net_file.stem}_deembed.s2p"
+	if chunk_points:
+		return _create_deembeded_chunked(Total_Net_file, Partial_Net_file, SnP_format)
+	result_key = snp_results.result_key("deembed", [Total_Net_file, Partial_Net_file])
+	with stage("result cache"):
+		ntw_deembed = snp_results.load(result_key)
+	if ntw_deembed is not None:
+		print("[cache] deembed result reused")
+		cond = snp_results.load_cond(result_key)
+	else:
+		with stage("load"):
+			ntw_a, ntw_b = map(load_network, (Total_Net_file, Partial_Net_file))
+		if (ntw_a.nports != ntw_b.nports):
+			raise ValueError("The 2 files doesn't have the same number of ports - existing")
 
+		with stage("align"):
+			ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
+		with stage("deembed"):
+			ntw_deembed, cond = snp_linalg.deembed_network(ntw_a, ntw_b)
+		with stage("result cache"):
+			snp_results.store(result_key, "deembed", ntw_deembed, cond)
 
-	ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
-	ntw_deembed = ntw_a ** ntw_b.inv
-	ntw_deembed.write_touchstone(str(dst), form=SnP_format)
+	# named after this call's inputs: a stored result may come from same-content files of other names
+	dst = app_dir / f"{Total_Net_file.stem}_{Partial_Net_file.stem}_deembed.s{ntw_deembed.nports}p"
+	ntw_deembed.name = dst.stem
+	if cond is not None:
+		_report_condition(ntw_deembed.f, cond, dst.with_name(dst.stem + "_cond.csv"))
+	with stage("write"):
+		snp_results.write(result_key, ntw_deembed, dst, SnP_format)
 
-	ntw_deembed2 = ntw_deembed.copy()
-	if (ntw_a.nports == 4): # for s4p - change to diff (sdd)
-		ntw_deembed2.se2gmm(p=2)
-		fig_lable_21 = 'SDD21'
-		fig_lable_11 = 'SDD11'
-	else: # s2p
-		fig_lable_21 = 'S21'
-		fig_lable_11 = 'S11'
+	_report_result(ntw_deembed, dst, "De-Embedding")
+	snp_plot.show()
 
-	# plot differential Insertion Loss and Return loss
-	plt.figure(figsize=(10, 5)) 
-	plt.suptitle(dst.name + " (After De-Embedding)")
-	ntw_deembed2.frequency.unit = 'mhz'
-	
-	plt.subplot(1, 2, 1)
-	ntw_deembed2.s21.plot_s_db(label = fig_lable_21)
-	plt.legend()
-	plt.grid()
 
-	plt.subplot(1, 2, 2)
-	ntw_deembed2.s11.plot_s_db(label = fig_lable_11)	
-	plt.legend()
-	plt.grid()
+def _create_deembeded_chunked(Total_Net_file: Path, Partial_Net_file: Path, SnP_format) -> None:
+	dst = app_dir / f"{Total_Net_file.stem}_{Partial_Net_file.stem}_deembed"
+	with stage("chunked deembed"):
+		outputs, f, cond, summary = snp_chunked.deembed_files(Total_Net_file, Partial_Net_file, dst, SnP_format,
+															  chunk_points, summary=snp_plot.mode != "none")
+	first = next(iter(outputs.values()))
+	print(f"[OK] {Total_Net_file.name} - {Partial_Net_file.name} → {', '.join(map(str, outputs.values()))}"
+		  f" ({len(f)} points in blocks of {chunk_points})")
+	_report_condition(f, cond, first.with_name(first.stem + "_cond.csv"))
+	_report_summary(summary, first, "De-Embedding")
+	snp_plot.show()
 
-	plt.savefig(Path(str(dst)).stem + ".png") # The ".stem" remove initial and file extention and leave only file name
-	
-	plt.show()
+
+# Function takes one partial SnP network (fixture) and de-embeds it from many overall SnP networks at once
+def create_deembeded_networks(Partial_Net_file: Path, Total_Net_files: list[Path], SnP_format) -> None:
+	# a DUT de-embedded before (alone or in another deembed-many run) is reused; off the
+	# 'first' policy the common grid spans every DUT of the run, so the key holds all of them
+	if grid_policy[0] == "first":
+		params = {}
+	else:
+		params = {"grid": grid_policy,
+				  "run": sorted(snp_cache.file_digest(p) for p in Total_Net_files) if snp_cache.enabled else None}
+	keys = [snp_results.result_key("deembed", [p, Partial_Net_file], params) for p in Total_Net_files]
+	with stage("result cache"):
+		results = [snp_results.load(key) for key in keys]
+	todo = [idx for idx, ntw in enumerate(results) if ntw is None]
+	reported = set()        # grids whose condition numbers were printed
+	if len(todo) < len(results):
+		print(f"[cache] {len(results) - len(todo)} deembed result(s) reused")
+		for idx, ntw in enumerate(results):
+			cond = snp_results.load_cond(keys[idx]) if ntw is not None else None
+			if cond is not None and ntw.f.tobytes() not in reported:
+				reported.add(ntw.f.tobytes())
+				_report_condition(ntw.f, cond, app_dir / f"{Partial_Net_file.stem}_{len(ntw.f)}pts_cond.csv")
+
+	if todo:
+		with stage("load"):
+			ntw_b = load_network(Partial_Net_file)
+			ntw_all = {idx: load_network(Total_Net_files[idx]) for idx in todo}
+		for idx, ntw_a in ntw_all.items():
+			if (ntw_a.nports != ntw_b.nports):
+				raise ValueError(f"{Total_Net_files[idx].name} and {Partial_Net_file.name} don't have the same number of ports - existing")
+
+		if grid_policy[0] != "first":
+			# the common grid spans every DUT of the run, stored or not
+			frequency = _common_frequency([ntw_b] + [ntw_all.get(idx) or results[idx] for idx in range(len(results))])
+			with stage("align"):
+				ntw_all = dict(zip(todo, snp_grid.align_many(list(ntw_all.values()), frequency)))
+
+		# group the overall networks by frequency grid: the partial network is
+		# aligned once per grid, its group de-embedded in one batched solve
+		groups = {}
+		for idx, ntw_a in ntw_all.items():
+			groups.setdefault(ntw_a.f.tobytes(), []).append(idx)
+
+		for idxs in groups.values():
+			with stage("align"):
+				_, ntw_fix = same_freq(ntw_all[idxs[0]], ntw_b)
+			cond = None
+			if any(not np.array_equal(ntw_all[idx].z0, ntw_fix.z0) for idx in idxs):
+				with stage("deembed"):
+					s_deembed = [(ntw_all[idx] ** ntw_fix.inv).s for idx in idxs]
+			else:
+				s_stack = np.stack([ntw_all[idx].s for idx in idxs])
+				with stage("deembed"):
+					s_deembed, cond = snp_linalg.deembed_solve(s_stack, ntw_fix.s)
+				if ntw_fix.f.tobytes() not in reported:
+					reported.add(ntw_fix.f.tobytes())
+					_report_condition(ntw_fix.f, cond, app_dir / f"{Partial_Net_file.stem}_{len(ntw_fix.f)}pts_cond.csv")
+
+			for idx, s_out in zip(idxs, s_deembed):
+				ntw_a = ntw_all[idx]
+				name = f"{Total_Net_files[idx].stem}_{Partial_Net_file.stem}_deembed"
+				results[idx] = rf.Network(frequency=ntw_a.frequency, s=s_out, z0=ntw_a.z0, name=name)
+				with stage("result cache"):
+					snp_results.store(keys[idx], "deembed", results[idx], cond)
+
+	for Total_Net_file, key, ntw_deembed in zip(Total_Net_files, keys, results):
+		# named after this call's inputs: a stored result may come from same-content files of other names
+		ntw_deembed.name = f"{Total_Net_file.stem}_{Partial_Net_file.stem}_deembed"
+		dst = app_dir / f"{ntw_deembed.name}.s{ntw_deembed.nports}p"
+		with stage("write"):
+			outputs = snp_results.write(key, ntw_deembed, dst, SnP_format)
+		print(f"[OK] {Total_Net_file.name} - {Partial_Net_file.name} → {', '.join(map(str, outputs.values()))}")
+		_report_result(ntw_deembed, dst, "De-Embedding")
+
+	snp_plot.show()
+
+
+# Function connects 2-port networks (cables, adapters) onto selected ports of an N-port network
+def create_attached_network(Net_file: Path, attachments: list[tuple[Path, list[int] | None]], SnP_format) -> None:
+	"""*attachments* holds (2-port file, 0-based ports) pairs; ports None = side 1 of the network."""
+	params = {"ports": [ports for _, ports in attachments]}
+	result_key = snp_results.result_key("attach", [Net_file] + [p for p, _ in attachments], params)
+	with stage("result cache"):
+		ntw_attach = snp_results.load(result_key)
+	if ntw_attach is not None:
+		print("[cache] attach result reused")
+	else:
+		ntw_attach = _attach(Net_file, attachments)
+		with stage("result cache"):
+			snp_results.store(result_key, "attach", ntw_attach)
+
+	# named after this call's inputs: a stored result may come from same-content files of other names
+	ntw_attach.name = f"{Net_file.stem}_attach"
+	dst = app_dir / f"{ntw_attach.name}.s{ntw_attach.nports}p"
+	with stage("write"):
+		outputs = snp_results.write(result_key, ntw_attach, dst, SnP_format)
+	print(f"[OK] {Net_file.name} + {', '.join(p.name for p, _ in attachments)} → {', '.join(map(str, outputs.values()))}")
+
+	_report_result(ntw_attach, dst, "Attaching")
+	snp_plot.show()
+
+
+def _attach(Net_file: Path, attachments: list[tuple[Path, list[int] | None]]) -> rf.Network:
+	with stage("load"):
+		ntw = load_network(Net_file)
+		twoports = [load_network(p) for p, _ in attachments]
+
+	ports, segments = [], []
+	for (path, on), twoport in zip(attachments, twoports):
+		if twoport.nports != 2:
+			raise ValueError(f"{path.name} has {twoport.nports} ports, only 2-ports can be attached - existing")
+		on = list(range(ntw.nports // 2)) if on is None else on
+		for port in on:
+			if not 0 <= port < ntw.nports:
+				raise ValueError(f"{Net_file.name} has no port {port + 1} - existing")
+			if port in ports:
+				raise ValueError(f"Port {port + 1} of {Net_file.name} is given more than one 2-port - existing")
+			ports.append(port)
+			with stage("align"):
+				segments.append(same_freq(ntw, twoport)[1])
+
+	name = f"{Net_file.stem}_attach"
+	z0 = ntw.z0.flat[0]
+	if np.all(ntw.z0 == z0) and all(np.all(seg.z0 == z0) for seg in segments):
+		with stage("attach"):
+			s = snp_linalg.attach_s(ntw.s, ports, np.stack([seg.s for seg in segments]))
+		return rf.Network(frequency=ntw.frequency, s=s, z0=ntw.z0, name=name)
+
+	# mixed reference impedances - let rf.Circuit renormalize the connections
+	with stage("attach"):
+		freq = ntw.frequency
+		connections = []
+		for port in range(ntw.nports):
+			ext = rf.Circuit.Port(freq, name=f"port{port + 1}", z0=ntw.z0[0, port])
+			if port in ports:
+				seg = segments[ports.index(port)].copy()
+				seg.name = f"{seg.name}_{port + 1}"
+				connections += [[(ext, 0), (seg, 0)], [(seg, 1), (ntw, port)]]
+			else:
+				connections.append([(ext, 0), (ntw, port)])
+		ntw_attach = rf.Circuit(connections).network
+	ntw_attach.name = name
+	return ntw_attach
+
+
+def _attachment(arg: str) -> tuple[Path, list[int] | None]:
+	"""'cable.s2p@1,2' -> (Path('cable.s2p'), [0, 1]); no '@': (path, None)."""
+	path, sep, ports = arg.rpartition("@")
+	if not sep:
+		return Path(arg), None
+	try:
+		ports = [int(p) - 1 for p in ports.split(",")]
+	except ValueError:
+		raise ValueError(f"Bad port list in {arg} (expected e.g. cable.s2p@1,2)") from None
+	if not ports or min(ports) < 0:
+		raise ValueError(f"Bad port list in {arg} (ports are 1-based)")
+	return Path(path), ports
+
+
+# Function builds an N-port SnP network from the 2-port files of its port pairs
+def create_assembled_network(Pair_files: list[Path], nports: int, dst: Path, SnP_format, sep: str = "",
+							 workers: int | None = None) -> None:
+	# the ports come from the file names, which the content digests don't see
+	params = {"nports": nports, "sep": sep, "grid": grid_policy,
+			  "pairs": [snp_assemble.pair_ports(p, sep) for p in Pair_files]}
+	result_key = snp_results.result_key("assemble", Pair_files, params)
+	with stage("result cache"):
+		ntw = snp_results.load(result_key)
+	if ntw is not None:
+		print("[cache] assemble result reused")
+		ntw.name = dst.stem
+	else:
+		with stage("assemble"):
+			f, s, z0, missing = snp_assemble.assemble(Pair_files, nports, sep, workers, grid_policy)
+		if missing:
+			print(f"[WARN] {len(missing)} port pair(s) not measured, left at 0: "
+				  + ", ".join(f"{a}-{b}" for a, b in missing[:10]) + (" ..." if len(missing) > 10 else ""))
+		ntw = rf.Network(frequency=rf.Frequency.from_f(f, unit="hz"), s=s, z0=z0, name=dst.stem)
+		with stage("result cache"):
+			snp_results.store(result_key, "assemble", ntw)
+
+	with stage("write"):
+		outputs = snp_results.write(result_key, ntw, dst, SnP_format)
+	print(f"[OK] {len(Pair_files)} 2-port file(s) → {', '.join(map(str, outputs.values()))}")
+
+	_report_result(ntw, dst, "Assembling")
+	snp_plot.show()
+
+
+# Function rewrites SnP files in other formats / Touchstone version, block by block
+def create_converted_networks(inputs: list[Path], out_dir: Path | None, SnP_format, version: str) -> bool:
+	"""Convert every file of *inputs*; a failing file is reported and skipped. Returns True if all passed."""
+	ok = True
+	for src in inputs:
+		dst_dir = out_dir or src.parent
+		try:
+			with stage("convert"):
+				outputs, points = snp_chunked.convert_file(src, dst_dir, SnP_format, version,
+														   chunk_points or snp_chunked.CHUNK_POINTS)
+		except (ValueError, NotImplementedError, OSError) as err:
+			print(f"[FAIL] {src}: {err}")
+			ok = False
+			continue
+		print(f"[OK] {src} → {', '.join(map(str, outputs.values()))} ({points} points, v{version})")
+	return ok
+
+
+def _touchstone_files(folder: Path) -> list[Path]:
+	"""Touchstone files (.sNp, .ts) directly inside *folder*."""
+	return sorted(p for p in folder.iterdir()
+				  if p.is_file() and (p.suffix.lower() == ".ts" or re.fullmatch(r"\.s\d+p", p.suffix.lower())))
 
 
 # ---------------------------------------------------------------------------
 # CLI entry‑point
 # ---------------------------------------------------------------------------
 def main(argv: list[str] | None = None) -> None:
+	global write_cond, grid_policy, full_qm, chunk_points
 	if not argv or argv[0] in ("-h", "--help"):
 		print(HELP); sys.exit(0)
 
+	try:
+		argv = snp_plot.parse_plot_option(argv)
+		argv = snp_profile.parse_profile_option(argv)
+	except ValueError as err:
+		print(err)
+		print(HELP)
+		sys.exit(1)
+
+	if "--no-cache" in argv:
+		snp_cache.enabled = False
+		argv = [a for a in argv if a != "--no-cache"]
+
+	for arg in [a for a in argv if a.startswith("--grid=")]:
+		try:
+			grid_policy = snp_grid.parse_policy(arg.split("=", 1)[1])
+		except ValueError as err:
+			print(err)
+			print(HELP)
+			sys.exit(1)
+		argv.remove(arg)
+
+	for arg in [a for a in argv if a.startswith("--chunk=")]:
+		value = arg.split("=", 1)[1]
+		if not value.isdigit() or int(value) < 1:
+			print(f"--chunk expects a number of frequency points (got {value})")
+			print(HELP)
+			sys.exit(1)
+		chunk_points = int(value)
+		argv.remove(arg)
+
+	try:
+		threads = _pop_count(argv, "--threads")
+	except ValueError as err:
+		print(err)
+		print(HELP)
+		sys.exit(1)
+	if threads:
+		snp_linalg.threads = threads
+
+	if "--full-qm" in argv:
+		full_qm = True
+		argv = [a for a in argv if a != "--full-qm"]
+
+	if "--cond" in argv:
+		write_cond = True
+		argv = [a for a in argv if a != "--cond"]
+
+	if "--no-daemon" in argv:
+		snp_serve.enabled = False
+		argv = [a for a in argv if a != "--no-daemon"]
+
+	if not argv:            # only options were given
+		print("No operation given")
+		print(HELP)
+		sys.exit(1)
+	if argv[0] in ("-h", "--help"):
+		print(HELP); sys.exit(0)
 	op, *args = argv
 	op = op.lower()
 
@@ -287,12 +715,11 @@ def main(argv: list[str] | None = None) -> None:
 		# cascade
 		# ------------------------------------------------------------------
 		elif op == "cascade":
-			if not 2 <= len(args) <= 3:
-				raise ValueError(f"cascade expects: <fileA.SnP> <fileB.SnP> ri|ma|db")
-			
-			Net_file1, Net_file2 = map(Path, args[:2])
-			SnP_format = args[2] if len(args) == 3 else 'ri'
-			create_cascade_network(Net_file1, Net_file2, SnP_format)
+			SnP_format = args.pop() if args and _is_SnP_format(args[-1]) else 'ri'
+			if len(args) < 2:
+				raise ValueError("cascade expects: <fileA.SnP> <fileB.SnP> [<fileC.SnP> ...] ri|ma|db")
+
+			create_cascade_networks(list(map(Path, args)), SnP_format)
 			
 			
 		# ------------------------------------------------------------------
@@ -306,6 +733,328 @@ def main(argv: list[str] | None = None) -> None:
 			SnP_format = args[2] if len(args) == 3 else 'ri'
 			create_deembeded_network(Total_Net_file, Partial_Net_file, SnP_format)
 
+		# ------------------------------------------------------------------
+		# deembed-many
+		# ------------------------------------------------------------------
+		elif op == "deembed-many":
+			SnP_format = args.pop() if args and _is_SnP_format(args[-1]) else 'ri'
+			if len(args) < 2:
+				raise ValueError("deembed-many expects: <fixture.SnP> <dut1.SnP> [<dut2.SnP> ...] ri|ma|db")
+
+			Partial_Net_file, *Total_Net_files = map(Path, args)
+			create_deembeded_networks(Partial_Net_file, Total_Net_files, SnP_format)
+
+		# ------------------------------------------------------------------
+		# attach
+		# ------------------------------------------------------------------
+		elif op == "attach":
+			SnP_format = args.pop() if len(args) > 2 and _is_SnP_format(args[-1]) else 'ri'
+			if len(args) < 2:
+				raise ValueError("attach expects: <input.SnP> <cable.s2p>[@1,2] [<adapter.s2p>@3 ...] ri|ma|db")
+
+			attachments = [_attachment(arg) for arg in args[1:]]
+			if len(attachments) > 1 and any(ports is None for _, ports in attachments):
+				raise ValueError("attach: give the ports of every 2-port (file.s2p@1,2) when attaching several")
+			create_attached_network(Path(args[0]), attachments, SnP_format)
+
+		# ------------------------------------------------------------------
+		# assemble
+		# ------------------------------------------------------------------
+		elif op == "assemble":
+			nports = _pop_count(args, "--ports")
+			workers = _pop_count(args)
+			sep = ""
+			if "--sep" in args:
+				idx = args.index("--sep")
+				if idx + 1 >= len(args):
+					raise ValueError("--sep expects a separator")
+				sep = args[idx + 1]
+				del args[idx:idx + 2]
+			SnP_format = args.pop() if len(args) > 1 and _is_SnP_format(args[-1]) else 'ri'
+			if not args or not nports:
+				raise ValueError("assemble expects: <folder|S21.s2p S31.s2p ...> --ports N ri|ma|db")
+
+			if len(args) == 1 and Path(args[0]).is_dir():
+				folder = Path(args[0])
+				Pair_files = sorted(folder.glob("*.[sS]2[pP]"))
+				if not Pair_files:
+					raise FileNotFoundError(f"No .s2p files in {folder}")
+				name = f"{folder.resolve().name}_assemble"
+			else:
+				Pair_files = list(map(Path, args))
+				name = "assemble"
+			for p in Pair_files:
+				if not p.is_file():
+					raise FileNotFoundError(f"No such file: {p}")
+			create_assembled_network(Pair_files, nports, app_dir / f"{name}.s{nports}p", SnP_format, sep, workers)
+
+		# ------------------------------------------------------------------
+		# convert
+		# ------------------------------------------------------------------
+		elif op == "convert":
+			version = "1.0"
+			for arg in [a for a in args if a.startswith("--version=")]:
+				value = arg.split("=", 1)[1]
+				version = {"1": "1.0", "1.0": "1.0", "2": "2.0", "2.0": "2.0"}.get(value)
+				if version is None:
+					raise ValueError(f"--version expects 1 or 2 (got {value})")
+				args.remove(arg)
+			out_dir = None
+			if "--out" in args:
+				idx = args.index("--out")
+				if idx + 1 >= len(args):
+					raise ValueError("--out expects a folder")
+				out_dir = Path(args[idx + 1])
+				del args[idx:idx + 2]
+			SnP_format = args.pop() if len(args) > 1 and _is_SnP_format(args[-1]) else 'ri'
+			if len(args) != 1:
+				raise ValueError("convert expects: <input.SnP|folder> ri|ma|db[,...] [--version=1|2] [--out FOLDER]")
+
+			src = Path(args[0])
+			if src.is_dir():
+				inputs = _touchstone_files(src)
+				if not inputs:
+					raise FileNotFoundError(f"No SnP files in {src}")
+				out_dir = out_dir or src / "converted"
+			elif src.is_file():
+				inputs = [src]
+			else:
+				raise FileNotFoundError(f"No such file or folder: {src}")
+			if out_dir:
+				out_dir.mkdir(parents=True, exist_ok=True)
+			if not create_converted_networks(inputs, out_dir, SnP_format, version):
+				sys.exit(1)
+
+		# ------------------------------------------------------------------
+		# check
+		# ------------------------------------------------------------------
+		elif op == "check":
+			options = {}
+			for option in ("--mask", "--out"):
+				if option in args:
+					idx = args.index(option)
+					if idx + 1 >= len(args):
+						raise ValueError(f"{option} expects a file")
+					options[option] = Path(args[idx + 1])
+					del args[idx:idx + 2]
+			if not args:
+				raise ValueError("check expects: <file1.SnP> [<file2.SnP> ...] [--mask masks.json|csv] [--out report.csv|json]")
+
+			masks = snp_mask.load_masks(options.get("--mask"))
+			with stage("check"):
+				results = snp_mask.check_files(list(map(Path, args)), masks)
+			snp_mask.print_results(results)
+			if "--out" in options:
+				snp_mask.save_results(results, options["--out"])
+				print(f"Report saved to {options['--out']}")
+			failed = sum(1 for r in results if r["status"] in ("FAIL", "ERROR"))
+			print(f"{len(results) - failed} mask result(s) OK, {failed} failed")
+			if failed:
+				sys.exit(1)
+
+		# ------------------------------------------------------------------
+		# batch
+		# ------------------------------------------------------------------
+		elif op == "batch":
+			workers = _pop_count(args)
+			if not args:
+				raise ValueError("batch expects: <manifest.csv|json> or <glob> <op> [files] ri|ma|db")
+
+			if len(args) == 1:
+				manifest = Path(args[0])
+				if not manifest.is_file():
+					raise FileNotFoundError(f"No such manifest: {manifest}")
+				jobs = snp_batch.load_manifest(manifest)
+			else:
+				pattern, batch_op, *rest = args
+				SnP_format = rest.pop() if rest and _is_SnP_format(rest[-1]) else 'ri'
+				jobs = snp_batch.jobs_from_glob(pattern, batch_op, rest, SnP_format)
+
+			if snp_batch.run_batch(jobs, workers):
+				sys.exit(1)
+
+		# ------------------------------------------------------------------
+		# watch
+		# ------------------------------------------------------------------
+		elif op == "watch":
+			config_file = _pop_option(args, "--config", "a JSON file")
+			config = snp_watch.load_config(Path(config_file)) if config_file else {}
+			workers = _pop_count(args)
+			interval = _pop_seconds(args, "--interval", snp_watch.POLL_INTERVAL)
+			settle = _pop_seconds(args, "--settle", snp_watch.SETTLE_TIME)
+			options = {name: _pop_option(args, f"--{name}", what) for name, what in
+					   (("fixture", "a SnP file"), ("mask", "a mask file"), ("convert", "formats"), ("out", "a folder"))}
+			flags = {flag: flag in args for flag in ("--quality", "--check", "--once")}
+			args = [a for a in args if a not in flags]
+			version = config.get("version", "1.0")
+			for arg in [a for a in args if a.startswith("--version=")]:
+				version = arg.split("=", 1)[1]
+				args.remove(arg)
+			version = {"1": "1.0", "1.0": "1.0", "2": "2.0", "2.0": "2.0"}.get(str(version))
+			if version is None:
+				raise ValueError("--version expects 1 or 2")
+			SnP_format = args.pop() if len(args) > 1 and _is_SnP_format(args[-1]) else config.get("format", 'ri')
+			if len(args) != 1:
+				raise ValueError("watch expects: <dir> [--fixture F.SnP] [--quality] [--check] [--mask FILE] [--convert FORMS] ri|ma|db")
+
+			folder = Path(args[0])
+			if not folder.is_dir():
+				raise FileNotFoundError(f"No such folder: {folder}")
+			mask_file = options["mask"] or config.get("masks")
+			pipeline = {
+				"fixture": options["fixture"] or config.get("fixture"),
+				"format": SnP_format,
+				"quality": flags["--quality"] or bool(config.get("quality")),
+				"masks": mask_file or ("default" if flags["--check"] else None),
+				"convert": options["convert"] or config.get("convert"),
+				"version": version,
+				"out": str(Path(options["out"] or config.get("out") or folder / "processed").resolve()),
+			}
+			if not (pipeline["fixture"] or pipeline["quality"] or pipeline["masks"] or pipeline["convert"]):
+				pipeline["quality"], pipeline["masks"] = True, "default"
+			if pipeline["fixture"]:
+				pipeline["fixture"] = str(Path(pipeline["fixture"]).resolve())
+				if not Path(pipeline["fixture"]).is_file():
+					raise FileNotFoundError(f"No such fixture file: {pipeline['fixture']}")
+			if pipeline["convert"] and not _is_SnP_format(pipeline["convert"]):
+				raise ValueError(f"--convert expects ri|ma|db[,...] (got {pipeline['convert']})")
+			if Path(pipeline["out"]) == folder.resolve():
+				raise ValueError("watch: the output folder must not be the watched folder")
+			masks = None
+			if pipeline["masks"]:
+				masks = snp_mask.load_masks(None if pipeline["masks"] == "default" else Path(pipeline["masks"]))
+			if snp_watch.watch(folder, pipeline, masks, interval, settle, workers, flags["--once"]) and flags["--once"]:
+				sys.exit(1)
+
+		# ------------------------------------------------------------------
+		# archive
+		# ------------------------------------------------------------------
+		elif op == "archive":
+			action = args.pop(0).lower() if args else None
+			if action not in ("import", "list", "export", "query") or not args:
+				raise ValueError("archive expects: import | list | export | query <archive.snpa> ...")
+			archive = snp_archive.Archive(Path(args.pop(0)), create=action == "import")
+
+			if action == "import":
+				if not args:
+					raise ValueError("archive import expects: <archive.snpa> <file.SnP|folder> [...]")
+				inputs = []
+				for arg in map(Path, args):
+					if arg.is_dir():
+						inputs += _touchstone_files(arg)
+					elif arg.is_file():
+						inputs.append(arg)
+					else:
+						raise FileNotFoundError(f"No such file or folder: {arg}")
+				with stage("archive import"):
+					added, skipped, errors = archive.import_files(inputs)
+				for path, err in errors:
+					print(f"[FAIL] {path}: {err}")
+				print(f"[OK] {added} network(s) stored, {skipped} unchanged, {len(errors)} failed → {archive.path}"
+					  f" ({len(archive.names())} network(s) in the archive)")
+				if errors:
+					sys.exit(1)
+
+			elif action == "list":
+				if len(args) > 1:
+					raise ValueError("archive list expects: <archive.snpa> [pattern]")
+				print(f"{'name':40s} {'ports':>5s} {'points':>7s} {'start MHz':>10s} {'stop MHz':>10s}  source")
+				for name in archive.names(args[0] if args else None):
+					e = archive.entry(name)
+					g = archive.index["grids"][archive.index["groups"][e["group"]]["grid"]]
+					print(f"{name:40s} {e['nports']:5d} {e['points']:7d} {g['start_hz'] / 1e6:10.3f} {g['stop_hz'] / 1e6:10.3f}"
+						  f"  {e['source'] or ''}")
+
+			elif action == "export":
+				version = "1.0"
+				for arg in [a for a in args if a.startswith("--version=")]:
+					version = {"1": "1.0", "1.0": "1.0", "2": "2.0", "2.0": "2.0"}.get(arg.split("=", 1)[1])
+					if version is None:
+						raise ValueError(f"--version expects 1 or 2 (got {arg.split('=', 1)[1]})")
+					args.remove(arg)
+				out_dir = Path(_pop_option(args, "--out", "a folder") or ".")
+				SnP_format = args.pop() if args and _is_SnP_format(args[-1]) else 'ri'
+				if len(args) > 1:
+					raise ValueError("archive export expects: <archive.snpa> [pattern] [--out DIR] [--version=1|2] ri|ma|db")
+				names = archive.names(args[0] if args else None)
+				if not names:
+					raise ValueError(f"No network of {archive.path} matches {args[0] if args else '*'}")
+				out_dir.mkdir(parents=True, exist_ok=True)
+				with stage("archive export"):
+					for name in names:
+						outputs = archive.export(name, out_dir / f"{name}.s{archive.entry(name)['nports']}p", SnP_format, version)
+						print(f"[OK] {name} → {', '.join(map(str, outputs.values()))}")
+
+			else:
+				freq = _pop_option(args, "--freq", "a frequency")
+				pattern = _pop_option(args, "--names", "a name pattern")
+				out = _pop_option(args, "--out", "a CSV file")
+				if len(args) != 1:
+					raise ValueError("archive query expects: <archive.snpa> <S21|SDD21|...> [--freq F] [--names pattern] [--out file.csv]")
+				if freq is None and out is None:
+					raise ValueError("archive query without --freq writes whole traces - give --out file.csv")
+				param = args[0].upper()
+				with stage("archive query"):
+					groups = archive.values(param, None if freq is None else snp_archive.parse_frequency(freq), pattern)
+				if not groups:
+					raise ValueError(f"No network of {archive.path} has {param}")
+				if freq is not None:
+					snp_archive.print_values(param, groups)
+				if out:
+					snp_archive.save_values(param, groups, Path(out))
+					print(f"Values saved to {out}")
+
+		# ------------------------------------------------------------------
+		# cache
+		# ------------------------------------------------------------------
+		elif op == "cache":
+			if not args or args[0] not in ("stats", "prune", "clear"):
+				raise ValueError("cache expects: stats | prune [--max-mb N] | clear")
+
+			if args[0] == "stats":
+				kinds = snp_cache.stats()
+				print(f"Cache folder: {snp_cache.CACHE_DIR}")
+				for kind, (count, size) in sorted(kinds.items()):
+					print(f"{kind:8s} {count:6d} entries {size / 2**20:10.1f} MB")
+				total = sum(size for _, size in kinds.values())
+				print(f"{'total':8s} {sum(c for c, _ in kinds.values()):6d} entries {total / 2**20:10.1f} MB"
+					  f" (limit {snp_cache.CACHE_MAX_BYTES / 2**20:.0f} MB)")
+			elif args[0] == "prune":
+				max_bytes = None
+				if "--max-mb" in args:
+					idx = args.index("--max-mb")
+					try:
+						max_bytes = int(float(args[idx + 1]) * 2**20)
+					except (IndexError, ValueError):
+						raise ValueError("--max-mb expects a number") from None
+				print(f"{snp_cache.prune(max_bytes)} entries removed")
+			else:
+				snp_cache.clear()
+				print(f"{snp_cache.CACHE_DIR} cleared")
+
+		# ------------------------------------------------------------------
+		# serve
+		# ------------------------------------------------------------------
+		elif op == "serve":
+			workers = _pop_count(args)
+			socket_path = None
+			if "--socket" in args:
+				idx = args.index("--socket")
+				if idx + 1 >= len(args):
+					raise ValueError("--socket expects a path")
+				socket_path = Path(args[idx + 1])
+				del args[idx:idx + 2]
+
+			if args == ["stop"]:
+				if snp_serve.stop(socket_path):
+					print("Daemon stopping")
+				else:
+					print(f"No daemon listening on {socket_path or snp_serve.SOCKET_PATH}")
+			elif args:
+				raise ValueError("serve expects: [--workers N] [--socket PATH] or: stop")
+			else:
+				snp_serve.serve(socket_path, workers)
+
 		else:
 			raise ValueError(f"Unknown operation: {op}")
 		
@@ -316,6 +1065,10 @@ def main(argv: list[str] | None = None) -> None:
 		print(HELP)
 		sys.exit(1)    
 
+	with stage("plot wait"):
+		snp_plot.wait()
+	snp_profile.report()
+
 	print("CLOSING PROGRAM")
 
 
@@ -15,9 +15,12 @@ python ba4_new.py sub file1.s4p file2.s4p {output file will be created}
 """
 
 
-import skrf as rf
+from __future__ import annotations
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+from snp_grid import same_freq
 
-import matplotlib.pyplot as plt
 from pathlib import Path
 import sys
 
@@ -38,15 +41,10 @@ HELP = f"""
 # Utility helpers
 # -----------------------------------------------------------------------------
 
-def _same_freq(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, rf.Network]:
-    """Ensure *ntw_b* is on *ntw_a*'s frequency grid."""
-    if ntw_a.frequency != ntw_b.frequency:
-        ntw_b = ntw_b.interpolate(ntw_a.frequency)
-    return ntw_a, ntw_b
-
 def _plot_quick(ntw: rf.Network, title: str):
     """Non-blocking quick plot for visual sanity checks (ignored if no display)."""
     try:
+        import matplotlib.pyplot as plt
         plt.figure(); plt.title(title)
         ntw.s21.plot_s_db(label="|S21|"); plt.legend(); plt.tight_layout()
     except Exception:
@@ -55,6 +53,7 @@ def _plot_quick(ntw: rf.Network, title: str):
 
 def create_half_network(input_path: Path, output_path: Path, val_set) -> Path:
     """Create a new S4P file as half-value copy of the input file."""
+    import matplotlib.pyplot as plt
     # Load the input S4P file
 
     ntw1 = rf.Network(input_path)
@@ -98,8 +97,9 @@ def create_half_network(input_path: Path, output_path: Path, val_set) -> Path:
     fix1.write_touchstone(output_path, form=val_set)
     
 def cascade_networks(a: Path, b: Path, dst: Path, val_set) -> None:
+    import matplotlib.pyplot as plt
     ntw_a, ntw_b = map(rf.Network, (str(a), str(b)))
-    ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+    ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
     # out = rf.cascade(ntw_a, ntw_b)
     rf_cascade = ntw_a ** ntw_b
     #out = rf.Network(frequency=ntw_a.frequency, s=rf_cascade, z0=ntw_a.z0, name="rf_cascade")
@@ -127,8 +127,9 @@ def cascade_networks(a: Path, b: Path, dst: Path, val_set) -> None:
     print(f"[OK] {a.name} + {b.name} → {dst}")    
 
 def subtract_networks(a: Path, b: Path, dst: Path, val_set) -> None:
+    import matplotlib.pyplot as plt
     ntw_a, ntw_b = map(rf.Network, (str(a), str(b)))
-    ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+    ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
     # diff = ntw_a.s - ntw_b.s --------> ERROR calculation
     rf_diff = ntw_a ** ntw_b.inv
     ##out = rf.Network(frequency=ntw_a.frequency, s=rf_diff, z0=ntw_a.z0, name="rf_diff")
@@ -19,8 +19,9 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
-import skrf as rf
-import matplotlib.pyplot as plt
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+from snp_grid import same_freq
 
 APP_DIR = Path(__file__).resolve().parent  # folder containing this script
 
@@ -37,16 +38,10 @@ USAGE:
 # Utility helpers
 # -----------------------------------------------------------------------------
 
-def _same_freq(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, rf.Network]:
-    """Ensure *ntw_b* is on *ntw_a*'s frequency grid."""
-    if ntw_a.frequency != ntw_b.frequency:
-        ntw_b = ntw_b.interpolate(ntw_a.frequency)
-    return ntw_a, ntw_b
-
-
 def _plot_quick(ntw: rf.Network, title: str):
     """Non‑blocking quick plot for visual sanity checks (ignored if no display)."""
     try:
+        import matplotlib.pyplot as plt
         plt.figure(); plt.title(title)
         ntw.s21.plot_s_db(label="|S21|"); plt.legend(); plt.tight_layout()
     except Exception:
@@ -67,7 +62,7 @@ def create_half_network(src: Path, dst: Path) -> None:
 
 def cascade_networks(a: Path, b: Path, dst: Path) -> None:
     ntw_a, ntw_b = map(rf.Network, (str(a), str(b)))
-    ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+    ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
     out = rf.cascade(ntw_a, ntw_b)
     out.write_touchstone(str(dst))
     print(f"[OK] {a.name} ∘ {b.name} → {dst}")
@@ -75,7 +70,7 @@ def cascade_networks(a: Path, b: Path, dst: Path) -> None:
 
 def subtract_networks(a: Path, b: Path, dst: Path) -> None:
     ntw_a, ntw_b = map(rf.Network, (str(a), str(b)))
-    ntw_a, ntw_b = _same_freq(ntw_a, ntw_b)
+    ntw_a, ntw_b = same_freq(ntw_a, ntw_b)
     diff = ntw_a.s - ntw_b.s
     out = rf.Network(frequency=ntw_a.frequency, s=diff, z0=ntw_a.z0, name="diff")
     out.write_touchstone(str(dst))
@@ -0,0 +1,333 @@
+"""snp_archive.py - indexed archive of many networks with slice reads
+
+An archive is a folder (e.g. boards.snpa) holding:
+
+index.json		- one entry per network: name, ports, grid, slot, frequency unit,
+			  reference resistance, comments, source file and its SHA-1
+grids/<grid>.npy	- frequency points (Hz) of every distinct grid
+s/<group>_<k>.npy	- S data of CHUNK_NETWORKS networks of one grid and port count
+			  (a group), as a (P, P, F, CHUNK_NETWORKS) complex array
+
+The network axis is the innermost one: one S-parameter at one frequency
+for every network of a chunk is a single contiguous run, and one
+S-parameter over the whole grid a single contiguous (F, CHUNK_NETWORKS)
+block.  Chunks are opened as memory maps, so "SDD21 at 12.89 GHz for every
+board" reads a few runs per chunk and decodes nothing else; a mixed-mode
+term only reads the 4 single-ended entries it combines.
+
+Networks are imported from Touchstone files under their file stem (an
+updated file replaces its network, an unchanged one is skipped, a stem
+already taken by another file is rejected) and exported back as
+Touchstone v1/v2 files, byte-identical to write_touchstone() of the
+original arrays.
+"""
+
+from __future__ import annotations
+
+from fnmatch import fnmatch
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_cache
+import snp_linalg
+from snp_touchstone import (FREQ_MULT, form_outputs, network_from_arrays, read_touchstone, reference_resistance,
+							write_touchstone)
+
+ARCHIVE_VERSION = 1
+INDEX_FILE = "index.json"
+CHUNK_NETWORKS = 64     # networks per chunk file of a group
+
+_PARAM_RE = re.compile(r"^S(\d)(\d)$", re.IGNORECASE)
+
+HELP = """
+archive	import <archive.snpa> <file.SnP|folder> [...]
+archive	list   <archive.snpa> [pattern]
+archive	export <archive.snpa> [pattern] [--out DIR] [--version=1|2] 	ri|ma|db
+archive	query  <archive.snpa> <S21|SDD21|...> [--freq 12.89GHz] [--names pattern] [--out values.csv]
+	(query without --freq gives the whole trace of every network and needs --out)
+"""
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+
+def parse_frequency(value: str) -> float:
+	"""'12.89e9', '12.89GHz', '500 MHz' -> Hz."""
+	m = re.fullmatch(r"\s*([-+0-9.eE]+)\s*([kKmMgG]?[hH][zZ])?\s*", value)
+	try:
+		return float(m.group(1)) * FREQ_MULT[(m.group(2) or "hz").lower()]
+	except (AttributeError, ValueError):
+		raise ValueError(f"Unknown frequency: {value} (expected e.g. 12.89e9 or 12.89GHz)") from None
+
+
+def _read(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+	"""(f, s, z0, info) of a Touchstone file; files the fast parser skips go through rf.Network."""
+	try:
+		return read_touchstone(path)
+	except NotImplementedError:
+		ntw = rf.Network(str(path))
+		return ntw.f, ntw.s, ntw.z0, {"unit": ntw.frequency.unit, "name": path.stem, "comments": ntw.comments or ""}
+
+
+def _param(param: str, nports: int) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+	"""(rows, cols, w) of *param* (Sij or a mixed-mode term), None when *nports* doesn't have it."""
+	m = _PARAM_RE.match(param.strip())
+	if m:
+		i, j = int(m.group(1)) - 1, int(m.group(2)) - 1
+		if not (0 <= i < nports and 0 <= j < nports):
+			return None
+		return np.array([[i, i]]), np.array([[j, j]]), np.array([[[1.0, 0.0], [0.0, 0.0]]])
+	try:
+		snp_linalg.mixed_mode_index(param)
+	except ValueError:
+		raise ValueError(f"Unknown parameter: {param} (expected Sij, SDDij, SCCij, SDCij or SCDij)") from None
+	if nports != 4:
+		return None
+	return snp_linalg.mixed_mode_weights([param], nports, p=2)
+
+# -----------------------------------------------------------------------------
+# Archive
+# -----------------------------------------------------------------------------
+
+class Archive:
+	"""An archive folder; the index is read on open and written back by add()."""
+
+	def __init__(self, path: Path, create: bool = False):
+		self.path = Path(path)
+		index_file = self.path / INDEX_FILE
+		if index_file.is_file():
+			self.index = json.loads(index_file.read_text())
+			if self.index.get("version") != ARCHIVE_VERSION:
+				raise ValueError(f"{self.path}: unsupported archive version {self.index.get('version')}")
+		elif create:
+			self.index = {"version": ARCHIVE_VERSION, "grids": {}, "groups": {}, "networks": {}}
+		else:
+			raise FileNotFoundError(f"No archive at {self.path}")
+		self._grids = {}
+		self._chunks = {}
+
+	def names(self, pattern: str | None = None) -> list[str]:
+		return [name for name in self.index["networks"] if pattern is None or fnmatch(name, pattern)]
+
+	def entry(self, name: str) -> dict:
+		try:
+			return self.index["networks"][name]
+		except KeyError:
+			raise ValueError(f"{name} is not in the archive {self.path}") from None
+
+	# storage -----------------------------------------------------------------
+
+	def grid(self, gid: str) -> np.ndarray:
+		if gid not in self._grids:
+			self._grids[gid] = np.load(self.path / "grids" / f"{gid}.npy")
+		return self._grids[gid]
+
+	def _grid_id(self, f: np.ndarray) -> str:
+		gid = hashlib.sha1(np.ascontiguousarray(f, dtype=float).tobytes()).hexdigest()[:16]
+		if gid not in self.index["grids"]:
+			(self.path / "grids").mkdir(parents=True, exist_ok=True)
+			np.save(self.path / "grids" / f"{gid}.npy", np.asarray(f, dtype=float))
+			self.index["grids"][gid] = {"points": len(f), "start_hz": float(f[0]), "stop_hz": float(f[-1])}
+		return gid
+
+	def _chunk(self, group: str, k: int, write: bool = False) -> np.ndarray:
+		"""Memory map of chunk *k* of *group* (created on the first write)."""
+		key = (group, k, write)
+		if key not in self._chunks:
+			path = self.path / "s" / f"{group}_{k}.npy"
+			if write and not path.exists():
+				info = self.index["groups"][group]
+				points = self.index["grids"][info["grid"]]["points"]
+				path.parent.mkdir(parents=True, exist_ok=True)
+				shape = (info["nports"], info["nports"], points, CHUNK_NETWORKS)
+				self._chunks[key] = np.lib.format.open_memmap(path, mode="w+", dtype=complex, shape=shape)
+			else:
+				self._chunks[key] = np.load(path, mmap_mode="r+" if write else "r")
+		return self._chunks[key]
+
+	def _save_index(self) -> None:
+		tmp = self.path / f"{INDEX_FILE}.tmp-{os.getpid()}"
+		tmp.write_text(json.dumps(self.index, indent=1))
+		os.replace(tmp, self.path / INDEX_FILE)
+
+	# write -------------------------------------------------------------------
+
+	def add(self, items: list[tuple[str, np.ndarray, np.ndarray, np.ndarray, dict]]) -> None:
+		"""Store (name, f, s, z0, info) networks; a name already stored is replaced.
+
+		A replaced network keeps its slot when grid and ports are unchanged,
+		otherwise its old slot is freed for the next network of that group.
+		The networks of one group are written to their chunks in one step each.
+		"""
+		by_chunk = {}
+		for name, f, s, z0, info in items:
+			resistance = reference_resistance(z0)       # one R per network, as on the option line
+			gid = self._grid_id(f)
+			group = f"{gid}_{s.shape[1]}p"
+			ginfo = self.index["groups"].setdefault(group, {"grid": gid, "nports": s.shape[1], "slots": 0})
+			old = self.index["networks"].get(name)
+			if old is not None and old["group"] == group:
+				slot = old["slot"]
+			else:
+				if old is not None:
+					self.index["groups"][old["group"]].setdefault("free", []).append(old["slot"])
+				if ginfo.get("free"):
+					slot = ginfo["free"].pop()
+				else:
+					slot, ginfo["slots"] = ginfo["slots"], ginfo["slots"] + 1
+			self.index["networks"][name] = {
+				"group": group, "slot": slot, "nports": s.shape[1], "points": len(f),
+				"unit": info["unit"], "resistance": resistance, "comments": info["comments"],
+				"source": info.get("source"), "sha1": info.get("sha1"), "added": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			}
+			by_chunk.setdefault((group, slot // CHUNK_NETWORKS), []).append((slot % CHUNK_NETWORKS, s))
+
+		(self.path / "s").mkdir(parents=True, exist_ok=True)
+		for (group, k), rows in by_chunk.items():
+			chunk = self._chunk(group, k, write=True)
+			rows.sort(key=lambda row: row[0])
+			slots = np.array([slot for slot, _ in rows])
+			data = np.stack([s for _, s in rows], axis=-1).transpose(1, 2, 0, 3)    # (P, P, F, n)
+			if np.array_equal(slots, np.arange(slots[0], slots[0] + len(slots))):
+				chunk[..., slots[0]:slots[-1] + 1] = data
+			else:
+				chunk[..., slots] = data
+			chunk.flush()
+		self._save_index()
+
+	def import_files(self, paths: list[Path]) -> tuple[int, int, list[tuple[Path, str]]]:
+		"""Add Touchstone *paths* (name = file stem) in batches of one chunk.
+
+		A file that can't be read, or whose stem is already the name of
+		another source file, is not stored.  Returns (added, unchanged,
+		[(path, error), ...]).
+		"""
+		added = skipped = 0
+		batch, errors, taken = [], [], {}
+		for path in map(Path, paths):
+			source = str(path.resolve())
+			old = self.index["networks"].get(path.stem)
+			other = taken.get(path.stem) or (old["source"] if old is not None and old.get("source") else None)
+			if other is not None and other != source:
+				errors.append((path, f"the name {path.stem} is already taken by {other} - rename the file"))
+				continue
+			taken[path.stem] = source
+			try:
+				digest = snp_cache.file_digest(path)
+				if old is not None and old.get("sha1") == digest:
+					skipped += 1
+					continue
+				f, s, z0, info = _read(path)
+			except (ValueError, NotImplementedError, OSError) as err:
+				errors.append((path, str(err)))
+				continue
+			batch.append((path.stem, f, s, z0, {**info, "source": source, "sha1": digest}))
+			if len(batch) == CHUNK_NETWORKS:
+				self.add(batch)
+				added, batch = added + len(batch), []
+		if batch:
+			self.add(batch)
+			added += len(batch)
+		return added, skipped, errors
+
+	# read --------------------------------------------------------------------
+
+	def read(self, name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+		"""(f, s, z0, info) of one stored network."""
+		e = self.entry(name)
+		f = self.grid(self.index["groups"][e["group"]]["grid"])
+		s = np.ascontiguousarray(self._chunk(e["group"], e["slot"] // CHUNK_NETWORKS)[..., e["slot"] % CHUNK_NETWORKS]
+								 .transpose(2, 0, 1))
+		z0 = np.full((len(f), e["nports"]), e["resistance"], dtype=complex)
+		return f, s, z0, {"unit": e["unit"], "name": name, "comments": e["comments"]}
+
+	def network(self, name: str) -> rf.Network:
+		return network_from_arrays(*self.read(name))
+
+	def export(self, name: str, dst: Path, forms="ri", version: str = "1.0") -> dict:
+		"""Write one stored network as Touchstone file(s); returns {form: path}."""
+		f, s, z0, info = self.read(name)
+		outputs = form_outputs(dst, forms)
+		write_touchstone(outputs, f, s, z0, info["unit"], info["comments"], creator=f"skrf {rf.__version__}",
+						 version=version)
+		return outputs
+
+	def values(self, param: str, freq: float | None = None,
+			   pattern: str | None = None) -> list[tuple[list[str], np.ndarray, np.ndarray]]:
+		"""*param* (Sij, SDDij, ...) of every stored network (whose name matches *pattern*).
+
+		One (names, f, values) per group of networks having *param*: with *freq*
+		f is the nearest grid point and values is (N,), else values is (N, F).
+		Only the chunk entries of *param* (and of that frequency) are read.
+		Raises ValueError when *freq* is outside the grid of a selected network.
+		"""
+		members = {}
+		for name, e in self.index["networks"].items():
+			if pattern is None or fnmatch(name, pattern):
+				members.setdefault(e["group"], []).append((e["slot"], name))
+
+		out = []
+		for group, slots in members.items():
+			ginfo = self.index["groups"][group]
+			where = _param(param, ginfo["nports"])
+			if where is None:
+				continue
+			rows, cols, w = where
+			f = self.grid(ginfo["grid"])
+			if freq is not None and not f[0] <= freq <= f[-1]:
+				raise ValueError(f"{freq / 1e6:.3f} MHz is outside the {f[0] / 1e6:.3f}-{f[-1] / 1e6:.3f} MHz grid of "
+								 f"{len(slots)} network(s) ({slots[0][1]}, ...) - select others with --names")
+			at = slice(None) if freq is None else int(np.argmin(np.abs(f - freq)))
+			slots.sort()
+			names = [name for _, name in slots]
+			values = np.empty((len(slots),) + (() if freq is not None else (len(f),)), dtype=complex)
+			for k in sorted({slot // CHUNK_NETWORKS for slot, _ in slots}):
+				pos = [idx for idx, (slot, _) in enumerate(slots) if slot // CHUNK_NETWORKS == k]
+				cols_k = np.array([slots[idx][0] % CHUNK_NETWORKS for idx in pos])
+				chunk = self._chunk(group, k)
+				used = cols_k.max() + 1
+				acc = 0
+				for a, b, weight in zip(rows[0].repeat(2), np.tile(cols[0], 2), w[0].ravel()):
+					if weight:
+						acc = acc + weight * np.asarray(chunk[a, b, at, :used])     # one contiguous run / block
+				values[pos] = (acc[..., cols_k]).T if freq is None else acc[cols_k]
+			out.append((names, f if freq is None else f[at], values))
+		return out
+
+# -----------------------------------------------------------------------------
+# Reports
+# -----------------------------------------------------------------------------
+
+def _db(values: np.ndarray) -> np.ndarray:
+	with np.errstate(divide="ignore"):
+		return 20 * np.log10(np.abs(values))
+
+
+def print_values(param: str, groups: list) -> None:
+	"""Table of a --freq query: one row per network."""
+	print(f"{'name':40s} {'@ MHz':>12s} {param + ' dB':>10s} {'deg':>8s}")
+	for names, f, values in groups:
+		for name, value, db in zip(names, values, _db(values)):
+			print(f"{name:40s} {f / 1e6:12.3f} {db:10.3f} {np.angle(value, deg=True):8.2f}")
+
+
+def save_values(param: str, groups: list, dst: Path) -> None:
+	"""CSV of a query: name, freq_hz, re, im, db - one row per network and frequency."""
+	import csv
+	with open(dst, "w", newline="") as fid:
+		writer = csv.writer(fid)
+		writer.writerow(["name", "freq_hz", f"{param}_re", f"{param}_im", f"{param}_db"])
+		for names, f, values in groups:
+			values = values.reshape(len(names), -1)
+			freqs = np.broadcast_to(f, values.shape[1:])
+			for name, row, db in zip(names, values, _db(values)):
+				writer.writerows([name, repr(float(fk)), repr(float(v.real)), repr(float(v.imag)), repr(float(d))]
+								 for fk, v, d in zip(freqs, row, db))
@@ -0,0 +1,120 @@
+"""snp_assemble.py - N-port networks from pairwise 2-port measurements
+
+A 2-port VNA measures an N-port board one port pair at a time: S21.s2p,
+S31.s2p, ... S43.s2p.  assemble() rebuilds the N-port like
+rf.n_twoports_2_nport (same port mapping, same result), but
+
+- the 2-port files are parsed concurrently on a thread pool (through the
+  parsed-file cache), straight to arrays - no Network per pair
+- all grids are checked in one pass; files off the common grid (--grid)
+  are interpolated per source grid with one shared plan
+- the (F, N, N) S and (F, N) z0 arrays are filled in place
+
+Pair names: the first two digits of the file name are the ports (port 1
+of the 2-port is the first digit), e.g. S21.s2p or p43.s2p.  Above 9
+ports give a separator: with --sep _ a file named S12_3.s2p is ports 12
+and 3.  Like rf.n_twoports_2_nport the diagonal S(k,k) comes from the
+last file holding port k, and unmeasured pairs stay 0.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import re
+
+import numpy as np
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_cache
+import snp_grid
+from snp_touchstone import read_touchstone
+
+HELP = """
+assemble <folder|S21.s2p S31.s2p ...> --ports N [--sep SEP] [--workers N] 	ri|ma|db
+	(the 2-port files of one port pair each, named by their ports: S21.s2p, p43.s2p, S12_3.s2p with --sep _)
+"""
+
+# -----------------------------------------------------------------------------
+# Pairs
+# -----------------------------------------------------------------------------
+
+def pair_ports(path: Path, sep: str = "") -> tuple[int, int]:
+	"""0-based N-port ports of 2-port ports 1 and 2, from the file name."""
+	stem = Path(path).stem
+	if sep:
+		parts = stem.split(sep)
+		found = [re.search(r"\d+", part) for part in parts[:2]] if len(parts) >= 2 else []
+		ports = [int(m.group(0)) for m in found if m]
+	else:
+		ports = [int(d) for d in re.findall(r"\d", stem)[:2]]
+	if len(ports) != 2 or min(ports) < 1 or ports[0] == ports[1]:
+		raise ValueError(f"{Path(path).name}: no port pair in the name (expected e.g. S21.s2p"
+						 + (f" or S12{sep}3.s2p)" if sep else ")"))
+	return ports[0] - 1, ports[1] - 1
+
+
+def _read(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""(f, s, z0) of one 2-port file; files the fast parser skips go through rf.Network."""
+	try:
+		f, s, z0, _ = snp_cache.cached_read(path, read_touchstone)
+	except NotImplementedError:
+		ntw = rf.Network(str(path))
+		f, s, z0 = ntw.f, ntw.s, ntw.z0
+	if s.shape[1] != 2:
+		raise ValueError(f"{path.name} has {s.shape[1]} ports, expected a 2-port")
+	return f, s, z0
+
+
+def load_pairs(paths: list[Path], workers: int | None = None) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+	"""(f, s, z0) of every file, parsed on *workers* threads (file reads and numpy parsing release the GIL)."""
+	workers = workers or min(32, (os.cpu_count() or 1) + 4, len(paths))
+	if workers <= 1:
+		return [_read(p) for p in paths]
+	with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snp_assemble") as pool:
+		return list(pool.map(_read, paths))
+
+# -----------------------------------------------------------------------------
+# Assembly
+# -----------------------------------------------------------------------------
+
+def assemble(paths: list[Path], nports: int, sep: str = "", workers: int | None = None,
+			 grid: tuple[str, float | None] = ("first", None)) -> tuple[np.ndarray, np.ndarray, np.ndarray, list]:
+	"""(f, s, z0, missing pairs) of the N-port measured pairwise by the 2-port *paths*."""
+	if nports > 9 and not sep:
+		raise ValueError("Above 9 ports the pair names need a separator (--sep)")
+	pairs = [pair_ports(p, sep) for p in paths]
+	seen = {}
+	for path, (a, b) in zip(paths, pairs):
+		if max(a, b) >= nports:
+			raise ValueError(f"{path.name} is ports {a + 1}-{b + 1}, outside a {nports}-port")
+		key = (min(a, b), max(a, b))
+		if key in seen:
+			raise ValueError(f"{path.name} and {seen[key].name} measure the same port pair {a + 1}-{b + 1}")
+		seen[key] = path
+
+	data = load_pairs(paths, workers)
+
+	# one grid check over all files; the off-grid ones are interpolated per source grid
+	f = snp_grid.common_grid([d[0] for d in data], *grid)
+	s_all = np.stack([d[1] for d in data]) if all(np.array_equal(d[0], f) for d in data) else None
+	if s_all is None:
+		groups = {}
+		for k, (f_src, _, _) in enumerate(data):
+			groups.setdefault(f_src.tobytes(), []).append(k)
+		s_all = np.empty((len(data), len(f), 2, 2), dtype=complex)
+		for idxs in groups.values():
+			p = snp_grid.plan(data[idxs[0]][0], f)
+			s_all[idxs] = snp_grid.apply(p, np.stack([data[k][1] for k in idxs]), axis=1)
+	z0_all = np.stack([d[2][0] for d in data])     # per-file port impedances (first point)
+
+	s = np.zeros((len(f), nports, nports), dtype=complex)
+	z0 = np.full((len(f), nports), 50, dtype=complex)
+	for k, (a, b) in enumerate(pairs):
+		idx = np.array([a, b])
+		s[:, idx[:, None], idx] = s_all[k]
+		z0[:, idx] = z0_all[k]
+	missing = [(a + 1, b + 1) for b in range(nports) for a in range(b + 1, nports) if (b, a) not in seen]
+	return f, s, z0, missing
@@ -0,0 +1,135 @@
+"""snp_batch.py - run many bisect/cascade/deembed jobs in one process pool
+
+Jobs come either from a manifest file or from a glob:
+
+manifest.csv	- header 'op,inputs,format', inputs separated by ';'
+manifest.json	- [{"op": "deembed", "inputs": ["a.s4p", "b.s4p"], "format": "ri"}, ...]
+<glob> <op> [files...]	- one job per matching file, the matching file being the
+				  first input and the extra files the remaining ones
+
+Relative manifest paths are taken from the manifest's folder.  Each job
+runs in a worker process with its output captured; a failing job is
+reported in the summary and never stops the rest of the batch.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from pathlib import Path
+import csv
+import glob
+import io
+import json
+import os
+import time
+
+import snp_plot
+
+BATCH_OPS = ("bisect", "cascade", "deembed", "deembed-many")
+
+HELP = """
+batch	<manifest.csv|manifest.json> 		[--workers N]
+batch	<glob> <op> [file.SnP ...] [ri|ma|db]	[--workers N]
+"""
+
+# -----------------------------------------------------------------------------
+# Job lists
+# -----------------------------------------------------------------------------
+
+def _job(op: str, inputs: list, SnP_format: str, base: Path | None = None) -> dict:
+	op = op.strip().lower()
+	if op not in BATCH_OPS:
+		raise ValueError(f"Unknown batch operation: {op}")
+	paths = [Path(p) if base is None or Path(p).is_absolute() else base / p for p in inputs]
+	return {"op": op, "inputs": [str(p) for p in paths], "format": (SnP_format or "ri").strip()}
+
+
+def load_manifest(manifest: Path) -> list[dict]:
+	"""Read a CSV/JSON manifest of (op, inputs, format) rows."""
+	base = manifest.resolve().parent
+	if manifest.suffix.lower() == ".json":
+		rows = json.loads(manifest.read_text())
+		return [_job(r["op"], r["inputs"], r.get("format", "ri"), base) for r in rows]
+
+	jobs = []
+	with open(manifest, newline="") as fid:
+		for row in csv.DictReader(fid):
+			inputs = [p for p in row["inputs"].replace(";", " ").split() if p]
+			jobs.append(_job(row["op"], inputs, row.get("format") or "ri", base))
+	return jobs
+
+
+def jobs_from_glob(pattern: str, op: str, extra: list[str], SnP_format: str = "ri") -> list[dict]:
+	"""One job per file matching *pattern*: op <file> <extra...> format."""
+	files = sorted(glob.glob(pattern))
+	if not files:
+		raise FileNotFoundError(f"No file matches {pattern}")
+	return [_job(op, [f, *extra], SnP_format) for f in files]
+
+# -----------------------------------------------------------------------------
+# Execution
+# -----------------------------------------------------------------------------
+
+def run_job(job: dict, plot_mode: str = "none") -> tuple[bool, float, str]:
+	"""Run one job in this process; return (ok, seconds, captured output)."""
+	import SnP_Utils_New as snp
+
+	snp_plot.mode = plot_mode
+	out = io.StringIO()
+	t0 = time.perf_counter()
+	try:
+		with redirect_stdout(out):
+			inputs = [Path(p) for p in job["inputs"]]
+			for p in inputs:
+				if not p.exists():
+					raise FileNotFoundError(f"No such file: {p}")
+			if job["op"] == "bisect":
+				snp.create_bisect_network(*inputs, job["format"])
+			elif job["op"] == "deembed-many":
+				snp.create_deembeded_networks(inputs[0], inputs[1:], job["format"])
+			elif job["op"] == "cascade":
+				snp.create_cascade_networks(inputs, job["format"])
+			else:
+				snp.create_deembeded_network(*inputs, job["format"])
+			snp_plot.wait()
+		ok, msg = True, out.getvalue()
+	except Exception as err:
+		ok, msg = False, f"{type(err).__name__}: {err}"
+	return ok, time.perf_counter() - t0, msg
+
+
+def run_batch(jobs: list[dict], workers: int | None = None) -> int:
+	"""Fan *jobs* out over a process pool and print a status/timing summary.
+
+	Returns the number of failed jobs.
+	"""
+	workers = workers or os.cpu_count() or 1
+	# blocking windows make no sense in worker processes
+	plot_mode = "none" if snp_plot.mode == "show" else snp_plot.mode
+	print(f"Running {len(jobs)} job(s) on {workers} worker(s)")
+
+	results = [None] * len(jobs)
+	t0 = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = {pool.submit(run_job, job, plot_mode): idx for idx, job in enumerate(jobs)}
+		for fut in as_completed(futures):
+			idx = futures[fut]
+			try:
+				results[idx] = fut.result()
+			except Exception as err:  # worker died (e.g. out of memory)
+				results[idx] = (False, 0.0, f"{type(err).__name__}: {err}")
+			ok, elapsed, _ = results[idx]
+			print(f"[{'OK' if ok else 'FAIL':4s}] {idx + 1}/{len(jobs)} {jobs[idx]['op']} {elapsed:7.2f}s")
+	wall = time.perf_counter() - t0
+
+	print("==============================================================")
+	print(f"{'#':>3s}  {'status':6s} {'time':>8s}  job")
+	for idx, (job, (ok, elapsed, msg)) in enumerate(zip(jobs, results)):
+		names = " ".join(Path(p).name for p in job["inputs"])
+		print(f"{idx + 1:3d}  {'OK' if ok else 'FAIL':6s} {elapsed:7.2f}s  {job['op']} {names} {job['format']}")
+		if not ok:
+			print(f"{'':21s}{msg}")
+	failed = sum(1 for ok, _, _ in results if not ok)
+	busy = sum(elapsed for _, elapsed, _ in results)
+	print("==============================================================")
+	print(f"{len(jobs) - failed} OK, {failed} failed - wall {wall:.2f}s, sum of job times {busy:.2f}s")
+	return failed
@@ -0,0 +1,231 @@
+"""snp_bench.py - benchmark suite over the sample networks of the repository
+
+Times the building blocks of the CLI on the checked-in .SnP files and
+records the peak (tracemalloc) memory of each case:
+
+parse		- read_touchstone() of every sample file (parsed-file cache off)
+interpolate	- same_freq() onto a shifted grid (interpolation plan built each time)
+cascade		- in-memory cascade of 2 copies of a network (cascade_s)
+deembed		- deembed_solve() of out_half.s4p from the Replica file
+bisect		- IEEE370 NZC 2x-thru bisection of file1source.s4p
+quality		- IEEE370 quality: vectorized pre-screen and skrf's full check
+se2gmm		- mixed-mode conversion of every 4-port
+write-ri/ma/db	- write_touchstone() in each form
+
+Results are stored as JSON; `compare` flags the cases that became slower
+(or use more memory) than a base run by more than the threshold.
+
+Usage:
+python snp_bench.py run [--out bench.json] [--repeat N] [--filter TEXT]
+python snp_bench.py compare <base.json> <new.json> [--threshold PCT]
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_cache
+import snp_grid
+import snp_linalg
+import snp_quality
+from snp_touchstone import network_from_arrays, read_touchstone, write_touchstone
+
+app_dir = Path(__file__).resolve().parent
+
+BENCH_VERSION = 1
+BENCH_FILES = ("file1source.s4p", "out_half.s4p", "Replica_S4P_HTG_FMC_X6QSFP28.s4p", "cable.s2p", "ring.s2p")
+REPEAT = 5
+THRESHOLD_PCT = 10.0        # slow-down / memory growth flagged by compare
+MIN_DELTA_S = 1e-3          # time differences below this are noise
+MIN_DELTA_KB = 64           # memory differences below this are noise
+
+# -----------------------------------------------------------------------------
+# Cases
+# -----------------------------------------------------------------------------
+
+def _load(name: str) -> rf.Network:
+	return network_from_arrays(*read_touchstone(app_dir / name))
+
+
+def _interpolate(ntw: rf.Network):
+	f = ntw.f
+	f_mid = (f[:-1] + f[1:]) / 2 if len(f) > 1 else f
+	ref = rf.Network(frequency=rf.Frequency.from_f(f_mid, unit="hz"), s=np.zeros((len(f_mid), ntw.nports, ntw.nports)))
+
+	def run():
+		snp_grid._plans.clear()
+		snp_grid.same_freq(ref, ntw)
+	return run
+
+
+def _bisect(ntw: rf.Network):
+	cls = rf.IEEEP370_MM_NZC_2xThru if ntw.nports == 4 else rf.IEEEP370_SE_NZC_2xThru
+	return lambda: cls(dummy_2xthru=ntw, z0=50, name="2xthru").se_side1
+
+
+def _write(ntw: rf.Network, form: str, tmp: Path):
+	dst = tmp / f"{ntw.name}.s{ntw.nports}p"
+	return lambda: write_touchstone({form: dst}, ntw.f, ntw.s, ntw.z0, ntw.frequency.unit, ntw.comments)
+
+
+def cases(tmp: Path) -> list[tuple[str, object]]:
+	"""(name, setup) pairs; setup() loads the inputs and returns the timed callable."""
+	files = [name for name in BENCH_FILES if (app_dir / name).is_file()]
+	four = [name for name in files if name.lower().endswith(".s4p")]
+	out = [(f"parse/{name}", lambda name=name: lambda: read_touchstone(app_dir / name)) for name in files]
+	out += [(f"interpolate/{name}", lambda name=name: _interpolate(_load(name))) for name in files]
+	out += [(f"cascade/{name}", lambda name=name: (lambda s: lambda: snp_linalg.cascade_s(s))(np.stack([_load(name).s] * 2)))
+			for name in files]
+	if {"Replica_S4P_HTG_FMC_X6QSFP28.s4p", "out_half.s4p"} <= set(files):
+		out.append(("deembed/Replica_S4P_HTG_FMC_X6QSFP28.s4p", lambda: (lambda a, b: lambda: snp_linalg.deembed_solve(a.s, b.s))(
+			_load("Replica_S4P_HTG_FMC_X6QSFP28.s4p"), _load("out_half.s4p"))))
+	if "file1source.s4p" in files:
+		out.append(("bisect/file1source.s4p", lambda: _bisect(_load("file1source.s4p"))))
+	out += [(f"quality-prescreen/{name}", lambda name=name: (lambda n: lambda: snp_quality.prescreen(n))(_load(name))) for name in four]
+	out += [(f"quality-full/{name}", lambda name=name: (lambda n: lambda: snp_quality.full_check(n))(_load(name))) for name in four]
+	out += [(f"se2gmm/{name}", lambda name=name: (lambda n: lambda: snp_linalg.mixed_mode(n, p=2))(_load(name))) for name in four]
+	out += [(f"write-{form}/{name}", lambda name=name, form=form: _write(_load(name), form, tmp))
+			for form in ("ri", "ma", "db") for name in files]
+	return out
+
+# -----------------------------------------------------------------------------
+# Run
+# -----------------------------------------------------------------------------
+
+def measure(func, repeat: int = REPEAT) -> dict:
+	"""Best / median wall time of *repeat* calls, then the tracemalloc peak of one more."""
+	func()      # warm-up: lazy imports, first-touch of the inputs
+	times = []
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - t0)
+
+	tracemalloc.start()
+	try:
+		func()
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	return {"best_s": min(times), "median_s": statistics.median(times), "repeat": repeat, "peak_kb": peak / 1024}
+
+
+def run(repeat: int = REPEAT, pattern: str | None = None) -> dict:
+	"""Run every case (whose name contains *pattern*); failing cases record their error."""
+	snp_cache.enabled = False
+	results = {}
+	with tempfile.TemporaryDirectory() as tmp:
+		for name, setup in cases(Path(tmp)):
+			if pattern and pattern not in name:
+				continue
+			try:
+				results[name] = measure(setup(), repeat)
+			except Exception as err:        # e.g. an skrf without the IEEE370 classes
+				results[name] = {"error": f"{type(err).__name__}: {err}"}
+			res = results[name]
+			if "error" in res:
+				print(f"{name:52s} {'ERROR':>10s}  {res['error']}")
+			else:
+				print(f"{name:52s} {res['best_s']*1e3:8.2f}ms {res['median_s']*1e3:8.2f}ms {res['peak_kb']/1024:8.1f}MB")
+	return {
+		"version": BENCH_VERSION,
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"host": platform.node(),
+		"cpus": os.cpu_count(),
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"skrf": rf.__version__,
+		"threads": snp_linalg.threads,
+		"results": results,
+	}
+
+# -----------------------------------------------------------------------------
+# Compare
+# -----------------------------------------------------------------------------
+
+def _load_results(path: Path) -> dict:
+	data = json.loads(Path(path).read_text())
+	if data.get("version") != BENCH_VERSION:
+		raise ValueError(f"{path}: unsupported benchmark results version {data.get('version')}")
+	return data
+
+
+def compare(base: dict, new: dict, threshold: float = THRESHOLD_PCT) -> list[str]:
+	"""Print base vs new per case; return the names of the regressed cases."""
+	limit = 1 + threshold / 100
+	regressions = []
+	print(f"{'case':52s} {'base':>10s} {'new':>10s} {'ratio':>7s} {'mem base':>10s} {'mem new':>10s}")
+	for name in sorted(set(base["results"]) | set(new["results"])):
+		a, b = base["results"].get(name), new["results"].get(name)
+		if a is None or b is None or "error" in a or "error" in b:
+			state = "only in base" if b is None else "only in new" if a is None else "error"
+			print(f"{name:52s} {state}")
+			continue
+		ratio = b["best_s"] / a["best_s"]
+		slower = ratio > limit and b["best_s"] - a["best_s"] > MIN_DELTA_S
+		bigger = b["peak_kb"] > a["peak_kb"] * limit and b["peak_kb"] - a["peak_kb"] > MIN_DELTA_KB
+		flags = " ".join(flag for flag, on in (("SLOWER", slower), ("MEMORY", bigger)) if on)
+		if flags:
+			regressions.append(name)
+		print(f"{name:52s} {a['best_s']*1e3:8.2f}ms {b['best_s']*1e3:8.2f}ms {ratio:6.2f}x "
+			  f"{a['peak_kb']/1024:8.1f}MB {b['peak_kb']/1024:8.1f}MB  {flags}")
+	print(f"{len(regressions)} regression(s) over {threshold:g}%")
+	return regressions
+
+# -----------------------------------------------------------------------------
+# CLI entry-point
+# -----------------------------------------------------------------------------
+
+def _pop_value(args: list[str], option: str, default=None):
+	if option not in args:
+		return default
+	idx = args.index(option)
+	if idx + 1 >= len(args):
+		raise ValueError(f"{option} expects a value")
+	value = args[idx + 1]
+	del args[idx:idx + 2]
+	return value
+
+
+def main(argv: list[str] | None = None) -> None:
+	if not argv or argv[0] in ("-h", "--help"):
+		print(__doc__); sys.exit(0)
+
+	op, *args = argv
+	try:
+		if op == "run":
+			out = Path(_pop_value(args, "--out", "bench.json"))
+			repeat = int(_pop_value(args, "--repeat", REPEAT))
+			pattern = _pop_value(args, "--filter")
+			if args:
+				raise ValueError(f"Unknown run argument(s): {' '.join(args)}")
+			out.write_text(json.dumps(run(repeat, pattern), indent=1))
+			print(f"Results saved to {out}")
+		elif op == "compare":
+			threshold = float(_pop_value(args, "--threshold", THRESHOLD_PCT))
+			if len(args) != 2:
+				raise ValueError("compare expects: <base.json> <new.json> [--threshold PCT]")
+			if compare(*map(_load_results, args), threshold):
+				sys.exit(1)
+		else:
+			raise ValueError(f"Unknown operation: {op}")
+	except (ValueError, FileNotFoundError) as err:
+		print(err)
+		print(__doc__)
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
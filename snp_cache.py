@@ -0,0 +1,174 @@
+"""snp_cache.py - persistent cache of parsed Touchstone arrays
+
+Each parsed file is stored as a directory of .npy files (f, s, z0) plus a
+small info.json, so a warm load is a few np.load(mmap_mode='c') calls
+instead of a text parse.  Entries are keyed by the resolved path, size and
+mtime of the source file, and optionally by a SHA-1 of its content.
+
+The cache directory is bounded by CACHE_MAX_BYTES; the least recently
+used entries (info.json mtime is touched on every hit) are evicted first.
+
+Environment:
+SNP_CACHE_DIR     cache location              (default: <app dir>/.snp_cache)
+SNP_CACHE_MAX_MB  size cap in MB              (default: 512, shared with snp_results)
+SNP_CACHE_HASH    1 = also key on file content (default: 0)
+SNP_NO_CACHE      1 = disable the cache        (same as --no-cache)
+"""
+
+from pathlib import Path
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+app_dir = Path(__file__).resolve().parent
+
+
+def configure() -> None:
+	"""(Re)read the settings from the environment - a `serve` worker applies each caller's."""
+	global CACHE_DIR, CACHE_MAX_BYTES, enabled, content_hash
+	CACHE_DIR = Path(os.environ.get("SNP_CACHE_DIR", app_dir / ".snp_cache"))
+	CACHE_MAX_BYTES = int(float(os.environ.get("SNP_CACHE_MAX_MB", "512")) * 2**20)
+	enabled = os.environ.get("SNP_NO_CACHE", "0") != "1"
+	content_hash = os.environ.get("SNP_CACHE_HASH", "0") == "1"
+
+
+configure()
+
+_ARRAYS = ("f", "s", "z0")
+
+# -----------------------------------------------------------------------------
+# Utility helpers
+# -----------------------------------------------------------------------------
+
+def file_digest(path: Path) -> str:
+	"""SHA-1 of the file content."""
+	h = hashlib.sha1()
+	with open(path, "rb") as fid:
+		for chunk in iter(lambda: fid.read(1 << 20), b""):
+			h.update(chunk)
+	return h.hexdigest()
+
+
+def cache_key(path: Path, use_hash: bool | None = None) -> str:
+	"""Key of *path* built from its resolved path, size, mtime (and content)."""
+	path = Path(path).resolve()
+	st = path.stat()
+	parts = [str(path), str(st.st_size), str(st.st_mtime_ns)]
+	if content_hash if use_hash is None else use_hash:
+		parts.append(file_digest(path))
+	return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _entry_size(entry: Path) -> int:
+	return sum(p.stat().st_size for p in entry.iterdir())
+
+# -----------------------------------------------------------------------------
+# Cache operations
+# -----------------------------------------------------------------------------
+
+def get(key: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict] | None:
+	"""Return the cached (f, s, z0, info) of *key*, or None on a miss.
+
+	Arrays are copy-on-write memory maps: nothing is read until used and
+	in-place edits never reach the cache file.
+	"""
+	entry = CACHE_DIR / key
+	info_file = entry / "info.json"
+	try:
+		info = json.loads(info_file.read_text())
+		f, s, z0 = (np.load(entry / f"{name}.npy", mmap_mode="c") for name in _ARRAYS)
+	except (OSError, ValueError):
+		return None
+	os.utime(info_file)     # LRU bookkeeping
+	return f, s, z0, info
+
+
+def put(key: str, f: np.ndarray, s: np.ndarray, z0: np.ndarray, info: dict) -> None:
+	"""Store the parsed arrays under *key* and evict entries above the size cap."""
+	CACHE_DIR.mkdir(parents=True, exist_ok=True)
+	entry = CACHE_DIR / key
+	tmp = CACHE_DIR / f"{key}.tmp-{os.getpid()}-{threading.get_ident()}"
+	tmp.mkdir(exist_ok=True)
+	for name, arr in zip(_ARRAYS, (f, s, z0)):
+		np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+	(tmp / "info.json").write_text(json.dumps(info))
+	try:
+		os.rename(tmp, entry)
+	except OSError:     # another process stored the same entry first
+		shutil.rmtree(tmp, ignore_errors=True)
+	prune()
+
+
+def prune(max_bytes: int | None = None) -> int:
+	"""Evict least recently used entries until the cache fits *max_bytes*.
+
+	Returns the number of removed entries.
+	"""
+	max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+	if not CACHE_DIR.is_dir():
+		return 0
+	entries = []
+	for entry in CACHE_DIR.iterdir():
+		info_file = entry / "info.json"
+		try:
+			if entry.is_dir() and info_file.exists():
+				entries.append((info_file.stat().st_mtime, _entry_size(entry), entry))
+		except FileNotFoundError:   # evicted / renamed by another thread meanwhile
+			continue
+	total = sum(size for _, size, _ in entries)
+	removed = 0
+	for _, size, entry in sorted(entries):
+		if total <= max_bytes:
+			break
+		shutil.rmtree(entry, ignore_errors=True)
+		total -= size
+		removed += 1
+	return removed
+
+
+def update_info(key: str, info: dict) -> None:
+	"""Replace the info.json of an existing entry."""
+	info_file = CACHE_DIR / key / "info.json"
+	tmp = info_file.with_name(f"info.json.tmp-{os.getpid()}")
+	tmp.write_text(json.dumps(info))
+	os.replace(tmp, info_file)
+
+
+def stats() -> dict:
+	"""{kind: [entries, bytes]} of the cache ('parsed' files, 'result' networks, quality 'verdict's)."""
+	kinds = {}
+	if CACHE_DIR.is_dir():
+		for entry in CACHE_DIR.iterdir():
+			info_file = entry / "info.json"
+			if not (entry.is_dir() and info_file.exists()):
+				continue
+			try:
+				kind = json.loads(info_file.read_text()).get("kind", "parsed")
+			except (OSError, ValueError):
+				kind = "broken"
+			count, size = kinds.get(kind, [0, 0])
+			kinds[kind] = [count + 1, size + _entry_size(entry)]
+	return kinds
+
+
+def clear() -> None:
+	shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def cached_read(path: Path, reader) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+	"""Return reader(path) through the cache (reader returns f, s, z0, info)."""
+	if not enabled:
+		return reader(path)
+	key = cache_key(path)
+	hit = get(key)
+	if hit is not None:
+		return hit
+	f, s, z0, info = reader(path)
+	try:
+		put(key, f, s, z0, info)
+	except OSError as err:  # read-only share, disk full ... - just don't cache
+		print(f"[cache] not stored: {err}")
+	return f, s, z0, info
@@ -0,0 +1,212 @@
+"""snp_chunked.py - out-of-core cascade, de-embedding and conversion in frequency blocks
+
+Every frequency point of a cascade or a de-embedding is independent, so
+the inputs are streamed through snp_touchstone.open_touchstone() in
+blocks of `--chunk N` points, each block is computed with snp_linalg and
+appended to the output files by a TouchstoneWriter.  Peak memory is set
+by the chunk size, not by the file size: only the block being computed,
+one read buffer per input and the small plot summary (the 2x2 SDD / S
+block per point, only when plots are drawn) are kept.
+
+Restrictions of the chunked mode:
+- the inputs must share one frequency grid (no interpolation across blocks)
+- one reference resistance for all inputs (no renormalization)
+- results don't go through the result cache
+
+convert_file() rewrites Touchstone files in other forms (ri/ma/db) and
+versions (v1/v2) the same way: one pass over the input, every requested
+form written from each block, so a whole folder converts in the memory
+of one block.
+"""
+
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+from itertools import zip_longest
+from pathlib import Path
+import numpy as np
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_linalg
+from snp_touchstone import CHUNK_POINTS, SNP_FORMATS, TouchstoneWriter, form_outputs, open_touchstone
+
+# -----------------------------------------------------------------------------
+# Block streams
+# -----------------------------------------------------------------------------
+
+def _open(path: Path, chunk: int):
+	"""open_touchstone(); what the block reader doesn't cover (NotImplementedError) is a ValueError here."""
+	try:
+		return open_touchstone(path, chunk)
+	except NotImplementedError as err:
+		raise ValueError(f"{err} - not supported by the block reader") from None
+
+
+@contextmanager
+def _open_all(paths: list[Path], chunk: int):
+	"""Open every input; yield (infos, blocks) with blocks yielding (f, [s, ...]).
+
+	All the files are closed on exit, also when a check fails before the
+	first block.
+	"""
+	with ExitStack() as stack:
+		streams = []
+		for path in paths:
+			info, blocks = _open(path, chunk)
+			streams.append((info, stack.enter_context(blocks)))
+		infos = [info for info, _ in streams]
+		for path, info in zip(paths, infos):
+			if info["resistance"] != infos[0]["resistance"]:
+				raise ValueError(f"{path.name} has R {info['resistance']:g}, {paths[0].name} has R "
+								 f"{infos[0]['resistance']:g} - chunked mode needs one reference resistance")
+
+		def blocks():
+			empty = True
+			for parts in zip_longest(*(b for _, b in streams)):
+				if any(part is None for part in parts):
+					raise ValueError("The inputs don't have the same number of frequency points "
+									 "- chunked mode needs one frequency grid")
+				f = parts[0][0]
+				for path, (f_other, _) in zip(paths[1:], parts[1:]):
+					if not np.array_equal(f, f_other):
+						raise ValueError(f"{path.name} is not on the frequency grid of {paths[0].name} "
+										 f"- chunked mode needs one frequency grid")
+				empty = False
+				yield f, [s for _, s in parts]
+			if empty:
+				raise ValueError(f"{paths[0].name} has no frequency points")
+
+		yield infos, blocks()
+
+
+class _Summary:
+	"""The per-point 2x2 block plotted by the reports (SDD for 4-ports)."""
+
+	def __init__(self, nports: int):
+		self.nports = nports
+		self.f, self.s = [], []
+
+	def add(self, f: np.ndarray, s: np.ndarray) -> None:
+		if self.nports == 4:     # only the SDD terms, not the whole se2gmm()
+			s = snp_linalg.mixed_mode_s(s, [(0, 0), (0, 1), (1, 0), (1, 1)], p=2).reshape(-1, 2, 2)
+		else:
+			s = s[:, :2, :2].copy()
+		self.f.append(f)
+		self.s.append(s)
+
+	def network(self, name: str) -> rf.Network:
+		frequency = rf.Frequency.from_f(np.concatenate(self.f), unit="hz")
+		return rf.Network(frequency=frequency, s=np.concatenate(self.s), name=name)
+
+
+@contextmanager
+def _writer(dst: Path, forms, info: dict, nports: int):
+	"""Writer of <dst>.s<nports>p in every form of *forms* (see form_outputs()).
+
+	The partly written files are removed when the run fails.
+	"""
+	outputs = form_outputs(Path(dst).with_suffix(f".s{nports}p"), forms)
+	writer = TouchstoneWriter(outputs, nports, info["resistance"], info["unit"], creator=f"skrf {rf.__version__}")
+	try:
+		yield writer
+	except BaseException:
+		writer.close(complete=False)
+		for path in outputs.values():
+			Path(path).unlink(missing_ok=True)
+		raise
+	writer.close()
+
+# -----------------------------------------------------------------------------
+# Operations
+# -----------------------------------------------------------------------------
+
+def cascade_files(Net_files: list[Path], dst: Path, forms="ri", chunk: int = CHUNK_POINTS,
+				  summary: bool = False) -> tuple[dict, int, rf.Network | None]:
+	"""Cascade *Net_files* block by block into <dst>.sNp (one file per form).
+
+	2-port segments of an N-port chain are placed on every line, as in the
+	in-memory cascade.  Returns ({form: path}, frequency points, plot
+	summary or None).
+	"""
+	with _open_all(Net_files, chunk) as (infos, blocks):
+		nports = max(info["nports"] for info in infos)
+		for Net_file, info in zip(Net_files, infos):
+			if info["nports"] not in (2, nports):
+				raise ValueError(f"{Net_file.name} has {info['nports']} ports, expected 2 or {nports} - existing")
+
+		points = 0
+		trace = _Summary(nports) if summary else None
+		with _writer(dst, forms, infos[0], nports) as writer:
+			for f, parts in blocks:
+				s = snp_linalg.cascade_s(np.stack([snp_linalg.promote_2port(p, nports) if p.shape[1] != nports else p
+												   for p in parts]))
+				writer.write(f, s)
+				points += len(f)
+				if trace:
+					trace.add(f, s)
+	return writer.outputs, points, trace and trace.network(Path(dst).stem)
+
+
+def deembed_files(Total_Net_file: Path, Partial_Net_file: Path, dst: Path, forms="ri", chunk: int = CHUNK_POINTS,
+				  summary: bool = False) -> tuple[dict, np.ndarray, np.ndarray, rf.Network | None]:
+	"""De-embed *Partial_Net_file* from side 2 of *Total_Net_file* block by block.
+
+	Returns ({form: path}, f, fixture condition number per point, plot
+	summary or None).
+	"""
+	with _open_all([Total_Net_file, Partial_Net_file], chunk) as (infos, blocks):
+		if infos[0]["nports"] != infos[1]["nports"]:
+			raise ValueError("The 2 files doesn't have the same number of ports - existing")
+
+		f_all, cond_all = [], []
+		trace = _Summary(infos[0]["nports"]) if summary else None
+		with _writer(dst, forms, infos[0], infos[0]["nports"]) as writer:
+			for f, (s_total, s_partial) in blocks:
+				s, cond = snp_linalg.deembed_solve(s_total, s_partial)
+				writer.write(f, s)
+				f_all.append(f)
+				cond_all.append(cond)
+				if trace:
+					trace.add(f, s)
+	return (writer.outputs, np.concatenate(f_all), np.concatenate(cond_all),
+			trace and trace.network(Path(dst).stem))
+
+
+def convert_outputs(src: Path, out_dir: Path, forms, nports: int) -> dict:
+	"""{form: <out_dir>/<stem>_<form>.s<nports>p} - the form is always in the name."""
+	forms = forms.split(",") if isinstance(forms, str) else list(forms)
+	for form in forms:
+		if form.lower() not in SNP_FORMATS:
+			raise ValueError(f"Unknown SnP output format: {form} (expected ri|ma|db)")
+	return {form.lower(): Path(out_dir) / f"{Path(src).stem}_{form.lower()}.s{nports}p" for form in forms}
+
+
+def convert_file(src: Path, out_dir: Path, forms="ri", version: str = "1.0",
+				 chunk: int = CHUNK_POINTS) -> tuple[dict, int]:
+	"""Rewrite *src* in every form of *forms* as Touchstone *version* files in *out_dir*.
+
+	The comments and frequency unit of *src* are kept.  Returns
+	({form: path}, frequency points); partly written files are removed
+	when the run fails.
+	"""
+	info, blocks = _open(src, chunk)
+	with blocks:
+		outputs = convert_outputs(src, out_dir, forms, info["nports"])
+		if Path(src).resolve() in {Path(p).resolve() for p in outputs.values()}:
+			raise ValueError(f"{Path(src).name} would be overwritten by its own conversion - use another output folder")
+
+		points = 0
+		writer = TouchstoneWriter(outputs, info["nports"], info["resistance"], info["unit"], info["comments"],
+								  creator=f"skrf {rf.__version__}", version=version)
+		try:
+			for f, s in blocks:
+				writer.write(f, s)
+				points += len(f)
+		except BaseException:
+			writer.close(complete=False)
+			for path in outputs.values():
+				Path(path).unlink(missing_ok=True)
+			raise
+	writer.close()
+	return outputs, points
@@ -0,0 +1,167 @@
+"""snp_grid.py - frequency-grid alignment with cached interpolation plans
+
+Putting a network on another frequency grid is a linear interpolation
+along the frequency axis (the skrf Network.interpolate default).  The
+index/weight arrays of that interpolation only depend on the two grids,
+so they are computed once per (source grid, target grid) pair, kept in a
+small LRU table, and applied to any number of stacked S / z0 arrays with
+two fancy-indexed reads.
+
+Common grid policies for multi-file operations (see common_grid()):
+
+first		- the grid of the first network (what _same_freq always did)
+intersection	- the first network's points inside the band all networks cover
+union		- every point of every network inside that band
+step:<Hz>	- a uniform grid with the given step across that band
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import numpy as np
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+
+GRID_POLICIES = ("first", "intersection", "union", "step")
+PLAN_CACHE_SIZE = 64
+
+_plans = OrderedDict()
+
+# -----------------------------------------------------------------------------
+# Interpolation plans
+# -----------------------------------------------------------------------------
+
+def plan(f_src: np.ndarray, f_dst: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""(idx, w) so that x_dst = x[idx] * (1 - w) + x[idx + 1] * w along the frequency axis.
+
+	Raises ValueError when *f_dst* leaves the range of *f_src* (no extrapolation,
+	same as Network.interpolate).
+	"""
+	key = (f_src.tobytes(), f_dst.tobytes())
+	hit = _plans.get(key)
+	if hit is not None:
+		_plans.move_to_end(key)
+		return hit
+
+	f_src, f_dst = np.asarray(f_src, dtype=float), np.asarray(f_dst, dtype=float)
+	if f_dst[0] < f_src[0] or f_dst[-1] > f_src[-1]:
+		raise ValueError(f"Frequency grid {f_dst[0]:.6g}-{f_dst[-1]:.6g} Hz is outside "
+						 f"the data range {f_src[0]:.6g}-{f_src[-1]:.6g} Hz")
+	if len(f_src) == 1:
+		idx, w = np.zeros(len(f_dst), dtype=np.intp), np.zeros(len(f_dst))
+	else:
+		idx = np.clip(np.searchsorted(f_src, f_dst, side="right") - 1, 0, len(f_src) - 2)
+		w = (f_dst - f_src[idx]) / (f_src[idx + 1] - f_src[idx])
+	idx.setflags(write=False)
+	w.setflags(write=False)
+
+	_plans[key] = (idx, w)
+	if len(_plans) > PLAN_CACHE_SIZE:
+		_plans.popitem(last=False)
+	return idx, w
+
+
+def apply(p: tuple[np.ndarray, np.ndarray], x: np.ndarray, axis: int = 0) -> np.ndarray:
+	"""Interpolate *x* (frequency on *axis*, any other dims) with the plan *p*."""
+	idx, w = p
+	x = np.moveaxis(x, axis, 0)
+	if x.shape[0] == 1:
+		out = np.repeat(x, len(idx), axis=0)
+	else:
+		w = w.reshape((-1,) + (1,) * (x.ndim - 1))
+		out = x[idx] * (1 - w) + x[idx + 1] * w
+	return np.moveaxis(out, 0, axis)
+
+# -----------------------------------------------------------------------------
+# Network alignment
+# -----------------------------------------------------------------------------
+
+def _as_frequency(frequency) -> rf.Frequency:
+	if isinstance(frequency, rf.Frequency):
+		return frequency
+	return rf.Frequency.from_f(np.asarray(frequency, dtype=float), unit="hz")
+
+
+def align(ntw: rf.Network, frequency) -> rf.Network:
+	"""*ntw* on *frequency* (an rf.Frequency or an array in Hz); unchanged if already there."""
+	frequency = _as_frequency(frequency)
+	if np.array_equal(ntw.f, frequency.f):
+		return ntw
+	return align_many([ntw], frequency)[0]
+
+
+def align_many(ntws: list[rf.Network], frequency) -> list[rf.Network]:
+	"""Put all *ntws* on *frequency*.
+
+	Networks sharing a source grid and port count are stacked and
+	interpolated by a single apply() call with one shared plan.
+	"""
+	frequency = _as_frequency(frequency)
+	out = list(ntws)
+	groups = {}
+	for i, ntw in enumerate(ntws):
+		if not np.array_equal(ntw.f, frequency.f):
+			groups.setdefault((ntw.f.tobytes(), ntw.nports), []).append(i)
+
+	for idxs in groups.values():
+		p = plan(ntws[idxs[0]].f, frequency.f)
+		s = apply(p, np.stack([ntws[i].s for i in idxs]), axis=1)
+		z0 = np.stack([ntws[i].z0 for i in idxs])
+		if np.all(z0 == z0[:, :1]): # constant z0 is kept exact, as skrf does
+			z0 = np.repeat(z0[:, :1], len(p[0]), axis=1)
+		else:
+			z0 = apply(p, z0, axis=1)
+		for k, i in enumerate(idxs):
+			new = rf.Network(frequency=frequency, s=s[k], z0=z0[k], name=ntws[i].name)
+			new.comments = ntws[i].comments
+			out[i] = new
+	return out
+
+
+def same_freq(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, rf.Network]:
+	"""Ensure *ntw_b* is on *ntw_a*'s frequency grid."""
+	return ntw_a, align(ntw_b, ntw_a.frequency)
+
+# -----------------------------------------------------------------------------
+# Common grid
+# -----------------------------------------------------------------------------
+
+def parse_policy(value: str) -> tuple[str, float | None]:
+	"""'union' -> ('union', None), 'step:10e6' -> ('step', 10e6)."""
+	name, _, arg = value.lower().partition(":")
+	if name not in GRID_POLICIES:
+		raise ValueError(f"Unknown grid policy: {value} (expected {'|'.join(GRID_POLICIES[:-1])}|step:<Hz>)")
+	if name != "step":
+		return name, None
+	try:
+		step = float(arg)
+	except ValueError:
+		raise ValueError(f"Grid policy step expects a step in Hz, e.g. step:10e6 (got {value})") from None
+	if step <= 0:
+		raise ValueError(f"Grid step must be positive (got {value})")
+	return name, step
+
+
+def common_grid(freqs: list[np.ndarray], policy: str = "first", step: float | None = None) -> np.ndarray:
+	"""The frequency points (Hz) every grid in *freqs* can be interpolated to under *policy*."""
+	if policy == "first":
+		return freqs[0]
+	f_min = max(f[0] for f in freqs)
+	f_max = min(f[-1] for f in freqs)
+	if f_min > f_max:
+		raise ValueError("The networks don't have any frequency range in common")
+
+	def band(f):
+		return f[(f >= f_min) & (f <= f_max)]
+
+	if policy == "intersection":
+		grid = band(freqs[0])
+	elif policy == "union":
+		grid = np.unique(np.concatenate([band(f) for f in freqs]))
+	elif policy == "step":
+		grid = f_min + step * np.arange(int(np.floor((f_max - f_min) / step + 1e-9)) + 1)
+	else:
+		raise ValueError(f"Unknown grid policy: {policy}")
+	if not len(grid):
+		raise ValueError(f"The '{policy}' grid of these networks is empty")
+	return grid
@@ -0,0 +1,41 @@
+"""snp_lazy.py - deferred import of the heavy modules
+
+`rf = lazy_import("skrf")` binds a module object whose real import runs on
+the first attribute access, so parsing arguments, printing the help or
+cache maintenance never pay for skrf (and the scipy it pulls in).
+matplotlib is imported inside the plotting functions themselves.
+tests/test_startup.py keeps the import of the CLI modules within budget.
+"""
+
+import importlib.util
+import sys
+
+HEAVY_MODULES = ("skrf", "scipy", "matplotlib", "pandas")
+
+# -----------------------------------------------------------------------------
+# Lazy import
+# -----------------------------------------------------------------------------
+
+def lazy_import(name: str):
+	"""*name* as a module that is only executed when one of its attributes is used."""
+	if name in sys.modules:
+		return sys.modules[name]
+	spec = importlib.util.find_spec(name)
+	if spec is None:
+		raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+	loader = importlib.util.LazyLoader(spec.loader)
+	spec.loader = loader
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module
+	loader.exec_module(module)
+	return module
+
+
+def loaded_heavy_modules() -> list[str]:
+	"""Heavy modules that were really executed (a pending lazy module doesn't count)."""
+	loaded = []
+	for name in HEAVY_MODULES:
+		module = sys.modules.get(name)
+		if module is not None and not isinstance(module, importlib.util._LazyModule):
+			loaded.append(name)
+	return loaded
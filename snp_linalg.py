@@ -0,0 +1,350 @@
+"""snp_linalg.py - batched S/T-parameter algebra on stacked numpy arrays
+
+All functions work on arrays of shape (..., P, P) with an even number of
+ports P = 2N, the first N ports being side 1 and the last N side 2 (the
+skrf convention used by Network ** Network).  Any leading dimensions
+(frequency, DUT index, ...) are processed by single batched numpy calls.
+
+Every frequency point is independent, so cascade_s(), deembed_solve()
+and se2gmm() can also split the frequency axis across `threads` worker
+threads (--threads N, env SNP_THREADS): numpy releases the GIL inside
+its ufunc loops and batched linalg calls, so the slices run in parallel.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import os
+import re
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+
+_TERM_RE = re.compile(r"^S(D|C)(D|C)(\d)(\d)$", re.IGNORECASE)
+
+THREAD_MIN_POINTS = 1024    # frequency points per thread below which splitting doesn't pay
+
+threads = max(1, int(os.environ.get("SNP_THREADS", "1")))
+
+_pool = None
+
+# -----------------------------------------------------------------------------
+# Small-matrix kernels
+# -----------------------------------------------------------------------------
+
+def _mm(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+	"""x @ y for stacks of small matrices.
+
+	Summing the k outer products element-wise beats np.matmul's per-matrix
+	overhead for the 1x1 / 2x2 blocks of 2- and 4-port networks.
+	"""
+	out = x[..., :, 0:1] * y[..., 0:1, :]
+	for k in range(1, x.shape[-1]):
+		out = out + x[..., :, k:k + 1] * y[..., k:k + 1, :]
+	return out
+
+
+def _solve(m: np.ndarray, r: np.ndarray) -> np.ndarray:
+	"""m^-1 @ r for stacks of small matrices (closed form up to 2x2)."""
+	n = m.shape[-1]
+	if n == 1:
+		return r / m
+	if n == 2:
+		a, b, c, d = m[..., 0:1, 0:1], m[..., 0:1, 1:2], m[..., 1:2, 0:1], m[..., 1:2, 1:2]
+		det = a * d - b * c
+		r0, r1 = r[..., 0:1, :], r[..., 1:2, :]
+		return np.concatenate([d * r0 - b * r1, a * r1 - c * r0], axis=-2) / det
+	return np.linalg.solve(m, r)
+
+# -----------------------------------------------------------------------------
+# Thread-parallel frequency split
+# -----------------------------------------------------------------------------
+
+def _executor() -> ThreadPoolExecutor:
+	global _pool
+	if _pool is None or _pool._max_workers != threads:
+		if _pool is not None:
+			_pool.shutdown()
+		_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="snp_linalg")
+	return _pool
+
+
+def _split(func, args: tuple, axes: tuple, out_axes=0):
+	"""func(*args) with the frequency axis (axes[i] of args[i]) cut into `threads` slices.
+
+	The slices run on the thread pool and the outputs are joined along
+	*out_axes* (one axis per output when func returns a tuple).  Small
+	sweeps run directly.
+	"""
+	points = args[0].shape[axes[0]]
+	n = min(threads, points // THREAD_MIN_POINTS)
+	if n <= 1:
+		return func(*args)
+
+	def part(k0: int, k1: int) -> tuple:
+		return tuple(a[(slice(None),) * ax + (slice(k0, k1),)] for a, ax in zip(args, axes))
+
+	bounds = np.linspace(0, points, n + 1).astype(int)
+	results = list(_executor().map(lambda b: func(*part(*b)), zip(bounds[:-1], bounds[1:])))
+	if isinstance(results[0], tuple):
+		return tuple(np.concatenate(r, axis=ax) for r, ax in zip(zip(*results), out_axes))
+	return np.concatenate(results, axis=out_axes)
+
+# -----------------------------------------------------------------------------
+# S <-> T conversion
+# -----------------------------------------------------------------------------
+
+def _half(p: int) -> int:
+	if p % 2:
+		raise ValueError("Network does not have an even number of ports")
+	return p // 2
+
+
+def s2t(s: np.ndarray) -> np.ndarray:
+	"""Scattering transfer (T) parameters of *s*, same definition as skrf s2t."""
+	n = _half(s.shape[-1])
+	s11, s12 = s[..., :n, :n], s[..., :n, n:]
+	s21, s22 = s[..., n:, :n], s[..., n:, n:]
+	sinv = np.linalg.inv(s21)
+	w = sinv @ s22
+	t = np.empty(s.shape, dtype=complex)
+	t[..., :n, :n] = s12 - s11 @ w
+	t[..., :n, n:] = s11 @ sinv
+	t[..., n:, :n] = -w
+	t[..., n:, n:] = sinv
+	return t
+
+
+def t2s(t: np.ndarray) -> np.ndarray:
+	"""Inverse of s2t()."""
+	n = _half(t.shape[-1])
+	t11, t12 = t[..., :n, :n], t[..., :n, n:]
+	t21, t22 = t[..., n:, :n], t[..., n:, n:]
+	tinv = np.linalg.inv(t22)
+	w = tinv @ t21
+	s = np.empty(t.shape, dtype=complex)
+	s[..., :n, :n] = t12 @ tinv
+	s[..., :n, n:] = t11 - t12 @ w
+	s[..., n:, :n] = tinv
+	s[..., n:, n:] = -w
+	return s
+
+# -----------------------------------------------------------------------------
+# Cascading
+# -----------------------------------------------------------------------------
+
+def promote_2port(s: np.ndarray, nports: int) -> np.ndarray:
+	"""(F, 2, 2) -> (F, nports, nports): the 2-port on each of the nports/2 lines.
+
+	Line k runs from port k to port k + nports/2, the lines are uncoupled.
+	"""
+	n = _half(nports)
+	idx = np.arange(n)
+	out = np.zeros(s.shape[:-2] + (nports, nports), dtype=complex)
+	out[..., idx, idx] = s[..., 0:1, 0]
+	out[..., idx, n + idx] = s[..., 0:1, 1]
+	out[..., n + idx, idx] = s[..., 1:2, 0]
+	out[..., n + idx, n + idx] = s[..., 1:2, 1]
+	return out
+
+
+def star(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	"""Redheffer star product: S of a ** b (side 2 of *a* to side 1 of *b*).
+
+	Works directly on S (no T-matrices), so segments with S21 = 0 and
+	badly conditioned transfer matrices are handled like skrf's connect.
+	"""
+	n = _half(a.shape[-1])
+	a11, a12, a21, a22 = a[..., :n, :n], a[..., :n, n:], a[..., n:, :n], a[..., n:, n:]
+	b11, b12, b21, b22 = b[..., :n, :n], b[..., :n, n:], b[..., n:, :n], b[..., n:, n:]
+	eye = np.eye(n)
+	x1 = _solve(eye - _mm(b11, a22), np.concatenate([_mm(b11, a21), b12], axis=-1))
+	x2 = _solve(eye - _mm(a22, b11), np.concatenate([a21, _mm(a22, b12)], axis=-1))
+	s = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=complex)
+	s[..., :n, :n] = a11 + _mm(a12, x1[..., :n])
+	s[..., :n, n:] = _mm(a12, x1[..., n:])
+	s[..., n:, :n] = _mm(b21, x2[..., :n])
+	s[..., n:, n:] = b22 + _mm(b21, x2[..., n:])
+	return s
+
+
+def cascade_s(s: np.ndarray) -> np.ndarray:
+	"""S of s[0] ** s[1] ** ... for a (K, F, P, P) stack of equal-z0 networks.
+
+	The chain is reduced as a balanced tree: each level star-multiplies all
+	neighbouring pairs in one batched call, so K networks take
+	ceil(log2(K)) numpy passes over the frequency axis.
+	"""
+	return _split(_cascade_s, (s,), (1,))
+
+
+def _cascade_s(s: np.ndarray) -> np.ndarray:
+	while len(s) > 1:
+		prod = star(s[0:len(s) - 1:2], s[1::2])
+		if len(s) % 2:
+			prod = np.concatenate([prod, s[-1:]])
+		s = prod
+	return s[0]
+
+def attach_s(s: np.ndarray, ports: list[int], c: np.ndarray) -> np.ndarray:
+	"""S of (F, P, P) *s* with a 2-port on each port of *ports* (equal z0).
+
+	c[k] (F, 2, 2) is the 2-port of ports[k]: its port 2 is connected to
+	that port of *s*, its port 1 becomes the new external port.  The
+	2-ports form a diagonal adapter network D (thru on the other ports), so
+	the whole attach is one closed-form star product per frequency point:
+	S' = D11 + D12 S (I - D22 S)^-1 D21 with diagonal D blocks.
+	"""
+	return _split(lambda s, c: _attach_s(s, ports, c), (s, c), (0, 1))
+
+
+def _attach_s(s: np.ndarray, ports: list[int], c: np.ndarray) -> np.ndarray:
+	f, p = s.shape[0], s.shape[-1]
+	d11, d22 = np.zeros((f, p), dtype=complex), np.zeros((f, p), dtype=complex)
+	d12, d21 = np.ones((f, p), dtype=complex), np.ones((f, p), dtype=complex)
+	for k, port in enumerate(ports):
+		d11[:, port], d12[:, port], d21[:, port], d22[:, port] = c[k, :, 0, 0], c[k, :, 0, 1], c[k, :, 1, 0], c[k, :, 1, 1]
+	# (I - D22 S) X = D21, X = (I - D22 S)^-1 D21
+	x = _solve(np.eye(p) - d22[:, :, None] * s, np.eye(p) * d21[:, None, :])
+	out = d12[:, :, None] * _mm(s, x)
+	idx = np.arange(p)
+	out[:, idx, idx] += d11
+	return out
+
+# -----------------------------------------------------------------------------
+# De-embedding
+# -----------------------------------------------------------------------------
+
+def _mT(x: np.ndarray) -> np.ndarray:
+	return np.swapaxes(x, -1, -2)
+
+
+def deembed_solve(s_total: np.ndarray, s_partial: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""S of the network X with total = X ** partial, and the per-frequency condition number.
+
+	T_X is found from T_X @ T_partial = T_total with one batched LU solve
+	(T_partial^T @ T_X^T = T_total^T); neither the inverse network nor an
+	explicit inverse matrix is ever formed.  *s_partial* (F, P, P) is
+	broadcast over any leading axes of *s_total* (n, F, P, P), so many
+	networks can be de-embedded from one fixture in a single call.
+
+	The returned (F,) condition number is the 2-norm condition number of
+	T_partial: large values flag frequencies where the fixture is close to
+	singular and the de-embedded result is ill-posed.
+	"""
+	return _split(_deembed_solve, (s_total, s_partial), (s_total.ndim - 3, 0), (s_total.ndim - 3, 0))
+
+
+def _deembed_solve(s_total: np.ndarray, s_partial: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	t_partial = s2t(s_partial)
+	t_x = _mT(np.linalg.solve(_mT(t_partial), _mT(s2t(s_total))))
+	return t2s(t_x), np.linalg.cond(t_partial)
+
+
+def deembed_network(ntw_a: rf.Network, ntw_b: rf.Network) -> tuple[rf.Network, np.ndarray | None]:
+	"""ntw_a with ntw_b removed from its side 2 (same as ntw_a ** ntw_b.inv), and the fixture
+	condition numbers (None when skrf renormalizes the connection).
+
+	Both networks must share one frequency grid (see SnP_Utils_New.same_freq()).
+	"""
+	if not np.array_equal(ntw_a.z0, ntw_b.z0): # let skrf renormalize the connection
+		return ntw_a ** ntw_b.inv, None
+	s, cond = deembed_solve(ntw_a.s, ntw_b.s)
+	return rf.Network(frequency=ntw_a.frequency, s=s, z0=ntw_a.z0), cond
+
+# -----------------------------------------------------------------------------
+# Mixed-mode conversion
+# -----------------------------------------------------------------------------
+
+def _mixed_mode_matrix(nports: int, p: int) -> np.ndarray:
+	"""Real orthogonal M pairing ports (2k, 2k+1) into differential k and common p+k."""
+	m = np.zeros((nports, nports))
+	r = 1 / np.sqrt(2)
+	for k in range(p):
+		m[k, 2 * k], m[k, 2 * k + 1] = r, -r
+		m[p + k, 2 * k], m[p + k, 2 * k + 1] = r, r
+	for k in range(2 * p, nports):
+		m[k, k] = 1
+	return m
+
+
+def se2gmm(s: np.ndarray, p: int = 2) -> np.ndarray:
+	"""Generalized mixed-mode S of the single-ended (F, P, P) *s* with *p* differential pairs.
+
+	Same port order as rf.Network.se2gmm.  With one real reference
+	impedance on all ports (every Touchstone v1 file) skrf's transform
+	reduces to M @ S @ M^T with a constant orthogonal M.
+	"""
+	if 2 * p > s.shape[-1] or p < 0:
+		raise ValueError('Invalid number of differential ports')
+	m = _mixed_mode_matrix(s.shape[-1], p)
+	return _split(lambda x: m @ x @ m.T, (s,), (0,))
+
+
+def mixed_mode_index(term: str, p: int = 2) -> tuple[int, int]:
+	"""(row, column) of the mixed-mode *term* (SDD21, SCD21, ...) in se2gmm port order."""
+	m = _TERM_RE.match(term.strip())
+	if m is None:
+		raise ValueError(f"Unknown mixed-mode term: {term} (expected SDDij, SCCij, SDCij or SCDij)")
+	out, inp, i, j = m.group(1).upper(), m.group(2).upper(), int(m.group(3)) - 1, int(m.group(4)) - 1
+	if not (0 <= i < p and 0 <= j < p):
+		raise ValueError(f"{term}: no such differential pair (1..{p})")
+	return i + (p if out == "C" else 0), j + (p if inp == "C" else 0)
+
+
+def _terms(terms: list, p: int) -> np.ndarray:
+	return np.array([mixed_mode_index(t, p) if isinstance(t, str) else t for t in terms], dtype=int).reshape(-1, 2)
+
+
+def mixed_mode_weights(terms: list, nports: int, p: int = 2) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""(rows, cols, w) of the mixed-mode *terms*: term k is sum(w[k] * S[rows[k][:, None], cols[k]]).
+
+	*terms* are names (SDD21) or (row, column) pairs in se2gmm port order.
+	A mixed-mode row of M has at most two (+-1/sqrt 2) entries, so each term
+	(M S M^T)[r, c] is a weighted sum of 4 single-ended entries; rows and
+	cols are (K, 2) single-ended ports, w the (K, 2, 2) weights.
+	"""
+	if 2 * p > nports or p < 0:
+		raise ValueError('Invalid number of differential ports')
+	m = _mixed_mode_matrix(nports, p)
+	idx = _terms(terms, p)
+	ports = np.argsort(m == 0, axis=1, kind="stable")[:, :2]
+	weights = np.take_along_axis(m, ports, axis=1)
+	w = weights[idx[:, 0]][:, :, None] * weights[idx[:, 1]][:, None, :]
+	return ports[idx[:, 0]], ports[idx[:, 1]], w
+
+
+def mixed_mode_s(s: np.ndarray, terms: list, p: int = 2) -> np.ndarray:
+	"""(F, K) mixed-mode terms of the single-ended (F, P, P) *s*, without the full se2gmm().
+
+	One gather of the (F, K, 2, 2) single-ended entries of mixed_mode_weights()
+	and one weighted sum.  Same assumption as se2gmm(): one real reference
+	impedance on all ports.
+	"""
+	rows, cols, w = mixed_mode_weights(terms, s.shape[-1], p)
+	return (s[:, rows[:, :, None], cols[:, None, :]] * w).sum(axis=(-2, -1))
+
+
+def mixed_mode_terms(ntw: rf.Network, terms: list, p: int = 2) -> np.ndarray:
+	"""(F, K) mixed-mode *terms* of *ntw* (see mixed_mode_s()), via mixed_mode() when z0 needs it."""
+	z0 = ntw.z0
+	if np.any(z0 != z0.flat[0]) or z0.flat[0].imag != 0:
+		idx = _terms(terms, p)
+		return mixed_mode(ntw, p).s[:, idx[:, 0], idx[:, 1]]
+	return mixed_mode_s(ntw.s, terms, p)
+
+
+def mixed_mode(ntw: rf.Network, p: int = 2) -> rf.Network:
+	"""Mixed-mode copy of *ntw* (like ntw.copy().se2gmm(p)), via se2gmm() when z0 allows it."""
+	z0 = ntw.z0
+	if np.any(z0 != z0.flat[0]) or z0.flat[0].imag != 0:
+		mm = ntw.copy()
+		mm.se2gmm(p=p)
+		return mm
+	z0_mm = z0.copy()
+	z0_mm[:, :p], z0_mm[:, p:2 * p] = 2 * z0.flat[0], 0.5 * z0.flat[0]
+	mm = rf.Network(frequency=ntw.frequency, s=se2gmm(ntw.s, p), z0=z0_mm, name=ntw.name)
+	mm.port_modes[:p] = "D"
+	mm.port_modes[p:2 * p] = "C"
+	return mm
@@ -0,0 +1,203 @@
+"""snp_mask.py - pass/fail of S-parameter limit masks, without plotting
+
+A mask is a piecewise-linear limit line (dB over frequency) on one
+parameter: single-ended Sij, or the mixed-mode SDDij / SCCij / SDCij /
+SCDij of a 4-port (ports 1-2 and 3-4 as the two differential pairs, as
+in rf.Network.se2gmm).  A 'min' mask fails where the parameter is below
+the line (insertion loss), a 'max' mask where it is above (return loss).
+Masks are only evaluated inside their own frequency range, and only on
+networks with "nports" ports when a mask gives that (optional) key.
+
+Every mask of a file is evaluated in one vectorized pass: the dB traces
+and the interpolated limit lines are stacked as (F, masks) arrays, the
+margin (distance to the limit, negative = fail) is one subtraction and
+the failing ranges come from the sign changes of the margin.
+
+Mask files:
+masks.json	- [{"name": "FER1", "param": "SDD21", "type": "min", ["nports": 4,]
+		    "points": [[f_hz, limit_db], ...]}, ...]
+masks.csv	- header 'name,param,type,freq_hz,limit_db[,nports]', one row per point
+
+Without a mask file the IEEE370 FER masks drawn by bisect are used
+(SDD21 >= -15 dB, SDD11 <= -10 dB, S21/S11 for 2-ports).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import csv
+import json
+import re
+
+import numpy as np
+
+import snp_linalg
+from snp_touchstone import load_network
+
+MASK_TYPES = ("min", "max")
+DEFAULT_MASKS = [
+	{"name": "IEEE370 FER1", "param": "SDD21", "type": "min", "points": [[0.0, -15.0], [np.inf, -15.0]]},
+	{"name": "IEEE370 FER2", "param": "SDD11", "type": "max", "points": [[0.0, -10.0], [np.inf, -10.0]]},
+	{"name": "IEEE370 FER1", "param": "S21", "type": "min", "points": [[0.0, -15.0], [np.inf, -15.0]], "nports": 2},
+	{"name": "IEEE370 FER2", "param": "S11", "type": "max", "points": [[0.0, -10.0], [np.inf, -10.0]], "nports": 2},
+]
+
+_PARAM_RE = re.compile(r"^(S|SDD|SCC|SDC|SCD)(\d)(\d)$", re.IGNORECASE)
+
+HELP = """
+check	<file1.SnP> [<file2.SnP> ...] [--mask masks.json|csv] [--out report.csv|json]
+	(exit code 1 when a mask fails)
+"""
+
+# -----------------------------------------------------------------------------
+# Masks
+# -----------------------------------------------------------------------------
+
+def _mask(name: str, param: str, kind: str, points, nports=None) -> dict:
+	kind = kind.strip().lower()
+	if kind not in MASK_TYPES:
+		raise ValueError(f"Mask {name}: unknown type {kind} (expected min|max)")
+	if not _PARAM_RE.match(param.strip()):
+		raise ValueError(f"Mask {name}: unknown parameter {param} (expected Sij, SDDij, SCCij, SDCij or SCDij)")
+	points = np.asarray(points, dtype=float).reshape(-1, 2)
+	if len(points) < 2 or np.any(np.diff(points[:, 0]) < 0):
+		raise ValueError(f"Mask {name}: needs at least 2 points in increasing frequency")
+	return {"name": name, "param": param.strip().upper(), "type": kind, "points": points,
+			"nports": int(nports) if nports not in (None, "") else None}
+
+
+def load_masks(path: Path | None = None) -> list[dict]:
+	"""Masks of a JSON/CSV mask file (the IEEE370 FER masks when *path* is None)."""
+	if path is None:
+		return [_mask(m["name"], m["param"], m["type"], m["points"], m.get("nports")) for m in DEFAULT_MASKS]
+	path = Path(path)
+	if not path.is_file():
+		raise FileNotFoundError(f"No such mask file: {path}")
+	if path.suffix.lower() == ".json":
+		rows = json.loads(path.read_text())
+		return [_mask(r["name"], r["param"], r["type"], r["points"], r.get("nports")) for r in rows]
+
+	grouped = {}
+	with open(path, newline="") as fid:
+		for row in csv.DictReader(fid):
+			key = (row["name"], row["param"], row["type"], row.get("nports"))
+			grouped.setdefault(key, []).append((float(row["freq_hz"]), float(row["limit_db"])))
+	if not grouped:
+		raise ValueError(f"{path} holds no mask points")
+	return [_mask(name, param, kind, points, nports) for (name, param, kind, nports), points in grouped.items()]
+
+# -----------------------------------------------------------------------------
+# Evaluation
+# -----------------------------------------------------------------------------
+
+def _index(param: str, nports: int) -> tuple[bool, int, int] | None:
+	"""(mixed mode, row, column) of *param*, None when *nports* doesn't have it."""
+	kind, i, j = _PARAM_RE.match(param).groups()
+	i, j = int(i) - 1, int(j) - 1
+	kind = kind.upper()
+	if kind == "S":
+		return (False, i, j) if i < nports and j < nports else None
+	if nports != 4 or i > 1 or j > 1:
+		return None
+	return (True, *snp_linalg.mixed_mode_index(param, p=2))
+
+
+def _ranges(f: np.ndarray, fail: np.ndarray) -> list[tuple[float, float]]:
+	"""(start, stop) frequencies of the runs of True in *fail*."""
+	edges = np.diff(np.concatenate([[0], fail.astype(np.int8), [0]]))
+	starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+	return [(float(f[a]), float(f[b])) for a, b in zip(starts, stops)]
+
+
+def check_network(ntw, masks: list[dict]) -> list[dict]:
+	"""Evaluate the *masks* that apply to *ntw*; one result dict per mask."""
+	idx = [(mask, _index(mask["param"], ntw.nports)) for mask in masks if mask["nports"] in (None, ntw.nports)]
+	idx = [(mask, where) for mask, where in idx if where is not None]
+	if not idx:
+		return []
+
+	f = ntw.f
+	rows = np.array([r for _, (_, r, _) in idx])
+	cols = np.array([c for _, (_, _, c) in idx])
+	mixed = np.array([m for _, (m, _, _) in idx])
+
+	# (F, masks) traces, limits and margins; only the masked mixed-mode terms are computed
+	values = np.empty((len(f), len(idx)), dtype=complex)
+	values[:, ~mixed] = ntw.s[:, rows[~mixed], cols[~mixed]]
+	if mixed.any():
+		values[:, mixed] = snp_linalg.mixed_mode_terms(ntw, np.column_stack([rows[mixed], cols[mixed]]), p=2)
+	with np.errstate(divide="ignore"):
+		db = 20 * np.log10(np.abs(values))
+	limit = np.column_stack([np.interp(f, m["points"][:, 0], m["points"][:, 1]) for m, _ in idx])
+	inside = np.column_stack([(f >= m["points"][0, 0]) & (f <= m["points"][-1, 0]) for m, _ in idx])
+	sign = np.array([1.0 if m["type"] == "min" else -1.0 for m, _ in idx])
+	margin = np.where(inside, (db - limit) * sign, np.inf)
+	fail = margin < 0
+
+	worst = np.argmin(margin, axis=0)
+	results = []
+	for k, (mask, _) in enumerate(idx):
+		evaluated = bool(inside[:, k].any())
+		results.append({
+			"file": ntw.name, "mask": mask["name"], "param": mask["param"], "type": mask["type"],
+			"points": int(inside[:, k].sum()),
+			"worst_margin_db": float(margin[worst[k], k]) if evaluated else None,
+			"worst_freq_hz": float(f[worst[k]]) if evaluated else None,
+			"status": "N/A" if not evaluated else "FAIL" if fail[:, k].any() else "PASS",
+			"fail_ranges_hz": _ranges(f, fail[:, k]),
+		})
+	return results
+
+
+def check_files(paths: list[Path], masks: list[dict]) -> list[dict]:
+	"""check_network() of every file; a file that can't be loaded gives an ERROR row."""
+	results = []
+	for path in paths:
+		try:
+			ntw = load_network(path)
+		except (ValueError, NotImplementedError, OSError) as err:
+			results.append({"file": Path(path).stem, "mask": "", "param": "", "type": "", "points": 0,
+							"worst_margin_db": None, "worst_freq_hz": None, "status": "ERROR",
+							"fail_ranges_hz": [], "error": str(err)})
+			continue
+		ntw.name = Path(path).stem
+		rows = check_network(ntw, masks)
+		if not rows:
+			results.append({"file": ntw.name, "mask": "", "param": "", "type": "", "points": 0,
+							"worst_margin_db": None, "worst_freq_hz": None, "status": "N/A",
+							"fail_ranges_hz": [], "error": f"no mask applies to a {ntw.nports}-port"})
+		results += rows
+	return results
+
+# -----------------------------------------------------------------------------
+# Reports
+# -----------------------------------------------------------------------------
+
+def _fmt_ranges(ranges: list, limit: int | None = None) -> str:
+	text = ";".join(f"{a / 1e6:.3f}-{b / 1e6:.3f}MHz" for a, b in ranges[:limit])
+	return text + (f" (+{len(ranges) - limit} more)" if limit is not None and len(ranges) > limit else "")
+
+
+def print_results(results: list[dict]) -> None:
+	print(f"{'file':28s} {'mask':16s} {'param':6s} {'type':4s} {'status':6s} {'margin':>9s} {'@ MHz':>10s}  failing")
+	for r in results:
+		margin = f"{r['worst_margin_db']:7.2f}dB" if r["worst_margin_db"] is not None else ""
+		freq = f"{r['worst_freq_hz'] / 1e6:10.3f}" if r["worst_freq_hz"] is not None else ""
+		print(f"{r['file']:28s} {r['mask']:16s} {r['param']:6s} {r['type']:4s} {r['status']:6s} {margin:>9s} {freq:>10s}  "
+			  f"{r.get('error') or _fmt_ranges(r['fail_ranges_hz'], 4)}")
+
+
+def save_results(results: list[dict], dst: Path) -> None:
+	"""Save as JSON (ranges as lists) or CSV (ranges as 'start-stopMHz;...')."""
+	dst = Path(dst)
+	if dst.suffix.lower() == ".json":
+		dst.write_text(json.dumps(results, indent=1))
+		return
+	if dst.suffix.lower() != ".csv":
+		raise ValueError(f"Unknown report format: {dst.name} (expected .csv or .json)")
+	fields = ["file", "mask", "param", "type", "status", "points", "worst_margin_db", "worst_freq_hz", "fail_ranges"]
+	with open(dst, "w", newline="") as fid:
+		writer = csv.DictWriter(fid, fields, extrasaction="ignore")
+		writer.writeheader()
+		for r in results:
+			writer.writerow({**r, "fail_ranges": r.get("error") or _fmt_ranges(r["fail_ranges_hz"])})
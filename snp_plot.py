@@ -0,0 +1,214 @@
+"""snp_plot.py - Insertion/Return loss report figures, decoupled from the RF math
+
+The create_* functions only describe a report (title, PNG name, dB traces
+and IEEE370 mask lines) as plain arrays; how it is drawn depends on the
+plot mode:
+
+show	- draw with the default backend, save the PNG, block on plt.show()  (default)
+async	- render the PNGs on the Agg backend in a background process pool
+none	- skip all figures
+
+matplotlib is only imported where a figure is actually drawn, so the
+'async' and 'none' modes never touch a display.
+
+Traces are decimated before drawing: each of PLOT_BUCKETS runs of
+consecutive points keeps only its first, minimum, maximum and last
+point (M4), so a trace holds a few points per pixel column of the figure
+and draws the same envelope, peaks and notches as the full sweep.  A
+100k point sweep renders like an 8k point one.
+The render workers keep one figure per panel count and only swap the
+line data, titles and legends between PNGs instead of building a new
+figure each time.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import os
+
+PLOT_MODES = ("show", "async", "none")
+PLOT_WORKERS = min(4, os.cpu_count() or 1)
+PLOT_BUCKETS = 2000     # M4 buckets per trace: 2 per pixel column of a 10 in figure at 100 dpi
+
+mode = "show"
+buckets = PLOT_BUCKETS  # --plot-points=N: N // 4 buckets, 0 = draw every point
+
+_pool = None
+_pending = []
+_figures = {}           # render worker: reusable (figure, title) per panel count
+
+HELP = """
+--no-plot	- don't create any figure (same as --plot=none)
+--plot=MODE	- show (default) | async: save PNGs in background workers | none
+--plot-points=N	- at most N points per trace, min/max envelope kept (default 8000, 0 = all points)
+"""
+
+# -----------------------------------------------------------------------------
+# Utility helpers
+# -----------------------------------------------------------------------------
+
+def parse_plot_option(argv: list[str]) -> list[str]:
+	"""Consume --no-plot / --plot=MODE from *argv*, return the other args."""
+	global mode, buckets
+	rest = []
+	for arg in argv:
+		if arg == "--no-plot":
+			mode = "none"
+		elif arg.startswith("--plot-points="):
+			value = arg.split("=", 1)[1]
+			if not value.isdigit():
+				raise ValueError(f"--plot-points expects a number of points (got {value})")
+			buckets = int(value) // 4
+		elif arg.startswith("--plot="):
+			value = arg.split("=", 1)[1].lower()
+			if value not in PLOT_MODES:
+				raise ValueError(f"Unknown plot mode: {value} (expected {'|'.join(PLOT_MODES)})")
+			mode = value
+		else:
+			rest.append(arg)
+	return rest
+
+
+def decimate(x: np.ndarray, y: np.ndarray, buckets: int) -> tuple[np.ndarray, np.ndarray]:
+	"""M4 envelope of *y*: per bucket of consecutive points its first, minimum, maximum and last point, in order.
+
+	Traces of up to 4 * *buckets* points (or *buckets* 0) are returned unchanged.
+	"""
+	n = len(y)
+	if buckets <= 0 or n <= 4 * buckets:
+		return x, y
+	size = -(-n // buckets)
+	rows = -(-n // size)
+	padded = np.concatenate([y, np.full(rows * size - n, y[-1])]).reshape(rows, size)
+	start = np.arange(rows) * size
+	stop = np.minimum(start + size, n) - 1
+	idx = np.concatenate([start, stop, start + padded.argmin(axis=1), start + padded.argmax(axis=1)])
+	idx = np.unique(np.minimum(idx, n - 1))
+	return x[idx], y[idx]
+
+
+def trace(f: np.ndarray, values: np.ndarray, label: str, mask: tuple[str, float] | None = None) -> tuple:
+	"""One subplot: |*values*| in dB over *f* in Hz (decimated), optionally with a flat mask line.
+
+	Returns (label, f in MHz, dB, mask).
+	"""
+	with np.errstate(divide="ignore"):
+		db = 20 * np.log10(np.abs(values))
+	f, db = decimate(np.asarray(f) / 1e6, db, buckets)
+	return (label, f, db, mask)
+
+
+def panel(ntw, m: int, n: int, label: str, mask: tuple[str, float] | None = None) -> tuple:
+	"""trace() of S_mn of *ntw*."""
+	return trace(ntw.f, ntw.s[:, m, n], label, mask)
+
+
+def _draw(plt, job: dict):
+	fig = plt.figure(figsize=(10, 5))
+	fig.suptitle(job["title"])
+	for idx, (label, f, db, mask) in enumerate(job["panels"]):
+		ax = fig.add_subplot(1, len(job["panels"]), idx + 1)
+		ax.plot(f, db, label=label)
+		ax.set_xlabel("Frequency (MHz)")
+		ax.set_ylabel("Magnitude (dB)")
+		ax.autoscale(True, "x", True)
+		ax.autoscale(True, "y", False)
+		if mask is not None:
+			mask_label, mask_value = mask
+			ax.plot(f[[0, -1]], [mask_value] * 2, "--", label=mask_label)
+		ax.legend()
+		ax.grid()
+	return fig
+
+
+def _template(plt, npanels: int):
+	"""Worker side: (figure, title Text) of *npanels* subplots, built once per process.
+
+	Each subplot holds a trace line (C0) and a dashed mask line (C1) like
+	the ones _draw() creates; _render_png() only swaps their data.
+	"""
+	if npanels not in _figures:
+		fig = plt.figure(figsize=(10, 5))
+		title = fig.suptitle("")
+		for idx in range(npanels):
+			ax = fig.add_subplot(1, npanels, idx + 1)
+			ax.plot([], [], color="C0")
+			ax.plot([], [], "--", color="C1")
+			ax.set_xlabel("Frequency (MHz)")
+			ax.set_ylabel("Magnitude (dB)")
+			ax.grid()
+		_figures[npanels] = fig, title
+	return _figures[npanels]
+
+
+def _render_png(job: dict) -> str:
+	"""Worker side: draw *job* off-screen on a reused figure and save it."""
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	fig, title = _template(plt, len(job["panels"]))
+	title.set_text(job["title"])
+	for ax, (label, f, db, mask) in zip(fig.axes, job["panels"]):
+		trace, mask_line = ax.lines
+		trace.set_data(f, db)
+		trace.set_label(label)
+		if mask is None:
+			mask_line.set_data([], [])
+			mask_line.set_label("_nolegend_")       # left out of the legend
+		else:
+			mask_line.set_data(f[[0, -1]], [mask[1]] * 2)
+			mask_line.set_label(mask[0])
+		ax.relim()
+		ax.autoscale(True, "x", True)
+		ax.autoscale(True, "y", False)
+		ax.autoscale_view()
+		ax.legend()
+	fig.savefig(job["png"])
+	return job["png"]
+
+# -----------------------------------------------------------------------------
+# Report API
+# -----------------------------------------------------------------------------
+
+def report(png: Path | None, title: str, ntw, panels: list[tuple]) -> None:
+	"""Draw / queue / skip a report figure of *ntw* according to the plot mode.
+
+	*panels* come from panel(); *png* None means the figure is only shown.
+	"""
+	if mode == "none" or (mode == "async" and png is None):
+		return
+	job = {"png": None if png is None else str(png), "title": title, "panels": panels}
+
+	if mode == "async":
+		global _pool
+		if _pool is None:
+			_pool = ProcessPoolExecutor(max_workers=PLOT_WORKERS)
+		_pending.append(_pool.submit(_render_png, job))
+		return
+
+	import matplotlib.pyplot as plt
+	_draw(plt, job)
+	if job["png"]:
+		plt.savefig(job["png"])
+
+
+def show() -> None:
+	"""plt.show() in 'show' mode, no-op otherwise."""
+	if mode == "show":
+		import matplotlib.pyplot as plt
+		plt.show()
+
+
+def wait() -> None:
+	"""Wait for the queued PNGs and shut the render pool down."""
+	global _pool
+	for fut in _pending:
+		try:
+			print(f"[plot] {fut.result()}")
+		except Exception as err:
+			print(f"[plot] failed: {err}")
+	_pending.clear()
+	if _pool is not None:
+		_pool.shutdown()
+		_pool = None
@@ -0,0 +1,174 @@
+"""snp_profile.py - per-stage timing of the SnP_Utils operations (--profile)
+
+The create_* functions wrap their stages (load, se2gmm, quality check,
+bisect, cascade, write, plot ...) in `with stage("name"):`.  Off by
+default, a stage then costs one flag test.  With --profile every stage
+records its wall time, CPU time and tracemalloc peak (memory allocated
+above the stage start); stages may nest.
+
+Outputs (at the end of the run):
+--profile			- table on stdout, stages with the same name merged
+--profile=json:<file>		- every stage as a JSON list
+--profile=trace:<file>		- Chrome trace (chrome://tracing, ui.perfetto.dev)
+--profile-stage=<name>		- also run that stage under cProfile: top functions
+				  printed, full stats saved to profile_<name>.prof
+
+Times include the tracemalloc overhead, which mostly hits pure-Python code.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+enabled = False
+output = "table"        # table | json:<file> | trace:<file>
+cprofile_stage = None   # stage name run under cProfile
+
+_records = []
+_stack = []
+_t0 = 0.0
+_cpu0 = 0.0
+_peak = 0               # highest traced memory of the run (tracemalloc's own peak is reset per stage)
+
+HELP = """
+--profile[=table|json:FILE|trace:FILE]	- time every stage: wall, CPU, tracemalloc peak (table / JSON / Chrome trace)
+--profile-stage=NAME	- run stage NAME under cProfile as well (stats in profile_NAME.prof)
+"""
+
+# -----------------------------------------------------------------------------
+# Recording
+# -----------------------------------------------------------------------------
+
+def parse_profile_option(argv: list[str]) -> list[str]:
+	"""Handle --profile[=...] / --profile-stage=NAME; return argv without them."""
+	global enabled, output, cprofile_stage
+	rest = []
+	for arg in argv:
+		if arg == "--profile" or arg.startswith("--profile="):
+			value = arg.partition("=")[2] or "table"
+			kind, _, path = value.partition(":")
+			if kind not in ("table", "json", "trace") or (kind != "table") != bool(path):
+				raise ValueError(f"Unknown profile output: {value} (expected table | json:<file> | trace:<file>)")
+			enabled, output = True, value
+		elif arg.startswith("--profile-stage="):
+			enabled, cprofile_stage = True, arg.split("=", 1)[1]
+		else:
+			rest.append(arg)
+	if enabled:
+		start()
+	return rest
+
+
+def start() -> None:
+	"""Start a new profile (clears the recorded stages)."""
+	global _t0, _cpu0, _peak
+	_records.clear()
+	_stack.clear()
+	_t0, _cpu0, _peak = time.perf_counter(), time.process_time(), 0
+	if not tracemalloc.is_tracing():
+		tracemalloc.start()
+
+
+def reset() -> None:
+	"""Back to the default (off) - a `serve` worker runs main() many times."""
+	global enabled, output, cprofile_stage
+	enabled, output, cprofile_stage = False, "table", None
+	_records.clear()
+	_stack.clear()
+	if tracemalloc.is_tracing():
+		tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str):
+	"""Record the enclosed block as stage *name* (no-op unless profiling)."""
+	if not enabled:
+		yield
+		return
+
+	global _peak
+	current, peak = tracemalloc.get_traced_memory()
+	_peak = max(_peak, peak)
+	if _stack:      # the parent keeps the peak it reached before this stage
+		_stack[-1]["peak"] = max(_stack[-1]["peak"], peak)
+	tracemalloc.reset_peak()
+	rec = {"name": name, "depth": len(_stack), "start": time.perf_counter(), "cpu": time.process_time(),
+		   "base": current, "peak": current}
+	_stack.append(rec)
+
+	profiler = None
+	if name == cprofile_stage:
+		import cProfile
+		profiler = cProfile.Profile()
+		profiler.enable()
+	try:
+		yield
+	finally:
+		if profiler is not None:
+			profiler.disable()
+			_save_cprofile(profiler, name)
+		end, cpu = time.perf_counter(), time.process_time()
+		_stack.pop()
+		rec["peak"] = max(rec["peak"], tracemalloc.get_traced_memory()[1])
+		_peak = max(_peak, rec["peak"])
+		if _stack:
+			_stack[-1]["peak"] = max(_stack[-1]["peak"], rec["peak"])
+		_records.append({"name": name, "depth": rec["depth"], "start_s": rec["start"] - _t0,
+						 "wall_s": end - rec["start"], "cpu_s": cpu - rec["cpu"],
+						 "peak_kb": (rec["peak"] - rec["base"]) / 1024, "tid": threading.get_ident()})
+
+
+def _save_cprofile(profiler, name: str) -> None:
+	import pstats
+	prof = Path(f"profile_{name.replace(' ', '_')}.prof")
+	profiler.dump_stats(prof)
+	print(f"[profile] cProfile of stage '{name}' saved to {prof}")
+	pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+# -----------------------------------------------------------------------------
+# Reports
+# -----------------------------------------------------------------------------
+
+def _table() -> None:
+	merged = {}
+	for rec in sorted(_records, key=lambda r: r["start_s"]):
+		row = merged.setdefault((rec["depth"], rec["name"]), {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_kb": 0.0})
+		row["calls"] += 1
+		row["wall_s"] += rec["wall_s"]
+		row["cpu_s"] += rec["cpu_s"]
+		row["peak_kb"] = max(row["peak_kb"], rec["peak_kb"])
+	print(f"{'stage':32s} {'calls':>5s} {'wall':>10s} {'cpu':>10s} {'peak mem':>10s}")
+	for (depth, name), row in merged.items():
+		print(f"{'  ' * depth + name:32s} {row['calls']:5d} {row['wall_s']*1e3:8.1f}ms {row['cpu_s']*1e3:8.1f}ms "
+			  f"{row['peak_kb']/1024:8.1f}MB")
+	print(f"{'total':32s} {'':5s} {(time.perf_counter() - _t0)*1e3:8.1f}ms {(time.process_time() - _cpu0)*1e3:8.1f}ms "
+		  f"{max(_peak, tracemalloc.get_traced_memory()[1])/1024**2:8.1f}MB")
+
+
+def _trace_events() -> list[dict]:
+	pid = os.getpid()
+	return [{"name": rec["name"], "ph": "X", "pid": pid, "tid": rec["tid"],
+			 "ts": rec["start_s"] * 1e6, "dur": rec["wall_s"] * 1e6,
+			 "args": {"cpu_ms": rec["cpu_s"] * 1e3, "peak_kb": rec["peak_kb"]}} for rec in _records]
+
+
+def report() -> None:
+	"""Print / save the recorded stages according to the --profile output."""
+	if not enabled:
+		return
+	kind, _, path = output.partition(":")
+	if kind == "table":
+		_table()
+		return
+	records = sorted(_records, key=lambda r: r["start_s"])
+	if kind == "json":
+		Path(path).write_text(json.dumps(records, indent=1))
+	else:
+		Path(path).write_text(json.dumps({"traceEvents": _trace_events(), "displayTimeUnit": "ms"}))
+	print(f"[profile] {len(records)} stage(s) saved to {path}")
@@ -0,0 +1,148 @@
+"""snp_quality.py - tiered IEEE370 frequency-domain quality gate
+
+Tier 1 (pre-screen)	- the IEEE370 initial passivity, reciprocity and causality
+			  metrics (PQMi / RQMi / CQMi) computed with batched numpy
+			  over all frequencies and S-pairs at once
+Tier 2 (full)		- skrf's IEEEP370_FD_QM reference implementation, run only
+			  when a pre-screen metric is within PRESCREEN_MARGIN of the
+			  pass criteria, or when explicitly requested (--full-qm)
+
+Verdicts are normal entries of the parsed-network cache (same LRU cap),
+keyed by a digest of the evaluated S / z0 data, the port mode and the
+criteria, so checking the same network again is instant.  A pre-screen
+verdict is upgraded in place when the full check is asked for later.
+"""
+
+import numpy as np
+import hashlib
+
+import snp_cache
+import snp_linalg
+
+MM_PASS_CRITERIA = 95
+PRESCREEN_MARGIN = 1.0      # percent points around the criteria that need the full check
+VERDICT_VERSION = 2         # bump when the metrics change: invalidates the cached verdicts
+
+# -----------------------------------------------------------------------------
+# Vectorized metrics (IEEE 370-2020, same definitions as skrf IEEEP370_FD_QM)
+# -----------------------------------------------------------------------------
+
+def passivity(s: np.ndarray) -> float:
+	"""PQMi: share of frequencies where the 2-norm of S stays <= 1."""
+	A, B = 1.00001, 0.1
+	pm = np.linalg.norm(s, 2, axis=(1, 2))
+	pw = np.where(pm > A, (pm - A) / B, 0.0)
+	return max(len(s) - pw.sum(), 0) / len(s) * 100.
+
+
+def reciprocity(s: np.ndarray) -> float:
+	"""RQMi: mean |Sij - Sji| per frequency against a 1e-6 tolerance."""
+	B, C = 0.1, 1e-6
+	nports = s.shape[-1]
+	rm = np.abs(s - np.swapaxes(s, 1, 2)).sum(axis=(1, 2)) / (nports * (nports - 1))
+	rw = np.where(rm > C, (rm - C) / B, 0.0)
+	return max(len(s) - rw.sum(), 0) / len(s) * 100.
+
+
+def causality(s: np.ndarray) -> float:
+	"""CQMi: worst S-pair share of clockwise rotation between consecutive points."""
+	v = np.diff(s, axis=0)
+	r = v[1:].real * v[:-1].imag - v[1:].imag * v[:-1].real
+	total = np.abs(r).sum(axis=0)
+	positive = np.where(r > 0, r, 0).sum(axis=0)
+	with np.errstate(invalid="ignore", divide="ignore"):
+		cqm = np.fmax(positive / total, 0) * 100.
+	constant = np.all(s == s[:1], axis=0)
+	return float(np.min(np.where(constant, 100., np.nan_to_num(cqm))))
+
+
+def _evaluate(name: str, value: float) -> str:
+	if name == "causality":
+		bounds = ((20., "poor"), (50., "inconclusive"), (80., "acceptable"))
+	else:
+		bounds = ((80., "poor"), (99., "inconclusive"), (99.9, "acceptable"))
+	for limit, label in bounds:
+		if value <= limit:
+			return label
+	return "good"
+
+
+def _se_quality(s: np.ndarray) -> dict:
+	out = {}
+	for name, fn in (("causality", causality), ("passivity", passivity), ("reciprocity", reciprocity)):
+		value = float(fn(s))
+		out[name] = {"value": value, "evaluation": _evaluate(name, value)}
+	return out
+
+
+def prescreen(ntw) -> dict:
+	"""Tier 1 metrics of *ntw*, same layout as IEEEP370_FD_QM.check_mm/se_quality()."""
+	if ntw.nports == 4:
+		mm = snp_linalg.mixed_mode(ntw, p=2)
+		return {"dd": _se_quality(mm.s[:, :2, :2]), "cc": _se_quality(mm.s[:, 2:, 2:])}
+	return _se_quality(ntw.s)
+
+
+def full_check(ntw) -> dict:
+	"""Tier 2: skrf's reference IEEE370 implementation (plain floats, storable as JSON)."""
+	from skrf.calibration.deembedding import IEEEP370_FD_QM
+	fd_qm = IEEEP370_FD_QM()
+	qm = fd_qm.check_mm_quality(ntw) if ntw.nports == 4 else fd_qm.check_se_quality(ntw)
+	modes = qm.items() if "dd" in qm else [(None, qm)]
+	plain = {mode: {k: {"value": float(v["value"]), "evaluation": v["evaluation"]} for k, v in m.items()}
+			 for mode, m in modes}
+	return plain if "dd" in qm else plain[None]
+
+# -----------------------------------------------------------------------------
+# Gate
+# -----------------------------------------------------------------------------
+
+def _values(qm: dict) -> list[float]:
+	modes = [qm["dd"], qm["cc"]] if "dd" in qm else [qm]
+	return [float(m[k]["value"]) for m in modes for k in ("causality", "passivity", "reciprocity")]
+
+
+def print_qm(qm: dict) -> None:
+	"""Print *qm* like IEEEP370_FD_QM.print_qm()."""
+	for title, mode in ((("Differential mode", qm["dd"]), ("Common mode", qm["cc"])) if "dd" in qm else ((None, qm),)):
+		if title:
+			print(title)
+		for k, v in mode.items():
+			print(f"{k} is {v['evaluation']} ({float(v['value']):.2f}%)")
+
+
+def verdict_key(ntw, criteria: float = MM_PASS_CRITERIA) -> str:
+	"""Cache key of the verdict of *ntw*: digest of the evaluated data, port mode and criteria."""
+	h = hashlib.sha1(f"{VERDICT_VERSION}|{'mm' if ntw.nports == 4 else 'se'}|{criteria}|{ntw.s.shape}".encode())
+	for arr in (ntw.f, ntw.s, ntw.z0):
+		h.update(np.ascontiguousarray(arr).tobytes())
+	return "q-" + h.hexdigest()
+
+
+def gate(ntw, criteria: float = MM_PASS_CRITERIA, full: bool = False) -> tuple[bool, dict, str]:
+	"""IEEE370 verdict of *ntw*: (all metrics >= criteria, metrics, tier).
+
+	*tier* tells where the verdict comes from: 'cached', 'pre-screen' or
+	'full'; *full* forces the reference check.
+	"""
+	key = verdict_key(ntw, criteria) if snp_cache.enabled else None
+	hit = snp_cache.get(key) if key is not None else None
+	if hit is not None and (hit[3]["tier"] == "full" or not full):
+		return hit[3]["pass"], hit[3]["qm"], "cached"
+
+	qm, tier = prescreen(ntw), "pre-screen"
+	if full or any(abs(v - criteria) < PRESCREEN_MARGIN for v in _values(qm)):
+		qm, tier = full_check(ntw), "full"
+	passed = all(v >= criteria for v in _values(qm))
+
+	if key is not None:
+		info = {"kind": "verdict", "pass": passed, "qm": qm, "tier": tier}
+		try:
+			if hit is not None:     # pre-screen verdict upgraded by the full check
+				snp_cache.update_info(key, info)
+			else:
+				empty = np.empty(0)
+				snp_cache.put(key, empty, empty, empty, info)
+		except OSError as err:
+			print(f"[cache] verdict not stored: {err}")
+	return passed, qm, tier
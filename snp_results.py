@@ -0,0 +1,112 @@
+"""snp_results.py - content-addressed store of bisect/cascade/deembed results
+
+A result network is stored in the snp_cache folder (same .npy layout,
+same size cap and LRU eviction as the parsed files) under a key made of:
+
+	operation | SHA-1 of every input file | parameters (z0, grid ...) | skrf + store version
+
+so re-running an operation on unchanged inputs returns the earlier
+network without computing it again.  The key holds content only: the
+caller names the result (and its output files) after the inputs of the
+current call, not after the run that stored it.  The Touchstone files written from
+a result are recorded with their size and mtime: a requested ri/ma/db
+file that is still on disk untouched is not rewritten.
+
+Use `SnP_Utils_New.py cache stats|prune|clear` to inspect or trim the store.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import hashlib
+
+import numpy as np
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+
+import snp_cache
+from snp_touchstone import form_outputs, network_from_arrays, write_outputs
+
+RESULT_VERSION = 1      # bump when an operation's math changes
+
+# -----------------------------------------------------------------------------
+# Store
+# -----------------------------------------------------------------------------
+
+def result_key(op: str, inputs: list[Path], params: dict | None = None) -> str | None:
+	"""Content address of *op* applied to *inputs* with *params* (None when the cache is off)."""
+	if not snp_cache.enabled:
+		return None
+	parts = [op, f"skrf {rf.__version__}", f"v{RESULT_VERSION}"]
+	parts += [snp_cache.file_digest(p) for p in inputs]
+	parts += [f"{k}={params[k]}" for k in sorted(params or {})]
+	return "r-" + hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def load(key: str | None) -> rf.Network | None:
+	"""The stored network of *key*, or None (also when the cache is disabled)."""
+	if key is None or not snp_cache.enabled:
+		return None
+	hit = snp_cache.get(key)
+	if hit is None:
+		return None
+	return network_from_arrays(*hit)
+
+
+def load_cond(key: str | None):
+	"""The de-embedding condition numbers stored with *key* (None if there are none)."""
+	hit = snp_cache.get(key) if key is not None and snp_cache.enabled else None
+	cond = hit[3].get("cond") if hit is not None else None
+	return None if cond is None else np.asarray(cond)
+
+
+def store(key: str | None, op: str, ntw: rf.Network, cond=None) -> None:
+	"""Store *ntw* under *key*, with the per-point condition numbers *cond* of a de-embedding."""
+	if key is None or not snp_cache.enabled:
+		return
+	info = {"kind": "result", "op": op, "unit": ntw.frequency.unit, "name": ntw.name,
+			"comments": getattr(ntw, "comments", "") or "", "outputs": {}}
+	if cond is not None:
+		info["cond"] = np.asarray(cond, dtype=float).tolist()
+	try:
+		snp_cache.put(key, ntw.f, ntw.s, ntw.z0, info)
+	except OSError as err:
+		print(f"[cache] result not stored: {err}")
+
+
+def _stamp(path: Path) -> list[int]:
+	st = path.stat()
+	return [st.st_size, st.st_mtime_ns]
+
+
+def write(key: str | None, ntw: rf.Network, dst: Path, forms="ri") -> dict:
+	"""write_network() that skips the form files already written from this result.
+
+	Returns the {form: path} mapping of the requested files.
+	"""
+	outputs = form_outputs(dst, forms)
+	hit = snp_cache.get(key) if key is not None and snp_cache.enabled else None
+	if hit is None:
+		write_outputs(ntw, outputs)
+		return outputs
+
+	info = hit[3]
+	written = info.setdefault("outputs", {})
+	todo = {}
+	for form, path in outputs.items():
+		rec = written.get(str(Path(path).resolve()))
+		if not (rec and rec[0] == form and Path(path).exists() and rec[1:] == _stamp(Path(path))):
+			todo[form] = path
+	if not todo:
+		print(f"[cache] {', '.join(str(p) for p in outputs.values())} up to date")
+		return outputs
+
+	write_outputs(ntw, todo)
+	for form, path in todo.items():
+		written[str(Path(path).resolve())] = [form, *_stamp(Path(path))]
+	try:
+		snp_cache.update_info(key, info)
+	except OSError:
+		pass
+	return outputs
@@ -0,0 +1,243 @@
+"""snp_serve.py - resident worker daemon behind a Unix domain socket
+
+`SnP_Utils_New.py serve` keeps a pool of warm worker processes (skrf and
+the SnP_Utils modules already imported) listening on SOCKET_PATH.  The
+regular CLI forwards bisect / cascade / deembed / deembed-many / attach /
+assemble / convert / check / archive calls to it and prints the captured
+output, so a call costs a socket round trip instead of an interpreter
+start plus the skrf import.  With no daemon running (or a stale socket)
+the CLI simply runs the operation itself.  Once a daemon has taken a
+call the CLI never re-runs it: no reply within REPLY_TIMEOUT (a hung or
+overloaded daemon) or a dropped connection is reported as a failed call,
+as the daemon may still be writing its output files.
+
+Figures need the caller's display, so calls in the default --plot=show
+mode always run in-process; --no-plot and --plot=async calls are forwarded
+(convert, check and archive draw nothing and are always forwarded).
+
+Protocol: one JSON line per request and per reply on a fresh connection.
+	{"argv": [...], "cwd": "...", "env": {...}}	-> {"exit": 0, "output": "..."}
+	{"cmd": "ping"} / {"cmd": "stop"}		-> {"ok": true}
+"env" holds the caller's FORWARD_ENV variables; the worker applies them
+for the call, so SNP_NO_CACHE / SNP_CACHE_DIR / SNP_THREADS ... behave as
+in-process.
+
+The socket is created owner-only (0600), by default in the per-user
+runtime folder ($XDG_RUNTIME_DIR) when there is one.
+
+Environment:
+SNP_SERVE_SOCKET  socket path          (default: $XDG_RUNTIME_DIR/snp_serve.sock or <app dir>/.snp_serve.sock)
+SNP_SERVE_TIMEOUT seconds to wait for a reply before the call is reported as failed (default: 600)
+SNP_NO_DAEMON     1 = never forward    (same as --no-daemon)
+"""
+
+from contextlib import redirect_stdout
+from pathlib import Path
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import traceback
+
+app_dir = Path(__file__).resolve().parent
+
+_runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+SOCKET_PATH = Path(os.environ.get("SNP_SERVE_SOCKET") or (Path(_runtime_dir) / "snp_serve.sock" if _runtime_dir
+														  else app_dir / ".snp_serve.sock"))
+FORWARD_OPS = ("bisect", "cascade", "deembed", "deembed-many", "attach", "assemble", "convert", "check", "archive")
+NO_FIGURE_OPS = ("convert", "check", "archive")
+FORWARD_ENV = ("SNP_NO_CACHE", "SNP_CACHE_DIR", "SNP_CACHE_MAX_MB", "SNP_CACHE_HASH", "SNP_THREADS")
+CONNECT_TIMEOUT = 1.0
+REPLY_TIMEOUT = float(os.environ.get("SNP_SERVE_TIMEOUT", "600"))
+
+enabled = os.environ.get("SNP_NO_DAEMON", "0") != "1"
+
+HELP = """
+serve	[--workers N] [--socket PATH]		- keep warm workers behind a Unix socket
+serve	stop [--socket PATH]
+"""
+
+# -----------------------------------------------------------------------------
+# Worker side
+# -----------------------------------------------------------------------------
+
+def _worker_init() -> None:
+	global enabled
+	enabled = False         # a worker never forwards to the daemon itself
+	import SnP_Utils_New
+	SnP_Utils_New.rf.__version__    # load skrf now, not on the first request
+
+
+def _run(argv: list[str], cwd: str, env: dict) -> tuple[int, str]:
+	"""Run one CLI call in this worker with the caller's *env*; return (exit code, captured output)."""
+	import SnP_Utils_New as snp
+
+	os.chdir(cwd)
+	for name in FORWARD_ENV:     # every call sets all of them: nothing leaks from the previous caller
+		if name in env:
+			os.environ[name] = env[name]
+		else:
+			os.environ.pop(name, None)
+	snp.reset_options()
+	out = io.StringIO()
+	code = 0
+	with redirect_stdout(out):
+		try:
+			snp.main(argv)
+		except SystemExit as err:
+			code = err.code if isinstance(err.code, int) else (0 if err.code is None else 1)
+		except Exception:
+			traceback.print_exc(file=out)
+			code = 1
+	return code, out.getvalue()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+	def _reply(self, msg: dict) -> None:
+		try:
+			self.wfile.write((json.dumps(msg) + "\n").encode())
+		except OSError:     # the client gave up waiting (REPLY_TIMEOUT)
+			pass
+
+	def handle(self):
+		try:
+			req = json.loads(self.rfile.readline())
+		except ValueError:
+			return self._reply({"exit": 2, "output": "bad request\n"})
+
+		cmd = req.get("cmd")
+		if cmd == "ping":
+			return self._reply({"ok": True, "pid": os.getpid()})
+		if cmd == "stop":
+			self._reply({"ok": True})
+			threading.Thread(target=self.server.shutdown).start()
+			return
+
+		try:
+			code, output = self.server.pool.submit(_run, req["argv"], req["cwd"], req.get("env", {})).result()
+		except Exception as err:     # worker died (e.g. out of memory)
+			code, output = 1, f"{type(err).__name__}: {err}\n"
+		self._reply({"exit": code, "output": output})
+
+
+def serve(socket_path: Path | None = None, workers: int | None = None) -> None:
+	"""Run the daemon until `serve stop` or Ctrl-C."""
+	if not hasattr(socket, "AF_UNIX"):
+		raise ValueError("serve needs Unix domain sockets, not available on this platform")
+	path = Path(socket_path or SOCKET_PATH)
+	if path.exists():
+		if _ping(path):
+			raise ValueError(f"A daemon is already listening on {path}")
+		path.unlink()           # stale socket of a killed daemon
+
+	from concurrent.futures import ProcessPoolExecutor     # server side only: keeps the client light
+	import multiprocessing
+
+	workers = workers or os.cpu_count() or 1
+	ctx = multiprocessing.get_context("spawn")
+	with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_worker_init) as pool:
+		umask = os.umask(0o177)     # socket file 0600: only this user can send commands
+		try:
+			server = socketserver.ThreadingUnixStreamServer(str(path), _Handler)
+		finally:
+			os.umask(umask)
+		server.daemon_threads = True
+		server.pool = pool
+		# start all workers now so the first requests find them warm
+		for fut in [pool.submit(os.getpid) for _ in range(workers)]:
+			fut.result()
+		print(f"Serving on {path} with {workers} worker(s) - stop with: SnP_Utils_New.py serve stop")
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			server.server_close()
+			path.unlink(missing_ok=True)
+	print("Daemon stopped")
+
+# -----------------------------------------------------------------------------
+# Client side
+# -----------------------------------------------------------------------------
+
+def request(msg: dict, socket_path: Path | None = None, timeout: float | None = None) -> dict | None:
+	"""Send *msg* to the daemon and return its reply; None when no daemon accepts the connection.
+
+	Once connected, no reply within *timeout* (default REPLY_TIMEOUT) raises
+	TimeoutError and a dropped connection an OSError: the daemon may still
+	be running the call.
+	"""
+	path = Path(socket_path or SOCKET_PATH)
+	if not hasattr(socket, "AF_UNIX") or not path.exists():
+		return None
+	sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		sock.settimeout(CONNECT_TIMEOUT)
+		sock.connect(str(path))
+	except OSError:     # refused, stale socket file, ...: no daemon
+		sock.close()
+		return None
+	with sock:
+		sock.settimeout(REPLY_TIMEOUT if timeout is None else timeout)     # operations may take long
+		sock.sendall((json.dumps(msg) + "\n").encode())
+		with sock.makefile("rb") as fid:
+			line = fid.readline()
+	if not line:
+		raise ConnectionError(f"{path}: the daemon closed the connection without a reply")
+	return json.loads(line)
+
+
+def _ping(path: Path) -> bool:
+	"""True when something listens on *path* (a daemon that doesn't answer in time counts)."""
+	try:
+		return request({"cmd": "ping"}, path, CONNECT_TIMEOUT) is not None
+	except OSError:
+		return True
+
+
+def _forwardable(argv: list[str]) -> bool:
+	"""True for an operation the daemon runs, without on-screen figures."""
+	if not enabled or "--no-daemon" in argv:
+		return False
+	mode = "show"
+	for arg in argv:
+		if arg == "--no-plot":
+			mode = "none"
+		elif arg.startswith("--plot="):
+			mode = arg.split("=", 1)[1].lower()
+	args = [arg for arg in argv if not arg.startswith("--")]
+	return bool(args) and args[0].lower() in FORWARD_OPS and (mode != "show" or args[0].lower() in NO_FIGURE_OPS)
+
+
+def forward(argv: list[str]) -> int | None:
+	"""Run a CLI call on the daemon and print its output.
+
+	Returns the exit code, or None when the caller should run it itself.
+	Only needs the standard library, so the CLI calls it before importing
+	numpy and the SnP modules.
+	"""
+	if not _forwardable(argv):
+		return None
+	env = {name: os.environ[name] for name in FORWARD_ENV if name in os.environ}
+	try:
+		reply = request({"argv": argv, "cwd": os.getcwd(), "env": env})
+	except TimeoutError:
+		print(f"[serve] no reply from the daemon within {REPLY_TIMEOUT:g}s - the call may still be running there,"
+			  " not re-run here (raise SNP_SERVE_TIMEOUT, or use --no-daemon)")
+		return 1
+	except OSError as err:
+		print(f"[serve] the daemon call failed: {err} - not re-run here (use --no-daemon)")
+		return 1
+	if reply is None:
+		return None
+	print(reply["output"], end="")
+	return reply["exit"]
+
+
+def stop(socket_path: Path | None = None) -> bool:
+	try:
+		return request({"cmd": "stop"}, socket_path, CONNECT_TIMEOUT) is not None
+	except OSError:
+		return False
@@ -0,0 +1,624 @@
+"""snp_touchstone.py - fast Touchstone (.SnP) loader and writer
+
+The whole file is read in one go, the header (comments + option line) is
+parsed line by line and the data block is tokenized in a single bulk
+conversion.  The flat token array is reshaped to (F, 1 + 2*N*N) so that
+wrapped continuation lines of 3/4-port files need no special handling,
+and RI/MA/DB values are turned into complex S arrays in one vectorized pass.
+
+Touchstone v1 and v2 S-parameter files (Full matrix, one reference
+impedance) are handled here; anything else (Y/Z/G/H data, Upper/Lower v2
+matrices, mixed-mode order, per-port references) is passed on to
+rf.Network by load_network().
+
+write_touchstone() is the matching writer: the same block layout and
+float repr as rf.Network.write_touchstone (byte-compatible output), but
+whole frequency blocks are formatted by one str.format call and written
+in large buffered chunks.  Several forms (ri, ma, db) can be produced
+from one network in a single pass over the frequency axis, as v1 or (with
+version='2.0') v2 files.
+
+For files too large to hold, open_touchstone() yields the data in blocks
+of frequency points and TouchstoneWriter appends blocks to the outputs
+(see snp_chunked).
+
+Usage (timing against rf.Network):
+python snp_touchstone.py file1source.s4p out_half.s4p ring.s2p
+"""
+
+from __future__ import annotations
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_cache
+
+from pathlib import Path
+import numpy as np
+import re
+import shutil
+import sys
+import time
+
+FREQ_MULT = {"hz": 1.0, "khz": 1e3, "mhz": 1e6, "ghz": 1e9}
+SNP_FORMATS = ("ri", "ma", "db")
+OPTION_PARAMS = ("s", "y", "z", "g", "h")
+
+_EXT_RE = re.compile(r"\.s(\d+)p$", re.IGNORECASE)
+
+# -----------------------------------------------------------------------------
+# Utility helpers
+# -----------------------------------------------------------------------------
+
+def _parse_option_line(line: str) -> tuple[str, str, str, float]:
+	"""Return (unit, parameter, format, R) of a '# Hz S RI R 50' line.
+
+	The options come in any order and each may be left out (Touchstone
+	defaults: GHz S MA R 50); an option not known here raises
+	NotImplementedError, so that rf.Network reads the file.
+	"""
+	unit, param, fmt, resistance = "ghz", "s", "ma", 50.0
+	toks = iter(line.lower()[1:].split())
+	for tok in toks:
+		if tok in FREQ_MULT:
+			unit = tok
+		elif tok in OPTION_PARAMS:
+			param = tok
+		elif tok in SNP_FORMATS:
+			fmt = tok
+		elif tok == "r":
+			try:
+				resistance = float(next(toks))
+			except (StopIteration, ValueError):
+				raise NotImplementedError(f"Bad reference resistance in option line: {line.strip()}") from None
+		else:
+			raise NotImplementedError(f"Unknown option {tok!r} in option line: {line.strip()}")
+	return unit, param, fmt, resistance
+
+
+def _nports_from_name(path: Path) -> int:
+	m = _EXT_RE.search(path.name)
+	if not m:
+		raise NotImplementedError(f"{path.name} is not a Touchstone v1 .SnP file")
+	return int(m.group(1))
+
+
+def _to_complex(raw: np.ndarray, fmt: str) -> np.ndarray:
+	"""Convert interleaved (a, b) columns to complex values in one pass."""
+	a, b = raw[:, 0::2], raw[:, 1::2]
+	if fmt == "ri":
+		return a + 1j * b
+	if fmt == "db":
+		a = 10 ** (a / 20.0)
+	return a * np.exp(1j * b * np.pi / 180)
+
+
+def _strip_noise_block(body: bytes, prev: float = -np.inf) -> tuple[bytes, bool]:
+	"""Cut the 2-port noise block (first line whose frequency goes back).
+
+	*prev* is the last frequency before *body*; returns (body, noise block found).
+	"""
+	lines = body.splitlines()
+	for idx, line in enumerate(lines):
+		tok = line.split(None, 1)
+		if not tok:
+			continue
+		f = float(tok[0])
+		if f < prev:
+			return b"\n".join(lines[:idx]), True
+		prev = f
+	return body, False
+
+
+def _strip_comments(body: bytes) -> bytes:
+	if b"!" in body or b"#" in body:
+		body = b"\n".join(ln.partition(b"!")[0] for ln in body.splitlines() if not ln.lstrip().startswith(b"#"))
+	return body
+
+
+def _strip_keywords(body: bytes) -> tuple[bytes, bool]:
+	"""Cut a v2 data block at its first keyword line ([End], [Noise Data]); returns (body, cut)."""
+	idx = body.find(b"[")
+	if idx < 0:
+		return body, False
+	start = body.rfind(b"\n", 0, idx) + 1
+	if body[start:idx].strip():
+		raise ValueError(f"Unexpected '[' inside the data: {body[start:idx + 20]!r}")
+	return body[:start], True
+
+
+def _reference_pending(keywords: dict) -> bool:
+	"""True while a v2 [Reference] holds fewer values than [Number of Ports]."""
+	if "reference" not in keywords or "network data" in keywords:
+		return False
+	try:
+		return len(keywords["reference"].split()) < int(keywords.get("number of ports", 0))
+	except ValueError:
+		return False
+
+
+def _parse_header(data: bytes, name: str, complete: bool = True) -> tuple[str | None, list[str], dict, int | None]:
+	"""Comments, option line and v2 keywords of a Touchstone file starting with *data*.
+
+	Returns (option line, comments, {keyword: value}, offset of the first
+	data line); the offset is None when *data* ends inside the header and
+	is not *complete*.  Keywords are lower case ('number of ports', ...).
+	"""
+	comments = []
+	keywords = {}
+	option = None
+	pos = 0
+	while pos < len(data):
+		end = data.find(b"\n", pos)
+		if end < 0 and not complete:
+			return option, comments, keywords, None
+		end = len(data) if end < 0 else end + 1
+		line = data[pos:end].strip()
+		if not line:
+			pos = end
+			continue
+		if line.startswith(b"!"):
+			# like rf.Network, keep only the comments above the option line
+			if option is None and b"Created with skrf" not in line:
+				comments.append(line[1:].decode("latin-1") + "\n")
+		elif line.startswith(b"#"):
+			option = option or line.decode("latin-1")
+		elif line.startswith(b"["):
+			key, _, value = line[1:].decode("latin-1").partition("]")
+			keywords[key.strip().lower()] = value.partition("!")[0].strip()
+		elif _reference_pending(keywords):
+			# [Reference] values may continue on the following lines
+			keywords["reference"] += " " + line.partition(b"!")[0].decode("latin-1").strip()
+		else:
+			return option, comments, keywords, pos
+		pos = end
+	return option, comments, keywords, (pos if complete else None)
+
+
+def _layout(input_file: Path, option: str | None, keywords: dict) -> dict:
+	"""Data layout of a parsed header: nports, unit, format, resistance, v2, legacy 2-port order.
+
+	Raises NotImplementedError for what the fast parser does not cover
+	(non-S data, v2 matrix formats other than Full, mixed-mode order,
+	per-port [Reference] impedances).
+	"""
+	unit, param, fmt, resistance = _parse_option_line(option or "#")
+	if param != "s":
+		raise NotImplementedError(f"{input_file.name} holds {param.upper()}-parameters")
+	if "version" not in keywords:
+		nports = _nports_from_name(input_file)
+		return {"nports": nports, "unit": unit, "format": fmt, "resistance": resistance,
+				"version": "1.0", "legacy": nports == 2}
+
+	if keywords.get("matrix format", "full").lower() != "full" or "mixed-mode order" in keywords:
+		raise NotImplementedError(f"{input_file.name}: only Full v2 single-ended matrices are parsed here")
+	try:
+		nports = int(keywords["number of ports"])
+	except (KeyError, ValueError):
+		raise ValueError(f"{input_file.name}: missing or bad [Number of Ports]") from None
+	refs = {float(r) for r in keywords.get("reference", "").split()}
+	if len(refs) > 1:
+		raise NotImplementedError(f"{input_file.name} has per-port [Reference] impedances")
+	if refs:
+		resistance = refs.pop()
+	order = keywords.get("two-port data order", "21_12")
+	return {"nports": nports, "unit": unit, "format": fmt, "resistance": resistance,
+			"version": keywords["version"], "legacy": nports == 2 and order == "21_12"}
+
+
+def _rows_to_s(raw: np.ndarray, layout: dict) -> tuple[np.ndarray, np.ndarray]:
+	"""(f in Hz, complex S) of (F, 1 + 2N^2) data rows."""
+	nports = layout["nports"]
+	f = raw[:, 0] * FREQ_MULT[layout["unit"]]
+	s = _to_complex(raw[:, 1:], layout["format"]).reshape(-1, nports, nports)
+	if layout["legacy"]:
+		# v1 2-port data is written in the legacy S11 S21 S12 S22 order (v2: 21_12)
+		s = s.transpose(0, 2, 1)
+	return f, np.ascontiguousarray(s)
+
+# -----------------------------------------------------------------------------
+# Loader
+# -----------------------------------------------------------------------------
+
+def read_touchstone(input_file: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+	"""Parse a Touchstone v1 (or v2 Full matrix) file.
+
+	Returns (f, s, z0, info): frequency in Hz (F,), complex S (F, N, N),
+	complex z0 (F, N) and a dict with the file 'unit', 'format', 'name'
+	and 'comments'.
+	"""
+	input_file = Path(input_file)
+	data = input_file.read_bytes()
+
+	# header: comments, option line and v2 keywords up to the first numeric line
+	option, comments, keywords, pos = _parse_header(data, input_file.name)
+	layout = _layout(input_file, option, keywords)
+	nports, unit, fmt, resistance = layout["nports"], layout["unit"], layout["format"], layout["resistance"]
+
+	body = _strip_comments(data[pos:])
+	if layout["version"] != "1.0":
+		body, _ = _strip_keywords(body)
+	elif nports == 2:
+		body, _ = _strip_noise_block(body)
+
+	values = np.fromstring(body, sep=" ") if body.strip() else np.empty(0)
+	block = 1 + 2 * nports * nports
+	if values.size % block:
+		raise ValueError(f"{input_file.name}: {values.size} values is not a multiple of {block} per frequency")
+
+	f, s = _rows_to_s(values.reshape(-1, block), layout)
+	z0 = np.full((len(f), nports), resistance, dtype=complex)
+
+	info = {"unit": unit, "format": fmt, "name": input_file.stem, "comments": "".join(comments)}
+	return f, s, z0, info
+
+
+def load_network(input_file: Path) -> rf.Network:
+	"""Load *input_file* into an rf.Network using the fast parser.
+
+	Parsed arrays go through snp_cache (unless disabled); files the fast
+	parser does not cover are loaded by rf.Network itself.
+	"""
+	try:
+		f, s, z0, info = snp_cache.cached_read(Path(input_file), read_touchstone)
+	except NotImplementedError:
+		return rf.Network(str(input_file))
+	return network_from_arrays(f, s, z0, info)
+
+
+def network_from_arrays(f: np.ndarray, s: np.ndarray, z0: np.ndarray, info: dict) -> rf.Network:
+	"""rf.Network of parsed/cached arrays (info holds unit, name and comments)."""
+	frequency = rf.Frequency.from_f(f, unit="hz")
+	frequency.unit = info["unit"]
+	ntw = rf.Network(frequency=frequency, s=s, z0=z0, name=info["name"])
+	ntw.comments = info["comments"]
+	return ntw
+
+# -----------------------------------------------------------------------------
+# Streaming reader
+# -----------------------------------------------------------------------------
+
+READ_BYTES = 1 << 20    # bytes read from the file per step
+CHUNK_POINTS = 4096     # default frequency points per block
+
+
+def open_touchstone(input_file: Path, chunk: int = CHUNK_POINTS):
+	"""Read a Touchstone v1 (or v2 Full matrix) file in frequency blocks of *chunk* points.
+
+	Returns (info, blocks): info is the read_touchstone() dict plus 'nports',
+	'resistance' and 'version'; blocks yields (f, s) arrays of *chunk* points
+	(fewer for the last one).  Only one block and READ_BYTES of text are
+	held at a time.  The file is closed once blocks is read to the end; use
+	blocks as a context manager (or close() it) when it may not be.
+	"""
+	input_file = Path(input_file)
+	if chunk < 1:
+		raise ValueError(f"Chunk size must be at least one frequency point (got {chunk})")
+
+	fid = open(input_file, "rb")
+	try:
+		data = b""
+		while True:
+			more = fid.read(READ_BYTES)
+			data += more
+			option, comments, keywords, pos = _parse_header(data, input_file.name, complete=not more)
+			if pos is not None:
+				break
+		layout = _layout(input_file, option, keywords)
+	except BaseException:
+		fid.close()
+		raise
+
+	info = {"unit": layout["unit"], "format": layout["format"], "name": input_file.stem,
+			"comments": "".join(comments), "nports": layout["nports"], "resistance": layout["resistance"],
+			"version": layout["version"]}
+	return info, _BlockReader(fid, _iter_blocks(fid, data[pos:], input_file.name, layout, chunk))
+
+
+class _BlockReader:
+	"""Iterator of the blocks of an open file; close() also closes a file no block was read from."""
+
+	def __init__(self, fid, blocks):
+		self._fid, self._blocks = fid, blocks
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		return next(self._blocks)
+
+	def close(self) -> None:
+		self._blocks.close()
+		self._fid.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+
+def _iter_blocks(fid, data: bytes, name: str, layout: dict, chunk: int):
+	nports = layout["nports"]
+	width = 1 + 2 * nports * nports
+	tokens = np.empty(0)            # values of a point cut by the end of the text block
+	pending = np.empty((0, width))  # complete points not yielded yet
+	prev = -np.inf
+	done = False
+	with fid:
+		while not done:
+			more = fid.read(READ_BYTES)
+			if more:
+				data += more
+				cut = data.rfind(b"\n") + 1
+				if cut == 0:
+					continue
+				text, data = data[:cut], data[cut:]
+			else:
+				text, data, done = data, b"", True
+
+			text = _strip_comments(text)
+			if layout["version"] != "1.0":
+				text, end = _strip_keywords(text)
+				done = done or end
+			elif nports == 2:
+				text, noise = _strip_noise_block(text, prev)
+				done = done or noise
+			if text.strip():
+				tokens = np.concatenate([tokens, np.fromstring(text, sep=" ")])
+			n = tokens.size // width
+			if n:
+				rows, tokens = tokens[:n * width].reshape(n, width), tokens[n * width:]
+				prev = rows[-1, 0]
+				pending = np.concatenate([pending, rows]) if len(pending) else rows
+
+			while len(pending) >= chunk or (done and len(pending)):
+				rows, pending = pending[:chunk], pending[chunk:]
+				yield _rows_to_s(rows, layout)
+
+	if tokens.size:
+		raise ValueError(f"{name}: {tokens.size} values left over, not a multiple of {width} per frequency")
+
+# -----------------------------------------------------------------------------
+# Writer
+# -----------------------------------------------------------------------------
+
+WRITE_CHUNK = 256       # frequency points formatted per str.format call
+
+_FORM_LABELS = {"ri": ("Re", "Im"), "ma": ("mag", "ang"), "db": ("dB", "ang")}
+
+
+def _column_header(nports: int, form: str) -> str:
+	"""The '!freq ReS11 ImS11 ...' comment block written by skrf."""
+	la, lb = _FORM_LABELS[form]
+	if nports == 2:
+		return "!freq " + " ".join(f"{la}S{m}{n} {lb}S{m}{n}" for m, n in ("11", "21", "12", "22")) + "\n"
+	out = "!freq"
+	for m in range(1, nports + 1):
+		for n in range(1, nports + 1):
+			if n % 4 == 0:
+				out += "\n!"
+			out += f" {la}S{m}{n} {lb}S{m}{n}"
+		out += "\n!"
+	return out + "\n"
+
+
+def _block_format(nports: int) -> str:
+	"""Format string of one frequency point (4 pairs per line at most)."""
+	fmt = "{}"
+	for _ in range(nports if nports > 2 else 1):
+		for n in range(nports if nports != 2 else 4):
+			if n > 0 and n % 4 == 0:
+				fmt += "\n"
+			fmt += " {} {}"
+		fmt += "\n"
+	return fmt
+
+
+def _form_values(s: np.ndarray, form: str, mag: np.ndarray | None, ang: np.ndarray | None) -> np.ndarray:
+	"""(F, N, 2N) float array of interleaved values for *form*."""
+	if form == "ri":
+		return np.ascontiguousarray(s).view(float)
+	a = mag if form == "ma" else 20 * np.log10(mag)
+	out = np.empty(s.shape[:2] + (2 * s.shape[2],))
+	out[:, :, 0::2] = a
+	out[:, :, 1::2] = ang
+	return out
+
+
+TOUCHSTONE_VERSIONS = ("1.0", "2.0")
+
+
+class TouchstoneWriter:
+	"""Touchstone files of one network, written block by block.
+
+	The header goes out on construction; each write() appends the next
+	frequency points, so a network can be written without ever holding it
+	whole.  *outputs* maps a form ('ri', 'ma' or 'db') to its path and
+	*creator* is the tool named in the '! Created with ...' line (None: no line).
+
+	*version* '2.0' writes the rf.Network.write_touchstone(version='2.0')
+	layout.  Its header holds [Number of Frequencies]: when *points* is not
+	given the data is spooled to <output>.part and the file is put together
+	by close().
+	"""
+
+	def __init__(self, outputs: dict, nports: int, r_ref: float, unit: str = "hz",
+				 comments: str = "", creator: str | None = "skrf", port_names: list | None = None,
+				 version: str = "1.0", points: int | None = None):
+		for form in outputs:
+			if form not in SNP_FORMATS:
+				raise ValueError(f"Unknown SnP output format: {form} (expected ri|ma|db)")
+		if version not in TOUCHSTONE_VERSIONS:
+			raise ValueError(f"Unknown Touchstone version: {version} (expected {'|'.join(TOUCHSTONE_VERSIONS)})")
+		self.outputs = outputs
+		self.nports = nports
+		self.unit = unit.lower()
+		self.block = _block_format(nports)
+		self.version = version
+		self.points = 0
+		self.r_ref = r_ref
+
+		self.header = "".join(f"!{line}\n" for line in comments.split("\n")) if comments else ""
+		if creator:
+			self.header += f"! Created with {creator} (http://scikit-rf.org).\n"
+		if port_names and len(port_names) == nports:
+			self.ports = "".join(f"! Port[{idx+1}] = {name}\n" for idx, name in enumerate(port_names))
+		else:
+			self.ports = ""
+
+		self.files = {}
+		self.spools = {}
+		try:
+			for form, dst in outputs.items():
+				if version != "1.0" and points is None:
+					self.spools[form] = Path(dst).with_name(Path(dst).name + ".part")
+					self.files[form] = open(self.spools[form], "w", encoding="ISO-8859-1", buffering=1 << 20)
+				else:
+					fid = self.files[form] = open(dst, "w", encoding="ISO-8859-1", buffering=1 << 20)
+					fid.write(self._header(form, points))
+		except BaseException:
+			self.close(complete=False)
+			raise
+
+	def _header(self, form: str, points: int | None) -> str:
+		unit_label = {"hz": "Hz", "khz": "kHz", "mhz": "MHz", "ghz": "GHz"}[self.unit]
+		option = f"# {unit_label} S {form.upper()} R {self.r_ref} \n"
+		if self.version == "1.0":
+			return self.header + option + self.ports + _column_header(self.nports, form)
+		return (self.header + f"[Version] {self.version}\n" + option
+				+ f"[Number of Ports] {self.nports}\n"
+				+ ("[Two-Port Data Order] 21_12\n" if self.nports == 2 else "")
+				+ f"[Number of Frequencies] {points}\n"
+				+ f"[Reference] {' '.join([str(float(self.r_ref))] * self.nports)}\n"
+				+ self.ports + "[Network Data]\n" + _column_header(self.nports, form))
+
+	def write(self, f: np.ndarray, s: np.ndarray) -> None:
+		"""Append the points *f* (Hz) with their complex S (F, N, N)."""
+		if self.nports == 2:
+			# 2-port data is written in the legacy S11 S21 S12 S22 order (v2: 21_12)
+			s = s.transpose(0, 2, 1)
+
+		# |S| and angle are shared by the ma and db forms
+		mag = ang = None
+		if "ma" in self.files or "db" in self.files:
+			mag, ang = np.abs(s), np.angle(s, deg=True)
+		with np.errstate(divide="ignore"):
+			values = {form: _form_values(s, form, mag, ang).reshape(len(f), -1) for form in self.files}
+		f_scaled = np.asarray(f) / FREQ_MULT[self.unit]
+
+		self.points += len(f)
+		chunk_fmt = self.block * WRITE_CHUNK
+		for k0 in range(0, len(f), WRITE_CHUNK):
+			k1 = min(k0 + WRITE_CHUNK, len(f))
+			fmt = chunk_fmt if k1 - k0 == WRITE_CHUNK else self.block * (k1 - k0)
+			for form, fid in self.files.items():
+				rows = np.column_stack([f_scaled[k0:k1], values[form][k0:k1]])
+				fid.write(fmt.format(*rows.ravel().tolist()))
+
+	def close(self, complete: bool = True) -> None:
+		"""Finish the files (v2: [End], spooled data behind the header).
+
+		With *complete* False (a failed run) the spools are only removed.
+		"""
+		for form, fid in self.files.items():
+			if complete and self.version != "1.0" and form not in self.spools:
+				fid.write("[End]\n")
+			fid.close()
+		for form, spool in self.spools.items():
+			if complete:
+				with open(self.outputs[form], "w", encoding="ISO-8859-1", buffering=1 << 20) as fid:
+					fid.write(self._header(form, self.points))
+					with open(spool, encoding="ISO-8859-1") as data:
+						shutil.copyfileobj(data, fid, 1 << 20)
+					fid.write("[End]\n")
+			spool.unlink(missing_ok=True)
+		self.files = {}
+		self.spools = {}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, *exc):
+		self.close(complete=exc_type is None)
+
+
+def reference_resistance(z0: np.ndarray) -> float:
+	"""The single 'R' value of the option line; ValueError for unequal port impedances."""
+	if np.any(z0 != z0.flat[0]):
+		raise ValueError("Network has unequal port impedances - cannot write a single 'R' value")
+	return complex(z0.flat[0]).real
+
+
+def write_touchstone(outputs: dict, f: np.ndarray, s: np.ndarray, z0: np.ndarray, unit: str = "hz",
+					 comments: str = "", creator: str | None = "skrf", port_names: list | None = None,
+					 version: str = "1.0") -> None:
+	"""Write one network to several Touchstone files in a single pass.
+
+	*outputs* maps a form ('ri', 'ma' or 'db') to its destination path.
+	*creator* is the tool named in the '! Created with ...' line (None: no line).
+	"""
+	with TouchstoneWriter(outputs, s.shape[1], reference_resistance(z0), unit, comments, creator, port_names,
+						  version, points=len(f)) as writer:
+		writer.write(f, s)
+
+
+def form_outputs(dst: Path, forms) -> dict:
+	"""Map each form to its file: *dst* itself for a single form, else <stem>_<form>.
+
+	*forms* is a form, a comma separated string ('ri,db') or a list of forms.
+	"""
+	dst = Path(dst)
+	forms = forms.split(",") if isinstance(forms, str) else list(forms)
+	if len(forms) == 1:
+		return {forms[0].lower(): dst}
+	return {form.lower(): dst.with_stem(f"{dst.stem}_{form.lower()}") for form in forms}
+
+
+def write_network(ntw: rf.Network, dst: Path, forms="ri") -> dict:
+	"""Write *ntw* like ntw.write_touchstone(dst, form=...) for one or more forms.
+
+	Returns the {form: path} mapping that was written.
+	"""
+	outputs = form_outputs(dst, forms)
+	write_outputs(ntw, outputs)
+	return outputs
+
+
+def write_outputs(ntw: rf.Network, outputs: dict) -> None:
+	"""Write *ntw* to every {form: path} of *outputs* in one pass."""
+	write_touchstone(outputs, ntw.f, ntw.s, ntw.z0, unit=ntw.frequency.unit,
+					 comments=getattr(ntw, "comments", "") or "", creator=f"skrf {rf.__version__}",
+					 port_names=getattr(ntw, "port_names", None))
+
+# ---------------------------------------------------------------------------
+# Timing entry‑point
+# ---------------------------------------------------------------------------
+
+def _best_of(func, repeat: int = 5) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		func()
+		best = min(best, time.perf_counter() - t0)
+	return best
+
+
+def main(argv: list[str] | None = None) -> None:
+	if not argv or argv[0] in ("-h", "--help"):
+		print(__doc__); sys.exit(0)
+
+	print(f"{'file':40s} {'rf.Network':>12s} {'parse':>10s} {'speedup':>8s} {'cached':>10s} {'max |dS|':>10s}")
+	for name in argv:
+		src = Path(name)
+		t_rf = _best_of(lambda: rf.Network(str(src)))
+		snp_cache.enabled = False
+		t_fast = _best_of(lambda: load_network(src))
+		snp_cache.enabled = True
+		load_network(src)
+		t_warm = _best_of(lambda: load_network(src))
+		ref, new = rf.Network(str(src)), load_network(src)
+		err = float(np.max(np.abs(ref.s - new.s))) if ref.s.shape == new.s.shape else float("nan")
+		print(f"{src.name:40s} {t_rf*1e3:10.1f}ms {t_fast*1e3:8.1f}ms {t_rf/t_fast:7.2f}x {t_warm*1e3:8.1f}ms {err:10.2e}")
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,252 @@
+"""snp_watch.py - process the VNA captures dropped into a folder (watch mode)
+
+`watch <dir>` polls the folder for Touchstone files (.sNp, .ts) and runs a
+fixed pipeline on every new or changed one, on a process pool:
+
+deembed		- remove a fixture (--fixture F.sNp) from side 2, the result is
+		  written to the output folder (default <dir>/processed)
+quality		- IEEE370 causality / passivity / reciprocity gate (--quality)
+check		- limit masks (--check: IEEE370 FER, --mask masks.json|csv)
+convert		- rewrite the (de-embedded) file in other forms (--convert ri,db
+		  [--version=1|2])
+
+Without any step given the pipeline is quality + check.
+
+Polling is one os.scandir() per --interval: the size and mtime of every
+file are kept from one poll to the next, so an idle folder costs a
+directory listing.  A file is picked up only when two polls saw the same
+size and mtime and it was not modified for --settle seconds - the VNA (or
+the copy to the share) has finished writing it.  Only then is it hashed:
+the SHA-1 of each processed file is stored in <out>/.snp_watch.json
+together with the pipeline, and a file whose content and pipeline are
+unchanged is skipped, also across restarts - unless its last run ended in
+an ERROR (unreadable file, worker crash, ...), which is retried.
+
+The pipeline can also come from a JSON file (--config pipeline.json) with
+the keys fixture, format, quality, masks (a mask file or "default"),
+convert, version and out; options given on the command line win.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+from snp_lazy import lazy_import
+rf = lazy_import("skrf")
+import snp_cache
+import snp_chunked
+import snp_linalg
+import snp_mask
+import snp_quality
+from snp_grid import same_freq
+from snp_touchstone import load_network, write_network
+
+POLL_INTERVAL = 2.0     # seconds between two scans of the folder
+SETTLE_TIME = 2.0       # seconds without change before a file counts as fully written
+STATE_FILE = ".snp_watch.json"
+
+_TOUCHSTONE_RE = re.compile(r"\.(s\d+p|ts)$", re.IGNORECASE)
+
+_fixtures = {}          # worker side: fixture networks, loaded once per process
+
+HELP = """
+watch	<dir> [--fixture F.SnP] [--quality] [--check] [--mask masks.json|csv] [--convert ri,db] [--version=1|2]
+	[--out DIR] [--config pipeline.json] [--interval S] [--settle S] [--workers N] [--once] 	ri|ma|db
+	(--once: process what is in the folder, then exit)
+"""
+
+# -----------------------------------------------------------------------------
+# Pipeline
+# -----------------------------------------------------------------------------
+
+def load_config(path: Path) -> dict:
+	"""Pipeline options of a JSON config file."""
+	path = Path(path)
+	if not path.is_file():
+		raise FileNotFoundError(f"No such config file: {path}")
+	config = json.loads(path.read_text())
+	unknown = set(config) - {"fixture", "format", "quality", "masks", "convert", "version", "out"}
+	if unknown:
+		raise ValueError(f"{path.name}: unknown key(s) {', '.join(sorted(unknown))}")
+	return config
+
+
+def pipeline_key(pipeline: dict) -> str:
+	"""Digest of *pipeline*, fixture and mask file content included - a change reprocesses every file."""
+	parts = {k: pipeline[k] for k in ("format", "quality", "convert", "version")}
+	for name in ("fixture", "masks"):
+		value = pipeline.get(name)
+		parts[name] = snp_cache.file_digest(value) if value not in (None, "default") else value
+	return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _fixture(path: str) -> rf.Network:
+	if path not in _fixtures:
+		_fixtures[path] = load_network(Path(path))
+	return _fixtures[path]
+
+
+def _deembed(ntw: rf.Network, fix: rf.Network) -> rf.Network:
+	"""*ntw* with *fix* removed from its side 2 (same as create_deembeded_network)."""
+	if ntw.nports != fix.nports:
+		raise ValueError(f"{ntw.name} and the fixture don't have the same number of ports")
+	return snp_linalg.deembed_network(*same_freq(ntw, fix))[0]
+
+
+def run_pipeline(src: Path, pipeline: dict, masks: list[dict] | None) -> bool:
+	"""Run every configured step on *src*; False when the quality gate or a mask fails."""
+	out_dir = Path(pipeline["out"])
+	ntw = load_network(src)
+	ntw.name = src.stem
+	passed = True
+
+	if pipeline.get("fixture"):
+		fixture = Path(pipeline["fixture"])
+		ntw = _deembed(ntw, _fixture(str(fixture)))
+		ntw.name = f"{src.stem}_{fixture.stem}_deembed"
+		outputs = write_network(ntw, out_dir / f"{ntw.name}.s{ntw.nports}p", pipeline["format"])
+		src = next(iter(outputs.values()))
+		print(f"deembed  → {', '.join(map(str, outputs.values()))}")
+
+	if pipeline.get("quality"):
+		ok, qm, tier = snp_quality.gate(ntw)
+		modes = [("dd", qm["dd"]), ("cc", qm["cc"])] if "dd" in qm else [("", qm)]
+		print(f"quality  {'PASS' if ok else 'FAIL'} ({tier}) " + " ".join(
+			f"{mode}{'-' if mode else ''}{k} {float(v['value']):.2f}%" for mode, m in modes for k, v in m.items()))
+		passed &= ok
+
+	if masks is not None:
+		rows = snp_mask.check_network(ntw, masks)
+		for r in rows:
+			margin = f"{r['worst_margin_db']:.2f}dB" if r["worst_margin_db"] is not None else "-"
+			print(f"check    {r['status']:4s} {r['mask']} {r['param']} {r['type']} margin {margin}")
+		if not rows:
+			print(f"check    N/A  no mask applies to a {ntw.nports}-port")
+		passed &= not any(r["status"] == "FAIL" for r in rows)
+
+	if pipeline.get("convert"):
+		outputs, points = snp_chunked.convert_file(src, out_dir, pipeline["convert"], pipeline["version"])
+		print(f"convert  → {', '.join(map(str, outputs.values()))} ({points} points, v{pipeline['version']})")
+	return passed
+
+
+def process_file(src: str, pipeline: dict, masks: list[dict] | None) -> tuple[str, float, str]:
+	"""Worker side: run_pipeline() on *src*; return (OK|FAIL|ERROR, seconds, captured output)."""
+	out = io.StringIO()
+	t0 = time.perf_counter()
+	try:
+		with redirect_stdout(out):
+			status = "OK" if run_pipeline(Path(src), pipeline, masks) else "FAIL"
+		msg = out.getvalue()
+	except Exception as err:
+		status, msg = "ERROR", out.getvalue() + f"{type(err).__name__}: {err}\n"
+	return status, time.perf_counter() - t0, msg
+
+# -----------------------------------------------------------------------------
+# Folder polling
+# -----------------------------------------------------------------------------
+
+def scan(folder: Path) -> dict[str, tuple[int, int]]:
+	"""{path: (size, mtime_ns)} of the Touchstone files directly inside *folder*."""
+	found = {}
+	with os.scandir(folder) as entries:
+		for entry in entries:
+			if entry.name.startswith(".") or not _TOUCHSTONE_RE.search(entry.name):
+				continue
+			try:
+				if entry.is_file():
+					st = entry.stat()
+					found[entry.path] = (st.st_size, st.st_mtime_ns)
+			except FileNotFoundError:   # removed between the listing and the stat
+				continue
+	return found
+
+
+def _load_state(path: Path) -> dict:
+	try:
+		return json.loads(path.read_text())
+	except (OSError, ValueError):
+		return {}
+
+
+def _save_state(path: Path, state: dict) -> None:
+	tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+	tmp.write_text(json.dumps(state, indent=1))
+	os.replace(tmp, path)
+
+
+def watch(folder: Path, pipeline: dict, masks: list[dict] | None, interval: float = POLL_INTERVAL,
+		  settle: float = SETTLE_TIME, workers: int | None = None, once: bool = False) -> int:
+	"""Poll *folder* and run the pipeline on every new / changed file until Ctrl-C (or, with *once*,
+	until the files present have been handled).  Returns the number of failed files."""
+	out_dir = Path(pipeline["out"])
+	out_dir.mkdir(parents=True, exist_ok=True)
+	state_file = out_dir / STATE_FILE
+	state = _load_state(state_file)
+	key = pipeline_key(pipeline)
+	workers = workers or os.cpu_count() or 1
+
+	seen = {}       # path -> [(size, mtime_ns), first seen (monotonic), handled]
+	running = {}    # future -> (path, sha1)
+	failed = 0
+	steps = [step for step, on in (("deembed", pipeline.get("fixture")), ("quality", pipeline.get("quality")),
+								   ("check", masks is not None), ("convert", pipeline.get("convert"))) if on]
+	print(f"Watching {folder} every {interval:g}s ({', '.join(steps)} on {workers} worker(s)) → {out_dir}")
+
+	pool = ProcessPoolExecutor(max_workers=workers)
+	try:
+		while True:
+			now = time.monotonic()
+			current = scan(folder)
+			for path in set(seen) - set(current):
+				del seen[path]
+			for path, stat in current.items():
+				prev = seen.get(path)
+				if prev is None or prev[0] != stat:
+					# new or still being written: the settle time counts from its last modification
+					age = max(0.0, time.time() - stat[1] / 1e9)
+					seen[path] = [stat, now - min(age, settle), False]
+					continue
+				if prev[2] or now - prev[1] < settle or any(p == path for p, _ in running.values()):
+					continue
+				prev[2] = True
+				try:
+					digest = snp_cache.file_digest(path)
+				except FileNotFoundError:
+					continue
+				rec = state.get(path)
+				if rec and rec["sha1"] == digest and rec["pipeline"] == key and rec["status"] != "ERROR":
+					print(f"[SKIP] {Path(path).name} unchanged since {rec['time']}")
+					continue
+				running[pool.submit(process_file, path, pipeline, masks)] = (path, digest)
+
+			for fut in [fut for fut in running if fut.done()]:
+				path, digest = running.pop(fut)
+				try:
+					status, elapsed, msg = fut.result()
+				except Exception as err:    # worker died (e.g. out of memory)
+					status, elapsed, msg = "ERROR", 0.0, f"{type(err).__name__}: {err}\n"
+				failed += status != "OK"
+				print(f"[{status}] {Path(path).name} {elapsed:7.2f}s")
+				for line in msg.splitlines():
+					print(f"        {line}")
+				state[path] = {"sha1": digest, "pipeline": key, "status": status,
+							   "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+				_save_state(state_file, state)
+
+			if once and not running and all(handled for _, _, handled in seen.values()):
+				break
+			time.sleep(interval)
+	except KeyboardInterrupt:
+		print("Stopped")
+	finally:
+		pool.shutdown(wait=True, cancel_futures=True)
+	return failed
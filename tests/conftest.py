@@ -0,0 +1,45 @@
+"""Shared fixtures: the sample Touchstone files of the repository and an isolated workspace."""
+
+from pathlib import Path
+import shutil
+import sys
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import snp_cache
+import snp_plot
+import SnP_Utils_New
+
+
+@pytest.fixture
+def sample():
+	"""Path of a sample file of the repository (skips the test when it is missing)."""
+	def _sample(name: str) -> Path:
+		path = REPO / name
+		if not path.is_file():
+			pytest.skip(f"sample file {name} not in the tree")
+		return path
+	return _sample
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+	"""Outputs, cache and plots of SnP_Utils_New redirected to a temporary folder."""
+	SnP_Utils_New.reset_options()
+	monkeypatch.setattr(snp_cache, "CACHE_DIR", tmp_path / "cache")
+	monkeypatch.setattr(snp_cache, "enabled", True)
+	monkeypatch.setattr(snp_plot, "mode", "none")
+	monkeypatch.setattr(SnP_Utils_New, "app_dir", tmp_path)
+	monkeypatch.chdir(tmp_path)
+	return tmp_path
+
+
+@pytest.fixture
+def copy_sample(sample, workspace):
+	"""Copy a sample file into the workspace under another name."""
+	def _copy(name: str, new_name: str) -> Path:
+		return Path(shutil.copyfile(sample(name), workspace / new_name))
+	return _copy
@@ -0,0 +1,70 @@
+"""Indexed archive: import rules, slot reuse, queries and byte-identical export."""
+
+import shutil
+
+import numpy as np
+import pytest
+import skrf as rf
+
+import snp_archive
+from snp_touchstone import read_touchstone, write_touchstone
+
+
+@pytest.fixture
+def boards(sample, workspace):
+	"""Two folders holding a file of the same name, plus an unreadable capture."""
+	for folder in ("a", "b"):
+		(workspace / folder).mkdir()
+		shutil.copyfile(sample("file1source.s4p"), workspace / folder / "board.s4p")
+	shutil.copyfile(sample("out_half.s4p"), workspace / "a" / "half.s4p")
+	(workspace / "a" / "broken.s4p").write_text("# Hz S RI R 50\n1 2 3\n")
+	return workspace
+
+
+def test_import_rejects_taken_names_and_keeps_going(boards):
+	archive = snp_archive.Archive(boards / "x.snpa", create=True)
+	paths = [boards / "a" / "board.s4p", boards / "a" / "broken.s4p", boards / "b" / "board.s4p",
+			 boards / "a" / "half.s4p"]
+	added, skipped, errors = archive.import_files(paths)
+	assert (added, skipped) == (2, 0)
+	assert [p.parent.name + "/" + p.name for p, _ in errors] == ["a/broken.s4p", "b/board.s4p"]
+	assert sorted(archive.names()) == ["board", "half"]
+	assert archive.entry("board")["source"] == str((boards / "a" / "board.s4p").resolve())
+
+	added, skipped, errors = snp_archive.Archive(boards / "x.snpa").import_files([boards / "b" / "board.s4p"])
+	assert (added, skipped, len(errors)) == (0, 0, 1)
+
+
+def test_moved_network_frees_its_slot(sample, workspace):
+	archive = snp_archive.Archive(workspace / "x.snpa", create=True)
+	f, s, z0, info = read_touchstone(sample("out_half.s4p"))
+	archive.add([("one", f, s, z0, info), ("two", f, s, z0, info)])
+	group = archive.entry("one")["group"]
+	archive.add([("one", f[:-1], s[:-1], z0[:-1], info)])      # other grid: moves to another group
+	archive.add([("three", f, s, z0, info)])
+	assert archive.entry("three")["group"] == group
+	assert archive.entry("three")["slot"] == 0
+	assert archive.index["groups"][group]["slots"] == 2
+	np.testing.assert_array_equal(archive.read("three")[1], s)
+	np.testing.assert_array_equal(archive.read("one")[1], s[:-1])
+
+
+def test_query_outside_grid(sample, workspace):
+	archive = snp_archive.Archive(workspace / "x.snpa", create=True)
+	archive.import_files([sample("out_half.s4p")])
+	f = archive.grid(archive.index["groups"][archive.entry("out_half")["group"]]["grid"])
+	(names, at, values), = archive.values("SDD21", f[3] * 1.000001)
+	assert names == ["out_half"] and at == f[3]
+	with pytest.raises(ValueError):
+		archive.values("SDD21", f[-1] * 2)
+
+
+@pytest.mark.parametrize("form", ["ri", "ma", "db"])
+def test_export_byte_identical(sample, workspace, form):
+	archive = snp_archive.Archive(workspace / "x.snpa", create=True)
+	archive.import_files([sample("file1source.s4p")])
+	exported = archive.export("file1source", workspace / "exp.s4p", form)[form]
+	f, s, z0, info = read_touchstone(sample("file1source.s4p"))
+	direct = {form: workspace / "direct.s4p"}
+	write_touchstone(direct, f, s, z0, info["unit"], info["comments"], creator=f"skrf {rf.__version__}")
+	assert exported.read_bytes() == direct[form].read_bytes()
@@ -0,0 +1,64 @@
+"""Chunked mode: same results as in memory, no file left open on errors."""
+
+import gc
+import warnings
+
+import numpy as np
+import pytest
+
+import snp_chunked
+import snp_linalg
+import SnP_Utils_New
+from snp_touchstone import load_network
+
+V2_PER_PORT_REFERENCE = """[Version] 2.0
+# Hz S RI R 50
+[Number of Ports] 2
+[Two-Port Data Order] 12_21
+[Number of Frequencies] 2
+[Reference] 50 75
+[Network Data]
+1e9 0 0 1 0 1 0 0 0
+2e9 0 0 1 0 1 0 0 0
+[End]
+"""
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 4096])
+def test_cascade_matches_in_memory(sample, workspace, chunk):
+	files = [sample("file1source.s4p"), sample("out_half.s4p")]
+	outputs, points, _ = snp_chunked.cascade_files(files, workspace / "chunked", "ri", chunk)
+	ref = SnP_Utils_New._cascade_chain(files)
+	ntw = load_network(outputs["ri"])
+	assert points == len(ref.f)
+	np.testing.assert_allclose(ntw.s, ref.s, rtol=1e-9, atol=1e-12)
+
+
+def test_deembed_matches_in_memory(sample, workspace):
+	total, fixture = sample("file1source.s4p"), sample("out_half.s4p")
+	outputs, f, cond, _ = snp_chunked.deembed_files(total, fixture, workspace / "chunked", "ri", 100)
+	ref, ref_cond = snp_linalg.deembed_network(load_network(total), load_network(fixture))
+	np.testing.assert_allclose(load_network(outputs["ri"]).s, ref.s, rtol=1e-9, atol=1e-12)
+	np.testing.assert_allclose(cond, ref_cond)
+
+
+def test_no_file_left_open_on_failed_checks(sample, workspace):
+	other_r = workspace / "other_r.s4p"
+	other_r.write_text(sample("out_half.s4p").read_text().replace(" R 50", " R 75", 1))
+	with warnings.catch_warnings(record=True) as caught:
+		warnings.simplefilter("always", ResourceWarning)
+		with pytest.raises(ValueError):
+			snp_chunked.cascade_files([sample("file1source.s4p"), other_r], workspace / "x", "ri")
+		with pytest.raises(ValueError):
+			snp_chunked.convert_file(sample("out_half.s4p"), workspace, "xx")
+		gc.collect()
+	assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+def test_unsupported_input_is_a_value_error(workspace):
+	src = workspace / "ref.s2p"
+	src.write_text(V2_PER_PORT_REFERENCE)
+	with pytest.raises(ValueError, match="block reader"):
+		snp_chunked.convert_file(src, workspace / "out", "ri")
+	with pytest.raises(ValueError, match="block reader"):
+		snp_chunked.cascade_files([src, src], workspace / "x", "ri")
@@ -0,0 +1,29 @@
+"""Command line: options without an operation, the [OK] line of a call."""
+
+import pytest
+
+import SnP_Utils_New
+
+
+@pytest.mark.parametrize("argv", [["--no-plot"], ["--no-cache", "--cond", "--no-daemon"]])
+def test_options_only(workspace, capsys, argv):
+	with pytest.raises(SystemExit) as exit_info:
+		SnP_Utils_New.main(argv)
+	assert exit_info.value.code == 1
+	assert capsys.readouterr().out.startswith("No operation given")
+
+
+def test_help_after_options(workspace, capsys):
+	with pytest.raises(SystemExit) as exit_info:
+		SnP_Utils_New.main(["--no-plot", "--help"])
+	assert exit_info.value.code == 0
+
+
+def test_ok_lists_every_form_written(sample, workspace, capsys):
+	argv = ["--no-plot", "--no-daemon", "cascade", str(sample("file1source.s4p")), str(sample("out_half.s4p")), "ri,db"]
+	try:
+		SnP_Utils_New.main(argv)
+	except SystemExit as exit_info:
+		assert not exit_info.code
+	ok = [line for line in capsys.readouterr().out.splitlines() if line.startswith("[OK]")]
+	assert ok and "file1source_out_half_cascade_ri.s4p" in ok[0] and "file1source_out_half_cascade_db.s4p" in ok[0]
@@ -0,0 +1,54 @@
+"""Mixed-mode fast paths against rf.Network.se2gmm()."""
+
+import numpy as np
+import pytest
+
+import snp_linalg
+from snp_touchstone import load_network
+
+TERMS = ["SDD11", "SDD21", "SDD12", "SDD22", "SCC11", "SCC21", "SDC21", "SCD21", "SCD12", "SDC11"]
+
+
+def _reference(ntw):
+	mm = ntw.copy()
+	mm.se2gmm(p=2)
+	return mm
+
+
+@pytest.mark.parametrize("name", ["file1source.s4p", "out_half.s4p", "thru_ma.s4p"])
+def test_terms_match_se2gmm(sample, name):
+	ntw = load_network(sample(name))
+	ref = _reference(ntw)
+	idx = [snp_linalg.mixed_mode_index(t) for t in TERMS]
+	expected = np.stack([ref.s[:, i, j] for i, j in idx], axis=1)
+	np.testing.assert_allclose(snp_linalg.mixed_mode_terms(ntw, TERMS), expected, rtol=1e-12, atol=1e-14)
+
+
+@pytest.mark.parametrize("z0", [75, 37.5])
+def test_terms_with_port_impedances(sample, z0):
+	"""Equal non-50 ohm ports take the fast path: compare it with skrf's se2gmm()."""
+	ntw = load_network(sample("out_half.s4p"))
+	ntw.renormalize(z0)
+	ref = _reference(ntw)
+	np.testing.assert_allclose(snp_linalg.mixed_mode_terms(ntw, ["SDD21", "SCD21", "SDC12", "SCC11"]),
+							   ref.s[:, [1, 3, 0, 2], [0, 0, 3, 2]], rtol=1e-12, atol=1e-14)
+	mm = snp_linalg.mixed_mode(ntw)
+	np.testing.assert_allclose(mm.s, ref.s, rtol=1e-12, atol=1e-14)
+	np.testing.assert_allclose(mm.z0, ref.z0)
+
+
+def test_terms_with_unequal_port_impedances(sample):
+	"""Unequal ports are renormalized by skrf: check the term indexing on its result."""
+	ntw = load_network(sample("out_half.s4p"))
+	ntw.renormalize(np.array([50, 50, 45, 55]))
+	ref = _reference(ntw)
+	np.testing.assert_allclose(snp_linalg.mixed_mode_terms(ntw, ["SDD21", "SCD21"]),
+							   ref.s[:, [1, 3], [0, 0]], rtol=1e-12, atol=1e-14)
+
+
+def test_mixed_mode_network_matches_se2gmm(sample):
+	ntw = load_network(sample("file1source.s4p"))
+	mm, ref = snp_linalg.mixed_mode(ntw), _reference(ntw)
+	np.testing.assert_allclose(mm.s, ref.s, rtol=1e-12, atol=1e-14)
+	np.testing.assert_allclose(mm.z0, ref.z0)
+	assert list(mm.port_modes) == list(ref.port_modes)
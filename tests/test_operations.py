@@ -0,0 +1,82 @@
+"""Cascade, de-embedding and attach against the skrf operations they replace."""
+
+import numpy as np
+import pytest
+import skrf as rf
+
+import snp_linalg
+import SnP_Utils_New
+from snp_touchstone import load_network
+
+
+def _close(ntw, ref, atol=1e-12):
+	np.testing.assert_array_equal(ntw.f, ref.f)
+	np.testing.assert_allclose(ntw.s, ref.s, rtol=1e-9, atol=atol)
+
+
+@pytest.mark.parametrize("names", [["file1source.s4p", "out_half.s4p"],
+								   ["out_half.s4p", "file1source.s4p", "out_half.s4p"],
+								   ["ring.s2p", "ring.s2p", "ring.s2p"]])
+def test_cascade_matches_skrf(sample, names):
+	paths = [sample(name) for name in names]
+	ref = rf.Network(str(paths[0]))
+	for path in paths[1:]:
+		ref = ref ** rf.Network(str(path))
+	_close(SnP_Utils_New._cascade_chain(paths), ref)
+
+
+@pytest.mark.parametrize("total, fixture", [("file1source.s4p", "out_half.s4p"),
+											("file1source_out_half_cascade.s4p", "out_half.s4p")])
+def test_deembed_matches_skrf(sample, total, fixture):
+	ntw_a, ntw_b = load_network(sample(total)), load_network(sample(fixture))
+	ntw, cond = snp_linalg.deembed_network(ntw_a, ntw_b)
+	_close(ntw, ntw_a ** ntw_b.inv, atol=1e-10)     # round-off of the fixture inverse (cond up to ~1e4)
+	assert cond.shape == ntw.f.shape and np.all(cond >= 1)
+
+
+def test_deembed_undoes_cascade(sample):
+	ntw_a, ntw_b = load_network(sample("file1source.s4p")), load_network(sample("out_half.s4p"))
+	ntw, _ = snp_linalg.deembed_network(ntw_a ** ntw_b, ntw_b)
+	np.testing.assert_allclose(ntw.s, ntw_a.s, atol=1e-8)
+
+
+@pytest.fixture
+def cable(sample, workspace):
+	"""A 2-port on the grid of the 4-port samples (line 1 of out_half.s4p)."""
+	path = workspace / "cable.s2p"
+	rf.network.subnetwork(load_network(sample("out_half.s4p")), [0, 2]).write_touchstone(str(path))
+	return path
+
+
+def test_attach_2port_matches_skrf(sample, workspace, cable):
+	dut = workspace / "dut.s2p"
+	rf.network.subnetwork(load_network(sample("file1source.s4p")), [1, 3]).write_touchstone(str(dut))
+	ntw = SnP_Utils_New._attach(dut, [(cable, None)])
+	_close(ntw, load_network(cable) ** load_network(dut))
+
+
+def test_attach_4port_matches_skrf(sample, cable):
+	dut = sample("file1source.s4p")
+	c = load_network(cable)
+	s = np.zeros((len(c.f), 4, 4), dtype=complex)
+	for line in (0, 1):     # the cable on both lines of side 1: ports 1-3 and 2-4 of a 4-port
+		s[:, [[line], [line + 2]], [line, line + 2]] = c.s
+	both = rf.Network(frequency=c.frequency, s=s, z0=50)
+	_close(SnP_Utils_New._attach(dut, [(cable, None)]), both ** load_network(dut))
+
+
+@pytest.mark.skipif(not hasattr(rf, "Circuit"), reason="skrf without Circuit")
+def test_attach_ports_match_circuit(sample, cable):
+	dut = sample("file1source.s4p")
+	ntw = SnP_Utils_New._attach(dut, [(cable, [0, 3])])
+	net, seg = load_network(dut), load_network(cable)
+	connections = []
+	for port in range(4):
+		ext = rf.Circuit.Port(net.frequency, name=f"port{port + 1}", z0=50)
+		if port in (0, 3):
+			line = seg.copy()
+			line.name = f"cable_{port + 1}"
+			connections += [[(ext, 0), (line, 0)], [(line, 1), (net, port)]]
+		else:
+			connections.append([(ext, 0), (net, port)])
+	_close(ntw, rf.Circuit(connections).network)
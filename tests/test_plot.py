@@ -0,0 +1,21 @@
+"""Report figures: the reused render figure takes each job's title and data."""
+
+import numpy as np
+import pytest
+
+import snp_plot
+
+pytest.importorskip("matplotlib")
+
+
+def test_render_reuses_figure(workspace):
+	f = np.linspace(10e6, 26.5e9, 400)
+	for title in ("first", "second"):
+		job = {"png": str(workspace / f"{title}.png"), "title": title,
+			   "panels": [snp_plot.trace(f, np.exp(-1j * f / 1e9), "SDD21", ("mask", -15)),
+						  snp_plot.trace(f, np.full(len(f), 0.1), "SDD11")]}
+		assert snp_plot._render_png(job) == job["png"]
+	fig, title = snp_plot._figures[2]
+	assert title.get_text() == "second"
+	assert [t.get_text() for t in fig.texts] == ["second"]
+	assert (workspace / "first.png").is_file() and (workspace / "second.png").is_file()
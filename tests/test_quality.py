@@ -0,0 +1,55 @@
+"""IEEE370 quality gate: vectorized pre-screen, full check escalation and cached verdicts."""
+
+import pytest
+
+import snp_cache
+import snp_linalg
+import snp_quality
+from snp_touchstone import load_network
+
+
+def test_verdict_cached(sample, workspace):
+	ntw = load_network(sample("file1source.s4p"))
+	first = snp_quality.gate(ntw)
+	second = snp_quality.gate(ntw)
+	assert (first[2], second[2]) == ("pre-screen", "cached")
+	assert first[:2] == second[:2]
+	assert snp_cache.stats()["verdict"][0] == 1
+
+
+def test_verdict_keyed_on_evaluated_data(sample, workspace):
+	ntw = load_network(sample("file1source.s4p"))
+	mm = snp_linalg.mixed_mode(ntw, p=2)
+	_, qm_se, _ = snp_quality.gate(ntw)
+	passed, qm_mm, tier = snp_quality.gate(mm)
+	assert tier == "pre-screen"
+	assert qm_mm == snp_quality.prescreen(mm)
+	assert qm_se != qm_mm
+
+
+def test_full_check_on_request_upgrades_the_cached_verdict(sample, workspace):
+	ntw = load_network(sample("out_half.s4p"))
+	assert snp_quality.gate(ntw)[2] == "pre-screen"
+	assert snp_quality.gate(ntw, full=True)[2] == "full"
+	assert snp_quality.gate(ntw, full=True)[2] == "cached"
+	assert snp_cache.stats()["verdict"][0] == 1
+
+
+def test_marginal_pre_screen_runs_the_full_check(sample, workspace, monkeypatch):
+	ntw = load_network(sample("out_half.s4p"))
+	monkeypatch.setattr(snp_quality, "PRESCREEN_MARGIN", 200.0)    # every metric is marginal
+	passed, qm, tier = snp_quality.gate(ntw)
+	assert tier == "full"
+	assert qm == snp_quality.full_check(ntw)
+
+
+@pytest.mark.parametrize("name", ["file1source.s4p", "out_half.s4p", "ring.s2p"])
+def test_prescreen_matches_full_check(sample, name):
+	ntw = load_network(sample(name))
+	qm, ref = snp_quality.prescreen(ntw), snp_quality.full_check(ntw)
+	modes = ("dd", "cc") if ntw.nports == 4 else (None,)
+	for mode in modes:
+		got, want = (qm, ref) if mode is None else (qm[mode], ref[mode])
+		for metric, value in got.items():
+			assert value["value"] == pytest.approx(want[metric]["value"], abs=1e-6)
+			assert value["evaluation"] == want[metric]["evaluation"]
@@ -0,0 +1,98 @@
+"""Result cache: outputs are named after the inputs of the current call."""
+
+import numpy as np
+import skrf as rf
+
+import snp_cache
+import snp_results
+import SnP_Utils_New
+from snp_touchstone import load_network
+
+
+def test_deembed_same_content_other_name(copy_sample, sample, workspace, capsys):
+	board_a = copy_sample("file1source.s4p", "boardA.s4p")
+	board_b = copy_sample("file1source.s4p", "boardB.s4p")
+	fixture = sample("out_half.s4p")
+
+	SnP_Utils_New.create_deembeded_network(board_a, fixture, "ri")
+	first = capsys.readouterr().out
+	SnP_Utils_New.create_deembeded_network(board_b, fixture, "ri")
+	second = capsys.readouterr().out
+
+	assert "[cache] deembed result reused" in second
+	out_a = workspace / "boardA_out_half_deembed.s4p"
+	out_b = workspace / "boardB_out_half_deembed.s4p"
+	assert out_a.is_file() and out_b.is_file()
+	assert load_network(out_b).name == "boardB_out_half_deembed"
+	np.testing.assert_array_equal(load_network(out_a).s, load_network(out_b).s)
+	if "Fixture condition number" in first:     # reported again on a hit
+		assert "Fixture condition number" in second
+
+
+def test_deembed_many_same_content_other_name(copy_sample, sample, workspace):
+	board_a = copy_sample("file1source.s4p", "boardA.s4p")
+	board_b = copy_sample("file1source.s4p", "boardB.s4p")
+	fixture = sample("out_half.s4p")
+
+	SnP_Utils_New.create_deembeded_networks(fixture, [board_a], "ri")
+	SnP_Utils_New.create_deembeded_networks(fixture, [board_a, board_b], "ri")
+	assert (workspace / "boardB_out_half_deembed.s4p").is_file()
+
+
+def test_cascade_same_content_other_name(copy_sample, sample, workspace):
+	board_a = copy_sample("file1source.s4p", "boardA.s4p")
+	board_b = copy_sample("file1source.s4p", "boardB.s4p")
+	fixture = sample("out_half.s4p")
+
+	SnP_Utils_New.create_cascade_networks([board_a, fixture], "ri")
+	SnP_Utils_New.create_cascade_networks([board_b, fixture], "ri")
+	assert (workspace / "boardA_out_half_cascade.s4p").is_file()
+	assert (workspace / "boardB_out_half_cascade.s4p").is_file()
+
+
+def test_no_key_with_cache_off(sample, monkeypatch):
+	monkeypatch.setattr(snp_cache, "enabled", False)
+	monkeypatch.setattr(snp_cache, "file_digest", lambda path: (_ for _ in ()).throw(AssertionError(path)))
+	assert snp_results.result_key("cascade", [sample("out_half.s4p")]) is None
+	assert snp_results.load(None) is None
+	assert snp_results.load_cond(None) is None
+
+
+def test_attach_same_content_other_name(copy_sample, sample, workspace):
+	board_a = copy_sample("file1source.s4p", "boardA.s4p")
+	board_b = copy_sample("file1source.s4p", "boardB.s4p")
+	cable = workspace / "thru.s2p"
+	rf.network.subnetwork(load_network(sample("out_half.s4p")), [0, 2]).write_touchstone(str(cable))
+
+	SnP_Utils_New.create_attached_network(board_a, [(cable, None)], "ri")
+	SnP_Utils_New.create_attached_network(board_b, [(cable, None)], "ri")
+	assert (workspace / "boardA_attach.s4p").is_file()
+	assert load_network(workspace / "boardB_attach.s4p").name == "boardB_attach"
+
+
+def test_assemble_same_content_other_ports(sample, workspace):
+	thru = rf.network.subnetwork(load_network(sample("out_half.s4p")), [0, 2])
+	for name in ("S21.s2p", "S31.s2p"):
+		thru.write_touchstone(str(workspace / name))
+	pairs = [workspace / "S21.s2p", workspace / "S31.s2p"]
+
+	SnP_Utils_New.create_assembled_network(pairs, 4, workspace / "first.s4p", "ri")
+	pairs[1] = pairs[1].rename(workspace / "S43.s2p")
+	SnP_Utils_New.create_assembled_network(pairs, 4, workspace / "second.s4p", "ri")
+	first, second = load_network(workspace / "first.s4p"), load_network(workspace / "second.s4p")
+	assert second.name == "second"
+	assert np.any(first.s[:, 2, 0] != 0) and np.all(second.s[:, 2, 0] == 0)
+	assert np.any(second.s[:, 3, 2] != 0)
+
+
+def test_deembed_many_common_grid_depends_on_the_run(sample, workspace, monkeypatch):
+	fixture, dut = sample("out_half.s4p"), sample("file1source.s4p")
+	narrow = workspace / "narrow.s4p"
+	full = load_network(dut)
+	full[len(full.f) // 4:len(full.f) // 4 + 999].write_touchstone(str(narrow))
+	monkeypatch.setattr(SnP_Utils_New, "grid_policy", ("intersection", None))
+
+	SnP_Utils_New.create_deembeded_networks(fixture, [dut, sample("thru_db.s4p")], "ri")
+	assert len(load_network(workspace / "file1source_out_half_deembed.s4p").f) == len(full.f)
+	SnP_Utils_New.create_deembeded_networks(fixture, [dut, narrow], "ri")
+	assert len(load_network(workspace / "file1source_out_half_deembed.s4p").f) == 999
@@ -0,0 +1,36 @@
+"""Daemon client: only a missing daemon falls back to running in-process."""
+
+import socket
+
+import pytest
+
+import snp_serve
+
+
+ARGV = ["convert", "file.s4p", "ri", "--no-plot"]
+
+
+@pytest.fixture
+def silent_daemon(tmp_path, monkeypatch):
+	"""A socket that accepts the call but never replies."""
+	if not hasattr(socket, "AF_UNIX"):
+		pytest.skip("no unix sockets")
+	path = tmp_path / "d.sock"
+	monkeypatch.setattr(snp_serve, "SOCKET_PATH", path)
+	monkeypatch.setattr(snp_serve, "enabled", True)
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+		server.bind(str(path))
+		server.listen()
+		yield path
+
+
+def test_no_daemon_runs_in_process(tmp_path, monkeypatch):
+	monkeypatch.setattr(snp_serve, "SOCKET_PATH", tmp_path / "none.sock")
+	monkeypatch.setattr(snp_serve, "enabled", True)
+	assert snp_serve.forward(ARGV) is None
+
+
+def test_reply_timeout_is_an_error(silent_daemon, monkeypatch, capsys):
+	monkeypatch.setattr(snp_serve, "REPLY_TIMEOUT", 0.05)
+	assert snp_serve.forward(ARGV) == 1
+	assert "not re-run here" in capsys.readouterr().out
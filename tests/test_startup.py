@@ -0,0 +1,37 @@
+"""Start-up budget: importing the CLI must not load skrf, scipy or matplotlib."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+STARTUP_BUDGET_S = 0.4      # `import <module>`, interpreter start-up excluded
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - t0
+import snp_lazy
+print(json.dumps({"time": elapsed, "heavy": snp_lazy.loaded_heavy_modules(),
+				  "matplotlib": "matplotlib" in sys.modules}))
+"""
+
+
+def _probe(module):
+	proc = subprocess.run([sys.executable, "-c", _PROBE, module], cwd=APP_DIR,
+						  capture_output=True, text=True, check=True)
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["SnP_Utils_New", "ba4_new", "new_test"])
+def test_import_is_light(module):
+	# skrf is bound by lazy_import(): in sys.modules, but not executed
+	results = [_probe(module) for _ in range(3)]
+	assert all(not r["heavy"] and not r["matplotlib"] for r in results), results
+	best = min(r["time"] for r in results)
+	assert best <= STARTUP_BUDGET_S, f"import {module}: {best:.3f}s > {STARTUP_BUDGET_S}s"
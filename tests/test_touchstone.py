@@ -0,0 +1,57 @@
+"""Touchstone loader and writer against skrf on the sample files."""
+
+import numpy as np
+import pytest
+import skrf as rf
+
+from snp_touchstone import _parse_option_line, load_network, write_network
+
+SAMPLES = ["out_half.s4p", "thru_ma.s4p", "thru_db.s4p", "file1source.s4p", "ring.s2p",
+		   "Replica_S4P_HTG_FMC_X6QSFP28.s4p"]
+
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_loader_matches_skrf(sample, name):
+	path = sample(name)
+	ntw, ref = load_network(path), rf.Network(str(path))
+	np.testing.assert_array_equal(ntw.f, ref.f)
+	np.testing.assert_array_equal(ntw.s, ref.s)
+	np.testing.assert_array_equal(ntw.z0, ref.z0)
+	assert ntw.frequency.unit == ref.frequency.unit
+	assert ntw.comments == ref.comments
+	assert ntw.name == ref.name
+
+
+@pytest.mark.parametrize("name", ["out_half.s4p", "thru_db.s4p", "ring.s2p"])
+def test_writer_byte_identical_to_skrf(sample, workspace, name):
+	ntw = rf.Network(str(sample(name)))
+	outputs = write_network(ntw, workspace / f"fast.s{ntw.nports}p", "ri,ma,db")
+	for form, path in outputs.items():
+		ntw.write_touchstone(str(workspace / f"skrf_{form}"), form=form)
+		assert path.read_bytes() == (workspace / f"skrf_{form}.s{ntw.nports}p").read_bytes(), form
+
+
+
+DATA = "1 0.1 -0.2 0.9 0.05 0.8 -0.1 0.2 0.3\n2 0.2 -0.1 0.7 0.15 0.6 -0.2 0.1 0.4\n"
+
+
+@pytest.mark.parametrize("option, canonical", [
+	("# S RI R 50", "# GHz S RI R 50"),
+	("# RI GHz S", "# GHz S RI R 50"),
+	("# MHz RI", "# MHz S RI R 50"),
+	("# R 75 DB S KHz", "# KHz S DB R 75"),
+	("#", "# GHz S MA R 50"),
+])
+def test_option_line_any_order(workspace, option, canonical):
+	# skrf reads the options by position: compare with the same data under the canonical line
+	(workspace / "opt.s2p").write_text(f"{option}\n{DATA}")
+	(workspace / "ref.s2p").write_text(f"{canonical}\n{DATA}")
+	ntw, ref = load_network(workspace / "opt.s2p"), rf.Network(str(workspace / "ref.s2p"))
+	np.testing.assert_array_equal(ntw.f, ref.f)
+	np.testing.assert_array_equal(ntw.s, ref.s)
+	np.testing.assert_array_equal(ntw.z0, ref.z0)
+
+
+def test_option_line_unknown_option_is_left_to_skrf():
+	with pytest.raises(NotImplementedError):
+		_parse_option_line("# GHz S RI R 50 X")
@@ -0,0 +1,27 @@
+"""Watch mode: processed files are skipped on the next run, failed ones retried."""
+
+import shutil
+
+import snp_watch
+
+
+def _pipeline(out):
+	return {"out": str(out), "fixture": None, "format": "ri", "quality": True,
+			"convert": None, "version": "1"}
+
+
+def test_error_is_retried_unchanged_is_skipped(sample, workspace, capsys):
+	folder = workspace / "in"
+	folder.mkdir()
+	shutil.copyfile(sample("out_half.s4p"), folder / "good.s4p")
+	(folder / "bad.s4p").write_text("# Hz S RI R 50\n1 2 3\n")
+	pipeline = _pipeline(workspace / "out")
+
+	snp_watch.watch(folder, pipeline, None, interval=0.05, settle=0.01, workers=1, once=True)
+	first = capsys.readouterr().out
+	assert "[ERROR] bad.s4p" in first and "good.s4p" in first
+
+	snp_watch.watch(folder, pipeline, None, interval=0.05, settle=0.01, workers=1, once=True)
+	second = capsys.readouterr().out
+	assert "[SKIP] good.s4p" in second
+	assert "[ERROR] bad.s4p" in second